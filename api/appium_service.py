@@ -1,5 +1,4 @@
 import os
-import subprocess
 import asyncio
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.layers import get_channel_layer
@@ -15,6 +14,11 @@ from selenium.webdriver.remote.webelement import WebElement
 import json
 from functools import wraps
 from appium.options.android import UiAutomator2Options
+from .element_waits import get_wait_strategy
+from .metrics import counter, histogram
+from .device_registry import device_registry
+from .locator_cache import FAST_PATH_ATTRIBUTES, NO_FAST_PATH, SLOW_STRATEGIES, locator_cache
+from .log_stream import GLOBAL_GROUP, log_aggregator, session_group
 
 logger = logging.getLogger(__name__)
 
@@ -33,6 +37,15 @@ def sync_async_wrapper(func):
         return await func(*args, **kwargs)
     return wrapper
 
+# ElementIdentifierType.name -> Appium locator strategy
+IDENTIFIER_TYPE_STRATEGIES = {
+    'ID': 'id',
+    'CLASS_NAME': 'class name',
+    'ANDROID_UIAUTOMATOR': '-android uiautomator',
+    'XPATH': 'xpath',
+    'ACCESSIBILITY_ID': 'accessibility id'
+}
+
 class CriticalStepError(Exception):
 
     def __init__(self, message, step_order, element_id):
@@ -42,88 +55,38 @@ class CriticalStepError(Exception):
         self.element_id = element_id
 
 class AppiumService:
-    _instance = None
-    driver = None
-    
-    _instance = None
-    driver = None
+    """
+    Wraps a single Appium driver. One instance is created per device session by
+    AppiumSessionPool (api/session_pool.py), so several phones can be driven at once.
+    """
 
-    # def __init__(self):
-    #     self.driver = None
-    #     self._socket_emit = None
-    
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super(AppiumService, cls).__new__(cls)
-        return cls._instance
+    def __init__(self):
+        self.driver = None
+        self.session_id = None
     
     async def _socket_emit(self, event, message):
-        channel_layer = get_channel_layer()
-        await channel_layer.group_send("appium", {
-            'type': 'log_message',  # Must match consumer method name
-            'message': message
-        })
+        # Buffered and sent in batches to this session's viewers (api/log_stream.py).
+        log_aggregator.emit(self.session_id, message)
 
-        
+    async def _socket_emit_step_result(self, result):
+        """Pushes one step outcome to the websocket while a whole test case runs server-side."""
+        channel_layer = get_channel_layer()
+        groups = [GLOBAL_GROUP] if self.session_id is None else [session_group(self.session_id)]
+        if self.session_id is not None and getattr(settings, 'APPIUM_LOG_GLOBAL_GROUP', True):
+            groups.append(GLOBAL_GROUP)
+        for group in groups:
+            await channel_layer.group_send(group, {
+                'type': 'step_result',  # Must match consumer method name
+                'session_id': self.session_id,
+                'result': result
+            })
     
-    async def get_connected_devices(self):
+    async def get_connected_devices(self, force_refresh=False):
         try:
-            adb_path = getattr(settings, 'ADB_PATH', '/usr/bin/adb')
-            
-            result = subprocess.run([adb_path, 'devices'], capture_output=True, text=True)
-            if result.returncode != 0:
-                logger.error('Failed to get devices:', result.stderr)
-                await self._socket_emit('log', f'Failed to get devices: {result.stderr}')
-                return {'devices': []}
-            
-            devices = []
-            for line in result.stdout.split('\n'):
-                if line.strip() and not line.startswith('List of devices') and line.endswith('device'):
-                    udid = line.split('\t')[0]
-                    
-                    try:
-                        version_result = subprocess.run(
-                            [adb_path, '-s', udid, 'shell', 'getprop', 'ro.build.version.release'],
-                            capture_output=True, text=True
-                        )
-                        version = version_result.stdout.strip() if version_result.returncode == 0 else 'Unknown'
-                        
-                        model_result = subprocess.run(
-                            [adb_path, '-s', udid, 'shell', 'getprop', 'ro.product.model'],
-                            capture_output=True, text=True
-                        )
-                        model = model_result.stdout.strip() if model_result.returncode == 0 else 'Unknown'
-                        
-                        manufacturer_result = subprocess.run(
-                            [adb_path, '-s', udid, 'shell', 'getprop', 'ro.product.manufacturer'],
-                            capture_output=True, text=True
-                        )
-                        manufacturer = manufacturer_result.stdout.strip().lower() if manufacturer_result.returncode == 0 else 'Unknown'
-                        
-                        platform = 'Android'
-                        if 'apple' in manufacturer or (len(udid) == 40 and all(c in 'abcdef0123456789' for c in udid.lower())):
-                            platform = 'iOS'
-                            
-                        devices.append({
-                            'device_uuid': udid,
-                            'device_name': model if model != 'Unknown' else f'Device {udid[:8]}',
-                            'os_version': version,
-                            'platform': platform
-                        })
-                        
-                    except Exception as e:
-                        logger.error(f'Error getting device details for {udid}: {str(e)}')
-                        devices.append({
-                            'device_uuid': udid,
-                            'device_name': f'Device {udid[:8]}',
-                            'os_version': 'Unknown',
-                            'platform': 'Unknown'
-                        })
-            
+            devices = await device_registry.get_devices(force=force_refresh)
             return {'devices': devices}
-            
         except Exception as e:
-            logger.error('Error in get_connected_devices:', str(e))
+            logger.error(f'Error in get_connected_devices: {str(e)}')
             await self._socket_emit('log', f'Error in get_connected_devices: {str(e)}')
             return {'devices': []}
     
@@ -150,10 +113,14 @@ class AppiumService:
                     options.no_reset = True  # Don't reset app state between sessions
                     options.full_reset = False  # Don't uninstall app between sessions
 
-                    self.driver = webdriver.Remote(
+                    # BRIDGE: webdriver.Remote blocks on HTTP, keep it off the event loop
+                    # so other pooled sessions keep running while this one starts.
+                    self.driver = await asyncio.to_thread(
+                        webdriver.Remote,
                         command_executor=f"http://{settings.APPIUM_HOST}:{settings.APPIUM_PORT}",
                         options=options
                     )
+                    self.session_id = self.driver.session_id
                     
                     logger.info(f'Session started with ID: {self.driver.session_id}')
                     await self._socket_emit('log', f'Session started with ID: {self.driver.session_id}')
@@ -198,14 +165,7 @@ class AppiumService:
 
     def _map_identifier_type(self, identifier):
         """Maps frontend identifier types to Appium format"""
-        mapping = {
-            'ID': 'id',
-            'CLASS_NAME': 'class name',
-            'ANDROID_UIAUTOMATOR': '-android uiautomator',
-            'XPATH': 'xpath',
-            'ACCESSIBILITY_ID': 'accessibility id'
-        }
-        return mapping.get(identifier, 'id')  # Default to 'id' if not found
+        return IDENTIFIER_TYPE_STRATEGIES.get(identifier, 'id')  # Default to 'id' if not found
 
     def _get_selector(self, step):
         """Exactly matches your Node.js selector format"""
@@ -250,8 +210,10 @@ class AppiumService:
             try:
                 logger.info("Ending Appium session")
                 await self._socket_emit('log', 'Ending Appium session')
-                self.driver.quit()
+                await asyncio.to_thread(self.driver.quit)
+                log_aggregator.end_session(self.session_id)
                 self.driver = None
+                self.session_id = None
                 return {"success": True}
             except Exception as e:
                 logger.error(f"Failed to end session: {str(e)}")
@@ -279,42 +241,98 @@ class AppiumService:
             'xpath': (AppiumBy.XPATH, element_id),
             'accessibility id': (AppiumBy.ACCESSIBILITY_ID, element_id),
         }
-        locator = BY_MAP.get(identifier)
+        # Steps built on the server carry the ElementIdentifierType name ('XPATH'),
+        # the frontend sends the Appium strategy ('xpath'). Accept both.
+        locator = BY_MAP.get(identifier) or BY_MAP.get(IDENTIFIER_TYPE_STRATEGIES.get(identifier))
         if not locator:
             raise ValueError(f"Unsupported locator strategy: {identifier}")
         return locator
     
+    def _find_ready_element(self, locator: tuple):
+        """
+        Blocking: find the element and check it is displayed and enabled in one go,
+        so a poll costs one thread hop instead of two. Returns None if not ready yet.
+        """
+        element = self.driver.find_element(*locator)
+        if element.is_displayed() and element.is_enabled():
+            return element
+        return None
+
     async def _find_element_with_wait(self, locator: tuple, wait_options: dict) -> WebElement:
 
                 timeout = wait_options.get('timeout', 10)
-                end_time = time.time() + timeout
+                strategy = wait_options.get('strategy') or get_wait_strategy()
+                started = time.monotonic()
+                end_time = started + timeout
                 last_exception = None
 
-                while time.time() < end_time:
+                for interval in strategy.intervals(locator):
                     try:
-                        # BRIDGE: Run the blocking find_element call in a separate thread.
-                        element = await asyncio.to_thread(self.driver.find_element, *locator)
-                        
-                        # BRIDGE: Check if element is ready for interaction, also in a thread.
-                        is_ready = await asyncio.to_thread(lambda: element.is_displayed() and element.is_enabled())
+                        # BRIDGE: find + readiness check in a single worker-thread call.
+                        element = await asyncio.to_thread(self._find_ready_element, locator)
                         
-                        if is_ready:
+                        if element is not None:
+                            strategy.record(locator, time.monotonic() - started)
                             return element # Success!
-                        else:
-                            # Element found but not ready, continue waiting.
-                            last_exception = Exception("Element found but was not displayed or enabled.")
+                        # Element found but not ready, continue waiting.
+                        last_exception = Exception("Element found but was not displayed or enabled.")
 
                     except NoSuchElementException as e:
                         # Element not found yet, keep trying.
                         last_exception = e
 
-                    await asyncio.sleep(0.5) # Poll every 500ms without blocking.
+                    remaining = end_time - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    # Sleep per the wait strategy without blocking, never past the deadline.
+                    await asyncio.sleep(min(interval, remaining))
 
                 # If the loop finishes without returning, the element was never found/ready.
                 raise TimeoutException(
                     f"Element with locator {locator} was not found and clickable within {timeout} seconds. Last error: {last_exception}"
                 )
     
+    def _learn_fast_locator(self, element: WebElement):
+        """
+        Blocking: derive an accessibility id / resource id locator for an element we
+        just found the slow way. Only used if it matches exactly one element.
+        """
+        for attribute, strategy in FAST_PATH_ATTRIBUTES:
+            value = element.get_attribute(attribute)
+            if value and len(self.driver.find_elements(strategy, value)) == 1:
+                return (strategy, value)
+        return NO_FAST_PATH
+
+    async def _find_step_element(self, step: dict, locator: tuple, timeout) -> WebElement:
+        """
+        Finds a step's element, trying the cached fast-path locator before the
+        recorded one when the recorded strategy is slow (XPath, UiAutomator, class).
+        """
+        step_id = step.get('ID')
+        if not step_id or locator[0] not in SLOW_STRATEGIES:
+            return await self._find_element_with_wait(locator, {'timeout': timeout})
+
+        application_id = step.get('Application_id')
+        cached = locator_cache.get(application_id, step_id)
+        if cached is not None and cached is not NO_FAST_PATH:
+            try:
+                # A cached locator may be stale, so it only gets a short wait; the
+                # recorded locator below still gets the step's full timeout.
+                return await self._find_element_with_wait(
+                    cached, {'timeout': min(timeout, getattr(settings, 'APPIUM_CACHED_LOCATOR_TIMEOUT', 2))}
+                )
+            except TimeoutException:
+                locator_cache.invalidate(application_id, step_id)
+
+        element = await self._find_element_with_wait(locator, {'timeout': timeout})
+        if cached is not NO_FAST_PATH:
+            try:
+                fast = await asyncio.to_thread(self._learn_fast_locator, element)
+                locator_cache.remember(application_id, step_id, fast)
+            except Exception as e:
+                logger.debug(f'Could not learn a fast locator for step {step_id}: {e}')
+        return element
+
     async def _execute_action(self, element: WebElement, action: str, input_value=None) -> dict:
 
         action_result = {}
@@ -349,7 +367,11 @@ class AppiumService:
 
             # Step 1: Find the element with proper waiting logic.
             locator = self._get_locator_tuple(step)
-            element = await self._find_element_with_wait(locator, {'timeout': 25})
+            timeout = step.get('Timeout') or getattr(settings, 'APPIUM_ELEMENT_TIMEOUT', 25)
+            find_started = time.monotonic()
+            element = await self._find_step_element(step, locator, timeout)
+            find_duration = time.monotonic() - find_started
+            histogram('appium_step_find_seconds').observe(find_duration)
 
             # Step 2: Execute the action on the found element.
             start_time = time.time()
@@ -363,19 +385,25 @@ class AppiumService:
             except Exception as err:
                 logger.warning(f"Action '{step['Action']}' failed on element '{step['ElementId']}': {err}")
                 action_error = str(err)
+                locator_cache.invalidate(step.get('Application_id'), step.get('ID'))
             
             # Step 3: Format and return the final result.
             duration = round(time.time() - start_time, 4)
+            histogram('appium_step_action_seconds').observe(duration)
+            histogram('appium_step_seconds').observe(find_duration + duration)
             response = {
                 'success': not action_error,
                 'actual_id': step["ElementId"],
                 'duration': duration,
+                'find_duration': round(find_duration, 4),
                 'error': action_error,
                 **action_result
             }
             return response
 
         except (TimeoutException, ValueError, NoSuchElementException) as error:
+            counter('appium_step_element_timeouts').inc()
+            locator_cache.invalidate(step.get('Application_id'), step.get('ID'))
             # If finding the element fails, raise our specific critical error.
             raise CriticalStepError(
                 message=f"Element '{step['ElementId']}' not found",
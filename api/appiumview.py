@@ -6,15 +6,39 @@ from .appium_service import AppiumService
 import logging
 from django.views.decorators.csrf import csrf_exempt
 from .appium_service import CriticalStepError
+from .authentication import JWTAuthenticationFromCookie
+from .session_pool import session_pool, SessionPoolError
+from .batch_runner import BatchRunner
+from .models import BatchAssignment, TestCase
+from .test_case_runner import apply_dynamic_inputs, load_step_payloads, stream_test_case
 
+# Only used for device discovery; drivers live in session_pool, one per device.
 appium_service = AppiumService()
 
 logger = logging.getLogger(__name__)
 
+
+def _get_request_user(request):
+    """These are plain Django views, so resolve the tester from the JWT cookie ourselves."""
+    auth = JWTAuthenticationFromCookie().authenticate(request)
+    return auth[0] if auth else None
+
+
+def _get_request_user_id(request):
+    user = _get_request_user(request)
+    return user.id if user else None
+
+
+def _get_session_id(request, data=None):
+    if data and data.get('sessionId'):
+        return data['sessionId']
+    return request.GET.get('sessionId')
+
 @csrf_exempt
 def get_devices(request):
     if request.method == 'GET':
-        devices = async_to_sync(appium_service.get_connected_devices)()
+        refresh = request.GET.get('refresh') in ('1', 'true')
+        devices = async_to_sync(appium_service.get_connected_devices)(force_refresh=refresh)
         return JsonResponse(devices)
     return JsonResponse({'error': 'Method not allowed'}, status=405)
 
@@ -23,11 +47,17 @@ def start_session(request):
     if request.method == 'POST':
         try:
             data = json.loads(request.body)
-            driver = async_to_sync(appium_service.start_session)(data)
+            session = async_to_sync(session_pool.acquire)(data, user_id=_get_request_user_id(request))
             return JsonResponse({
                 'success': True, 
-                'sessionId': driver.session_id
+                'sessionId': session.session_id,
+                'udid': session.udid
             })
+        except SessionPoolError as e:
+            return JsonResponse({
+                'success': False,
+                'error': str(e)
+            }, status=e.status_code)
         except Exception as e:
             return JsonResponse({
                 'success': False, 
@@ -73,8 +103,25 @@ def execute_step(request):
             print(f"Received data: {data}")  # Debug input
             
             try:
-                result = async_to_sync(appium_service.execute_step)(data)
+                session_id = _get_session_id(request, data)
+                if not session_id:
+                    return JsonResponse({
+                        'success': False,
+                        'error': 'sessionId is required',
+                        'actual_id': None,
+                        'duration': 0
+                    }, status=400)
+                result = async_to_sync(session_pool.execute_step)(
+                    session_id, data, user_id=_get_request_user_id(request)
+                )
                 return JsonResponse(result)
+            except SessionPoolError as e:
+                return JsonResponse({
+                    'success': False,
+                    'error': str(e),
+                    'actual_id': None,
+                    'duration': 0
+                }, status=e.status_code)
             except Exception as e:
                 print(f"Service error: {str(e)}")
                 if isinstance(e, dict) and 'critical' in e:
@@ -104,14 +151,64 @@ def execute_step(request):
     return JsonResponse({'error': 'Method not allowed'}, status=405)
 
 
+@csrf_exempt
+def execute_test_case(request):
+    """
+    Runs every step of a test case in one request instead of one execute-step call
+    per step. Per-step results are streamed over ws/appium/ while it runs.
+    {
+        "sessionId": "...",
+        "test_case_id": 65,
+        "dynamic_inputs": {"229": "0911000000"}  # step id -> value for dynamic steps
+    }
+    """
+    if request.method == 'POST':
+        try:
+            data = json.loads(request.body)
+            session_id = _get_session_id(request, data)
+            test_case_id = data.get('test_case_id')
+            if not session_id or not test_case_id:
+                return JsonResponse({'success': False, 'error': 'sessionId and test_case_id are required'}, status=400)
+
+            try:
+                testcase = TestCase.objects.get(id=test_case_id)
+            except TestCase.DoesNotExist:
+                return JsonResponse({'success': False, 'error': 'TestCase not found.'}, status=404)
+
+            steps = apply_dynamic_inputs(load_step_payloads(testcase), data.get('dynamic_inputs'))
+            passed, outcomes = async_to_sync(stream_test_case)(
+                session_pool, session_id, steps, user_id=_get_request_user_id(request)
+            )
+            return JsonResponse({
+                'success': passed,
+                'test_case_id': testcase.id,
+                'total_steps': len(steps),
+                'executed_steps': len(outcomes),
+                'results': outcomes
+            })
+        except SessionPoolError as e:
+            return JsonResponse({'success': False, 'error': str(e)}, status=e.status_code)
+        except Exception as e:
+            return JsonResponse({'success': False, 'error': str(e)}, status=500)
+    return JsonResponse({'error': 'Method not allowed'}, status=405)
+
+
 @csrf_exempt
 def end_session(request):
     if request.method == 'POST':
         try:
-            # result = await appium_service.end_session()
-            result = async_to_sync(appium_service.end_session)()
+            data = json.loads(request.body) if request.body else {}
+            session_id = _get_session_id(request, data)
+            if not session_id:
+                return JsonResponse({'success': False, 'error': 'sessionId is required'}, status=400)
+            result = async_to_sync(session_pool.release)(session_id, user_id=_get_request_user_id(request))
             print(result)
             return JsonResponse(result)
+        except SessionPoolError as e:
+            return JsonResponse({
+                'success': False,
+                'error': str(e)
+            }, status=e.status_code)
         except Exception as e:
             return JsonResponse({
                 'success': False, 
@@ -122,11 +219,67 @@ def end_session(request):
 
 
 @csrf_exempt
-async def session_info(request):
+def session_info(request):
     if request.method == 'GET':
         try:
-            info = await appium_service.get_session_info()
-            return JsonResponse(info if info else {'session': None})
+            session_id = _get_session_id(request)
+            if not session_id:
+                return JsonResponse({'sessions': [s.as_dict() for s in session_pool.sessions()]})
+            info = async_to_sync(session_pool.get_session_info)(session_id)
+            return JsonResponse(info)
+        except SessionPoolError as e:
+            return JsonResponse({'error': str(e)}, status=e.status_code)
         except Exception as e:
             return JsonResponse({'error': str(e)}, status=500)
-    return JsonResponse({'error': 'Method not allowed'}, status=405)
\ No newline at end of file
+    return JsonResponse({'error': 'Method not allowed'}, status=405)
+
+
+@csrf_exempt
+def run_batch(request):
+    """
+    POST starts a server-side run of a whole batch across the connected devices:
+    {
+        "batch_id": 3,
+        "capabilities": {"platformName": "Android", "appium:appPackage": "..."},
+        "device_uuids": ["R9ZR601C18H"],  # optional, defaults to every connected device
+        "dynamic_inputs": {"65": {"229": "0911000000"}}  # test case id -> step id -> value
+    }
+    GET ?batch_id=3 returns the progress of the current run.
+    """
+    user = _get_request_user(request)
+    if user is None:
+        return JsonResponse({'error': 'Authentication required'}, status=401)
+
+    if request.method == 'GET':
+        try:
+            runner = BatchRunner.get_run(int(request.GET.get('batch_id', 0)))
+        except ValueError:
+            return JsonResponse({'error': 'batch_id must be an integer'}, status=400)
+        if runner is None:
+            return JsonResponse({'error': 'No run found for this batch'}, status=404)
+        return JsonResponse(runner.status())
+
+    if request.method == 'POST':
+        try:
+            data = json.loads(request.body)
+            batch_id = data.get('batch_id')
+            if not batch_id:
+                return JsonResponse({'error': 'batch_id is required'}, status=400)
+            try:
+                batch = BatchAssignment.objects.get(id=batch_id, assigned_to=user)
+            except BatchAssignment.DoesNotExist:
+                return JsonResponse({'error': 'Batch assignment not found'}, status=404)
+
+            runner = BatchRunner(
+                batch,
+                user,
+                data.get('capabilities', {}),
+                device_uuids=data.get('device_uuids'),
+                dynamic_inputs=data.get('dynamic_inputs')
+            ).start_in_background()
+            return JsonResponse({'success': True, **runner.status()}, status=202)
+        except RuntimeError as e:
+            return JsonResponse({'success': False, 'error': str(e)}, status=409)
+        except Exception as e:
+            return JsonResponse({'success': False, 'error': str(e)}, status=500)
+    return JsonResponse({'error': 'Method not allowed'}, status=405)
@@ -1,7 +1,158 @@
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
 from rest_framework.authentication import BaseAuthentication
 from rest_framework.exceptions import AuthenticationFailed
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+
+from .metrics import counter
+
+jwt_authentication = JWTAuthentication()
+
+
+def token_key(raw_token):
+    return hashlib.sha256(raw_token.encode()).hexdigest()
+
+
+class TokenCache:
+    """
+    Bounded LRU of validated access tokens: sha256(token) -> (user, validated
+    token, exp). A hit skips the signature check and the User query; entries
+    expire with the token's own `exp`. Logout revokes a token and saving or
+    deleting a User evicts all of that user's tokens. Every hit gets its own
+    copy of the cached User, so requests never share (or mutate) one instance.
+
+    A miss takes stamp() before loading the user and hands it to put(): if the
+    user was invalidated in between, the loaded user may be stale and put()
+    doesn't cache it.
+
+    With JWT_AUTH_SHARED_CACHE on, revocations and per-user versions are also
+    written to Django's cache and checked on every hit, so a logout or
+    deactivation handled by one worker process is seen by all of them.
+    """
+
+    def __init__(self, max_entries=None, shared=None):
+        self.max_entries = max_entries or getattr(settings, 'JWT_AUTH_CACHE_SIZE', 2048)
+        self.shared = getattr(settings, 'JWT_AUTH_SHARED_CACHE', False) if shared is None else shared
+        self._entries = OrderedDict()
+        self._revoked = {}  # token key -> exp, kept until the token would have expired anyway
+        self._generation = 0  # bumped by every invalidate_user()
+        self._lock = threading.Lock()
+        self.hits = counter('jwt_auth_cache_hits')
+        self.misses = counter('jwt_auth_cache_misses')
+        self.invalidations = counter('jwt_auth_cache_invalidations')
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry['exp'] > now:
+                self._entries.move_to_end(key)
+            elif entry is not None:
+                del self._entries[key]
+                entry = None
+        if entry is not None and self.shared and not self._still_valid_shared(key, entry):
+            self._discard(key)
+            entry = None
+        (self.misses if entry is None else self.hits).inc()
+        return (copy.copy(entry['user']), entry['token']) if entry is not None else None
+
+    def stamp(self, validated_token):
+        """Taken before the user of a missed token is loaded, see put()."""
+        with self._lock:
+            generation = self._generation
+        return generation, self._user_version(validated_token.get(api_settings.USER_ID_CLAIM))
+
+    def put(self, key, user, validated_token, stamp):
+        generation, user_version = stamp
+        exp = validated_token.get('exp') or time.time()
+        # The shared version read before the user was loaded: if another worker
+        # invalidated the user since, the first hit sees the newer version and drops this entry.
+        entry = {'user': copy.copy(user), 'token': validated_token, 'exp': exp, 'user_version': user_version}
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def is_revoked(self, key):
+        now = time.time()
+        with self._lock:
+            exp = self._revoked.get(key)
+            if exp is not None and exp <= now:
+                del self._revoked[key]
+                exp = None
+        if exp is None and self.shared:
+            return cache.get(f'jwt:revoked:{key}') is not None
+        return exp is not None
+
+    def revoke(self, raw_token):
+        """Logout: the token is rejected from now until it expires."""
+        key = token_key(raw_token)
+        try:
+            exp = jwt_authentication.get_validated_token(raw_token).get('exp')
+        except (InvalidToken, TokenError):
+            exp = None
+        self._discard(key)
+        if not exp:
+            return  # already invalid, nothing to remember
+        now = time.time()
+        with self._lock:
+            self._revoked = {k: e for k, e in self._revoked.items() if e > now}
+            self._revoked[key] = exp
+        if self.shared:
+            cache.set(f'jwt:revoked:{key}', 1, max(int(exp - now), 1))
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            self._generation += 1
+            keys = [key for key, entry in self._entries.items() if entry['user'].pk == user_id]
+            for key in keys:
+                del self._entries[key]
+        self.invalidations.inc(len(keys))
+        if self.shared:
+            cache.set(f'jwt:user:{user_id}', time.time_ns(), None)
+
+    def stats(self):
+        with self._lock:
+            size = len(self._entries)
+        lookups = self.hits.value + self.misses.value
+        return {
+            'size': size,
+            'hits': self.hits.value,
+            'misses': self.misses.value,
+            'invalidations': self.invalidations.value,
+            'hit_rate': round(self.hits.value / lookups, 4) if lookups else None,
+        }
+
+    def _discard(self, key):
+        with self._lock:
+            removed = self._entries.pop(key, None)
+        if removed is not None:
+            self.invalidations.inc()
+
+    def _user_version(self, user_id):
+        return cache.get(f'jwt:user:{user_id}') if self.shared else None
+
+    def _still_valid_shared(self, key, entry):
+        values = cache.get_many([f'jwt:revoked:{key}', f"jwt:user:{entry['user'].pk}"])
+        return (
+            f'jwt:revoked:{key}' not in values
+            and values.get(f"jwt:user:{entry['user'].pk}") == entry['user_version']
+        )
+
+
+token_cache = TokenCache()
+
 
 class JWTAuthenticationFromCookie(BaseAuthentication):
     def authenticate(self, request):
@@ -11,10 +162,19 @@ class JWTAuthenticationFromCookie(BaseAuthentication):
             print("None")
             return None
 
+        key = token_key(token)
+        cached = token_cache.get(key)
+        if cached is not None:
+            return cached
+        if token_cache.is_revoked(key):
+            return None
+
         try:
-            validated_token = JWTAuthentication().get_validated_token(token)
-            user = JWTAuthentication().get_user(validated_token)
-            return (user, validated_token)
+            validated_token = jwt_authentication.get_validated_token(token)
+            stamp = token_cache.stamp(validated_token)
+            user = jwt_authentication.get_user(validated_token)
         except (InvalidToken, TokenError):
             # raise AuthenticationFailed('Invalid or expired tokenkk')
             return None
+        token_cache.put(key, user, validated_token, stamp)
+        return (user, validated_token)
@@ -0,0 +1,45 @@
+from django.db import connection
+from django.db.models import F
+
+from .models import BatchAssignment, BatchAssignmentTestCase, CustomTestGroupItems, TestCase
+
+
+def batch_source_cases(customgroup=None, application=None, suite=None):
+    """
+    {case_id, position} rows of the test cases a batch runs, as a queryset
+    that is only ever used as a subquery. Custom groups keep their item order;
+    applications and suites go by test case id, like batch_test_case_ids().
+    """
+    if customgroup is not None:
+        cases = CustomTestGroupItems.objects.filter(custom_group=customgroup)
+        return cases.order_by().values(case_id=F('test_case_id'), position=F('id'))
+    if application is not None:
+        cases = TestCase.objects.filter(application=application)
+    else:
+        cases = TestCase.objects.filter(suite=suite)
+    return cases.order_by().values(case_id=F('id'), position=F('id'))
+
+
+def insert_batch_test_cases(batch_ids, source, now):
+    """
+    Creates the BatchAssignmentTestCase rows of every batch in batch_ids with a
+    single INSERT ... SELECT, so the test case ids never travel through Python.
+    Returns the number of rows inserted. Skips save() and signals.
+    """
+    qn = connection.ops.quote_name
+    meta = BatchAssignmentTestCase._meta
+    source_sql, source_params = source.query.sql_with_params()
+    batch_ids = list(batch_ids)
+    now = connection.ops.adapt_datetimefield_value(now)
+    sql = (
+        f"INSERT INTO {qn(meta.db_table)} "
+        f"({qn(meta.get_field('batch').column)}, {qn(meta.get_field('test_case').column)}, "
+        f"{qn(meta.get_field('created_at').column)}, {qn(meta.get_field('updated_at').column)}) "
+        f"SELECT b.{qn('id')}, src.{qn('case_id')}, %s, %s "
+        f"FROM {qn(BatchAssignment._meta.db_table)} b, ({source_sql}) src "
+        f"WHERE b.{qn('id')} IN ({', '.join(['%s'] * len(batch_ids))}) "
+        f"ORDER BY b.{qn('id')}, src.{qn('position')}"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [now, now, *source_params, *batch_ids])
+        return cursor.rowcount
@@ -0,0 +1,57 @@
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .dashboard_cache import invalidate_users
+from .models import BatchAssignment, BatchAssignmentTestCase
+
+# TestExecution.overallstatus values that count towards BatchAssignment.completedtestcases
+COMPLETED_STATUSES = ('passed', 'failed', 'completed')
+
+
+def batch_counts(batch_ids):
+    """
+    {batch_id: {'total': n, 'completed': n, 'passed': n}} for the given batches,
+    from their BatchAssignmentTestCase rows (the cases copied in at assignment
+    time). Each test case counts once, by the status of its latest execution
+    (BatchAssignmentTestCase.execution), so re-running a case doesn't add to it.
+    """
+    return {
+        row['batch_id']: row
+        for row in BatchAssignmentTestCase.objects.filter(batch_id__in=batch_ids).values('batch_id').annotate(
+            total=Count('id'),
+            completed=Count(
+                'test_case_id', distinct=True, filter=Q(execution__overallstatus__in=COMPLETED_STATUSES)
+            ),
+            passed=Count('test_case_id', distinct=True, filter=Q(execution__overallstatus='passed')),
+        )
+    }
+
+
+def recompute_batch_counters(batch_ids):
+    """
+    Recomputes completedtestcases / passedtestcases for the given batches from
+    the latest execution of each of their test cases: one grouped query plus
+    one UPDATE per batch.
+    """
+    batch_ids = [batch_id for batch_id in set(batch_ids) if batch_id]
+    if not batch_ids:
+        return {}
+
+    counts = batch_counts(batch_ids)
+    now = timezone.now()
+    for batch_id in batch_ids:
+        row = counts.get(batch_id, {'completed': 0, 'passed': 0})
+        BatchAssignment.objects.filter(id=batch_id).update(
+            completedtestcases=row['completed'],
+            passedtestcases=row['passed'],
+            updated_at=now
+        )
+    # Queryset updates skip the signals that normally drop cached dashboards.
+    user_ids = set()
+    for assigned_by_id, assigned_to_id in BatchAssignment.objects.filter(
+        id__in=batch_ids
+    ).values_list('assigned_by_id', 'assigned_to_id'):
+        user_ids.update((assigned_by_id, assigned_to_id))
+    transaction.on_commit(lambda: invalidate_users(user_ids))
+    return counts
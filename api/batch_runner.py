@@ -0,0 +1,229 @@
+import asyncio
+import logging
+import threading
+
+from channels.db import database_sync_to_async
+from django.utils import timezone
+
+from .appium_service import AppiumService
+from .batch_progress import recompute_batch_counters
+from .models import (
+    BatchAssignment, BatchAssignmentTestCase, CustomTestGroupItems, Device,
+    StepResult, TestExecution
+)
+from .session_pool import session_pool
+from .test_case_runner import apply_dynamic_inputs, load_step_payloads_for, run_steps
+
+logger = logging.getLogger(__name__)
+
+ACTUAL_INPUT_MAX_LENGTH = StepResult._meta.get_field('actual_input').max_length
+
+
+class BatchRunner:
+    """
+    Runs every test case of a BatchAssignment on the server, spread over all
+    connected devices. Each device pulls the next test case from a shared queue,
+    so faster phones simply take more cases. TestExecution / StepResult rows are
+    written as each step finishes.
+    """
+
+    _runs = {}
+    _runs_lock = threading.Lock()
+
+    def __init__(self, batch, user, capabilities, device_uuids=None, dynamic_inputs=None, pool=None):
+        self.batch = batch
+        self.user = user
+        self.capabilities = capabilities or {}
+        self.device_uuids = device_uuids
+        self.dynamic_inputs = dynamic_inputs or {}
+        self.pool = pool or session_pool
+        self.total = 0
+        self.completed = 0
+        self.passed = 0
+        self.devices = []
+        self.errors = []
+        self.state = 'pending'
+        self.started_at = None
+        self.finished_at = None
+
+    @classmethod
+    def get_run(cls, batch_id):
+        with cls._runs_lock:
+            return cls._runs.get(batch_id)
+
+    def start_in_background(self):
+        """Registers the run and executes it on its own event loop in a daemon thread."""
+        with self._runs_lock:
+            current = self._runs.get(self.batch.id)
+            if current and current.state in ('pending', 'running'):
+                raise RuntimeError(f'Batch {self.batch.id} is already running')
+            self._runs[self.batch.id] = self
+        thread = threading.Thread(target=lambda: asyncio.run(self.run()), daemon=True)
+        thread.start()
+        return self
+
+    def status(self):
+        return {
+            'batch_id': self.batch.id,
+            'state': self.state,
+            'total_test_cases': self.total,
+            'completed_test_cases': self.completed,
+            'passed_test_cases': self.passed,
+            'devices': self.devices,
+            'errors': self.errors,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+
+    async def run(self):
+        self.state = 'running'
+        self.started_at = timezone.now()
+        try:
+            plan = await database_sync_to_async(self._load_plan)()
+            self.total = len(plan)
+
+            devices = (await AppiumService().get_connected_devices())['devices']
+            if self.device_uuids:
+                devices = [d for d in devices if d['device_uuid'] in self.device_uuids]
+            if not devices:
+                raise RuntimeError('No connected devices available for this batch')
+            self.devices = [d['device_uuid'] for d in devices]
+
+            queue = asyncio.Queue()
+            for item in plan:
+                queue.put_nowait(item)
+
+            await database_sync_to_async(self._mark_batch_started)()
+            await asyncio.gather(*(self._device_worker(device, queue) for device in devices))
+            if not queue.empty():
+                self.errors.append(f'{queue.qsize()} test case(s) were not run: no device could start a session')
+            self.state = 'finished'
+        except Exception as e:
+            logger.error(f'Batch {self.batch.id} run failed: {str(e)}', exc_info=True)
+            self.errors.append(str(e))
+            self.state = 'failed'
+        finally:
+            self.finished_at = timezone.now()
+            await database_sync_to_async(self._finish_batch)()
+
+    async def _device_worker(self, device, queue):
+        udid = device['device_uuid']
+        capabilities = {**self.capabilities, 'appium:udid': udid}
+        try:
+            # Never borrow the tester's interactive session: the worker ends its session when done.
+            session = await self.pool.acquire(capabilities, user_id=self.user.id, reuse=False)
+        except Exception as e:
+            message = f'Could not start a session on {udid}: {str(e)}'
+            logger.warning(message)
+            self.errors.append(message)
+            return
+
+        try:
+            device_row = await database_sync_to_async(self._get_device)(device)
+            while True:
+                try:
+                    test_case, steps = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                await self._run_test_case(session, device_row, test_case, steps)
+        finally:
+            try:
+                await self.pool.release(session.session_id, user_id=self.user.id)
+            except Exception as e:
+                logger.warning(f'Failed to release session on {udid}: {str(e)}')
+
+    async def _run_test_case(self, session, device_row, test_case, steps):
+        await session.service._socket_emit('log', f'[{session.udid}] Running test case {test_case.name}')
+        execution = await database_sync_to_async(self._start_execution)(test_case, device_row)
+        steps = apply_dynamic_inputs(
+            [dict(step) for step in steps],
+            self.dynamic_inputs.get(str(test_case.id), self.dynamic_inputs.get(test_case.id))
+        )
+
+        async def save_step(step, outcome):
+            await database_sync_to_async(self._save_step_result)(execution, outcome)
+
+        try:
+            passed, _ = await run_steps(
+                self.pool, session.session_id, steps, on_step=save_step, user_id=self.user.id
+            )
+        except Exception as e:
+            logger.error(f'Test case {test_case.id} aborted on {session.udid}: {str(e)}')
+            self.errors.append(f'Test case {test_case.id}: {str(e)}')
+            passed = False
+
+        await database_sync_to_async(self._finish_execution)(execution, 'passed' if passed else 'failed')
+        self.completed += 1
+        if passed:
+            self.passed += 1
+
+    def _load_plan(self):
+        """(test_case, step payloads) pairs in the order the batch lists them."""
+        batch = self.batch
+        if batch.customgroup_id:
+            items = CustomTestGroupItems.objects.filter(
+                custom_group_id=batch.customgroup_id
+            ).select_related('test_case').order_by('order_ingroup')
+            test_cases = list({item.test_case_id: item.test_case for item in items}.values())
+        else:
+            test_cases = list(batch.test_cases.order_by('suite_id', 'name'))
+        steps = load_step_payloads_for(test_cases)
+        return [(test_case, steps[test_case.id]) for test_case in test_cases]
+
+    def _get_device(self, device):
+        device_row, _ = Device.objects.get_or_create(
+            device_uuid=device['device_uuid'],
+            defaults={
+                'device_name': device['device_name'],
+                'platform': device['platform'],
+                'os_version': device['os_version']
+            }
+        )
+        return device_row
+
+    def _mark_batch_started(self):
+        BatchAssignment.objects.filter(id=self.batch.id).update(status='in_progress')
+
+    def _start_execution(self, test_case, device_row):
+        execution = TestExecution.objects.create(
+            test_case=test_case,
+            batch=self.batch,
+            executed_by=self.user,
+            executed_device=device_row,
+            overallstatus='in_progress'
+        )
+        BatchAssignmentTestCase.objects.filter(
+            batch=self.batch, test_case=test_case
+        ).update(execution=execution)
+        # The re-run replaces the case's earlier result in the batch counters.
+        recompute_batch_counters([self.batch.id])
+        return execution
+
+    def _save_step_result(self, execution, outcome):
+        actual_input = outcome['actual_input']
+        StepResult.objects.update_or_create(
+            test_execution=execution,
+            test_step_id=outcome['test_step_id'],
+            defaults={
+                'actual_id': outcome['actual_id'],
+                'actual_input': str(actual_input)[:ACTUAL_INPUT_MAX_LENGTH] if actual_input is not None else None,
+                'status': outcome['status'],
+                'duration': outcome['duration'],
+                'time_start': outcome['time_start'],
+                'time_end': outcome['time_end'],
+                'log_message': outcome['log_message'],
+                'error': outcome['error'],
+            }
+        )
+
+    def _finish_execution(self, execution, overall_status):
+        execution.overallstatus = overall_status
+        execution.save(update_fields=['overallstatus', 'updated_at'])
+
+    def _finish_batch(self):
+        # completed/passed counters were kept current by api.signals as executions finished.
+        all_passed = self.total and self.passed >= self.total and not self.errors
+        BatchAssignment.objects.filter(id=self.batch.id).update(
+            status='passed' if all_passed else 'failed',
+            updated_at=timezone.now()
+        )
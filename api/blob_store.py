@@ -0,0 +1,154 @@
+import base64
+import binascii
+import hashlib
+import io
+import logging
+import os
+import tempfile
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+try:
+    from PIL import Image
+except ImportError:  # thumbnails are skipped without Pillow
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+HASH_LENGTH = 64  # sha256 hex digest
+
+
+def content_type_for(data):
+    if data.startswith(b'\x89PNG'):
+        return 'image/png'
+    if data.startswith(b'\xff\xd8'):
+        return 'image/jpeg'
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'image/webp'
+    return 'application/octet-stream'
+
+
+def is_blob_hash(value):
+    return (
+        isinstance(value, str) and len(value) == HASH_LENGTH
+        and all(c in '0123456789abcdef' for c in value)
+    )
+
+
+class BlobStore:
+    """
+    Content-addressed storage: blobs are written once under the sha256 of their
+    bytes, so identical screenshots are stored a single time. Subclass and point
+    settings.BLOB_STORE_BACKEND at it to keep blobs somewhere other than local disk.
+    """
+
+    def exists(self, key, variant='original'):
+        raise NotImplementedError
+
+    def save(self, key, data, variant='original'):
+        raise NotImplementedError
+
+    def open(self, key, variant='original'):
+        """Binary file object for the blob; raises FileNotFoundError if missing."""
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+
+class FileSystemBlobStore(BlobStore):
+    """Blobs under <root>/<variant>/ab/cd/<hash>, written atomically via a temp file + rename."""
+
+    def __init__(self, root=None):
+        self.root = str(root or os.path.join(settings.BASE_DIR, 'blobs'))
+
+    def path(self, key, variant='original'):
+        return os.path.join(self.root, variant, key[:2], key[2:4], key)
+
+    def exists(self, key, variant='original'):
+        return os.path.exists(self.path(key, variant))
+
+    def save(self, key, data, variant='original'):
+        path = self.path(key, variant)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def open(self, key, variant='original'):
+        return open(self.path(key, variant), 'rb')
+
+    def delete(self, key):
+        for variant in ('original', 'thumbnail'):
+            try:
+                os.remove(self.path(key, variant))
+            except FileNotFoundError:
+                pass
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_blob_store():
+    """Process-wide store built from settings.BLOB_STORE_BACKEND / BLOB_STORE_OPTIONS."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            backend = getattr(settings, 'BLOB_STORE_BACKEND', 'api.blob_store.FileSystemBlobStore')
+            _store = import_string(backend)(**getattr(settings, 'BLOB_STORE_OPTIONS', {}))
+        return _store
+
+
+def make_thumbnail(data):
+    """JPEG thumbnail bytes, or None if Pillow is missing or the data is not an image."""
+    if Image is None:
+        return None
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image.thumbnail(getattr(settings, 'SCREENSHOT_THUMBNAIL_SIZE', (240, 480)))
+            output = io.BytesIO()
+            image.convert('RGB').save(output, format='JPEG', quality=70)
+            return output.getvalue()
+    except Exception as e:
+        logger.warning(f'Could not create screenshot thumbnail: {str(e)}')
+        return None
+
+
+def store_screenshot(value, store=None):
+    """
+    Stores a base64 (optionally data: URI) screenshot and returns its hash.
+    Returns None for empty values; a value that is already a stored hash is
+    passed through, so re-uploaded results don't create anything new.
+    """
+    if not value:
+        return None
+    store = store or get_blob_store()
+    if is_blob_hash(value) and store.exists(value):
+        return value
+
+    if isinstance(value, str):
+        if value.startswith('data:') and ',' in value:
+            value = value.split(',', 1)[1]
+        try:
+            data = base64.b64decode(value)
+        except (binascii.Error, ValueError):
+            data = value.encode()
+    else:
+        data = bytes(value)
+
+    key = hashlib.sha256(data).hexdigest()
+    if not store.exists(key):
+        store.save(key, data)
+        thumbnail = make_thumbnail(data)
+        if thumbnail:
+            store.save(key, thumbnail, variant='thumbnail')
+    return key
@@ -2,7 +2,9 @@
 import json
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
+from urllib.parse import parse_qs
 from .appium_service import AppiumService
+from .log_stream import GLOBAL_GROUP, log_aggregator, session_group
 
 # class AppiumConsumer(AsyncWebsocketConsumer):
 #     async def connect(self):
@@ -28,10 +30,24 @@ from .appium_service import AppiumService
 
 # api/consumers.py
 class AppiumConsumer(AsyncWebsocketConsumer):
+    """
+    ws/appium/<session_id>/ (or ws/appium/?session=<session_id>) streams the logs
+    and step results of one Appium session as `log_batch` frames. Log lines carry
+    sequence numbers (first_seq + position); a client that reconnects passes
+    ?last_seq=<n> or sends {"action": "replay", "last_seq": n} to get what it missed.
+    Plain ws/appium/ is the old global feed: every line, one `log` frame per batch.
+    """
+
     async def connect(self):
+        query = parse_qs(self.scope.get('query_string', b'').decode())
+        session_id = self.scope['url_route']['kwargs'].get('session_id')
+        if not session_id:
+            session_id = (query.get('session') or [None])[0]
+        self.session_id = session_id
+
         # The group name we will send messages to.
-        self.room_group_name = "appium"
-        
+        self.room_group_name = session_group(session_id) if session_id else GLOBAL_GROUP
+
         # Join the room group
         await self.channel_layer.group_add(
             self.room_group_name,
@@ -39,6 +55,10 @@ class AppiumConsumer(AsyncWebsocketConsumer):
         )
         await self.accept()
 
+        last_seq = (query.get('last_seq') or [None])[0]
+        if session_id and last_seq is not None:
+            await self.replay(last_seq)
+
     async def disconnect(self, close_code):
         # Leave the room group
         await self.channel_layer.group_discard(
@@ -46,9 +66,27 @@ class AppiumConsumer(AsyncWebsocketConsumer):
             self.channel_name
         )
 
-    # This method is not used for backend-to-frontend logs, but is good to have.
     async def receive(self, text_data):
-        pass # We are not expecting messages from the client.
+        try:
+            data = json.loads(text_data)
+        except json.JSONDecodeError:
+            return
+        if isinstance(data, dict) and data.get('action') == 'replay' and self.session_id:
+            await self.replay(data.get('last_seq', 0))
+
+    async def replay(self, last_seq):
+        try:
+            last_seq = int(last_seq)
+        except (TypeError, ValueError):
+            return
+        lines, missed = log_aggregator.history.since(self.session_id, last_seq)
+        await self.send(text_data=json.dumps({
+            'event': 'log_replay',
+            'session_id': self.session_id,
+            'first_seq': lines[0][0] if lines else None,
+            'messages': [message for _, message in lines],
+            'missed': missed  # lines after last_seq that were already evicted
+        }))
 
     async def log_message(self, event):
         message_data = event['message']
@@ -56,4 +94,30 @@ class AppiumConsumer(AsyncWebsocketConsumer):
         await self.send(text_data=json.dumps({
             'event': 'log', 
             'message': message_data
-        }))
\ No newline at end of file
+        }))
+
+    async def log_batch(self, event):
+        if self.session_id:
+            await self.send(text_data=json.dumps({
+                'event': 'log_batch',
+                'session_id': event['session_id'],
+                'first_seq': event['first_seq'],
+                'messages': event['messages'],
+                'dropped': event['dropped']
+            }))
+        else:
+            # Old clients only know single `log` events; one frame per batch still.
+            messages = list(event['messages'])
+            if event['dropped']:
+                messages.append(f"... {event['dropped']} log line(s) skipped, the log viewer could not keep up")
+            await self.send(text_data=json.dumps({
+                'event': 'log',
+                'message': '\n'.join(messages)
+            }))
+
+    async def step_result(self, event):
+        await self.send(text_data=json.dumps({
+            'event': 'step_result',
+            'session_id': event.get('session_id'),
+            'result': event['result']
+        }))
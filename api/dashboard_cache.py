@@ -0,0 +1,61 @@
+import functools
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+from .metrics import counter
+
+# Every user has a version stamp; cached dashboard pages embed it in their key,
+# so bumping the stamp (api.signals does it whenever one of the user's
+# assignments or executions changes) makes all their cached pages unreachable.
+VERSION_KEY = 'dashboard:version:{user_id}'
+
+hits = counter('dashboard_cache_hits')
+misses = counter('dashboard_cache_misses')
+
+
+def _user_version(user_id):
+    key = VERSION_KEY.format(user_id=user_id)
+    version = cache.get(key)
+    if version is None:
+        version = time.time_ns()
+        cache.add(key, version, None)
+        version = cache.get(key, version)
+    return version
+
+
+def invalidate_users(user_ids):
+    """Drops every cached dashboard page of these users."""
+    version = time.time_ns()
+    cache.set_many({VERSION_KEY.format(user_id=user_id): version for user_id in set(user_ids) if user_id}, None)
+
+
+def cached_dashboard(name):
+    """
+    Caches a dashboard GET response per user and query string for
+    DASHBOARD_CACHE_TTL seconds. Only 200 responses are stored.
+    """
+    def decorator(get):
+        @functools.wraps(get)
+        def wrapper(self, request, *args, **kwargs):
+            ttl = getattr(settings, 'DASHBOARD_CACHE_TTL', 30)
+            if not ttl:
+                return get(self, request, *args, **kwargs)
+
+            query = hashlib.md5(request.META.get('QUERY_STRING', '').encode()).hexdigest()
+            key = f'dashboard:{name}:{request.user.id}:{_user_version(request.user.id)}:{query}'
+            data = cache.get(key)
+            if data is not None:
+                hits.inc()
+                return Response(data, status=200)
+
+            misses.inc()
+            response = get(self, request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(key, response.data, ttl)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,18 @@
+from django.db.backends.mysql import base
+
+from api.db_pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    """django.db.backends.mysql with pooled connections (api.db_pool)."""
+
+    def pool_ping(self, raw):
+        # COM_PING: one round trip, no statement to parse.
+        raw.ping()
+
+    def pool_reset(self, raw):
+        raw.rollback()
+        # COM_CHANGE_USER to the same account resets the session: user
+        # variables, temporary tables and SET session variables are dropped.
+        settings_dict = self.settings_dict
+        raw.change_user(settings_dict['USER'], settings_dict['PASSWORD'], settings_dict['NAME'])
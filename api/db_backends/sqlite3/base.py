@@ -0,0 +1,7 @@
+from django.db.backends.sqlite3 import base
+
+from api.db_pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    """django.db.backends.sqlite3 with pooled connections (api.db_pool), for MB_AUTOMATION_DB=sqlite."""
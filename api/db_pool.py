@@ -0,0 +1,277 @@
+import logging
+import threading
+import time
+import weakref
+from collections import deque
+from functools import partial
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.utils import OperationalError
+
+from .metrics import counter, histogram
+
+logger = logging.getLogger(__name__)
+
+# Under ASGI every request runs its sync code in a thread of its own
+# (asgiref's ThreadSensitiveContext) and Django keeps one connection per
+# thread, so CONN_MAX_AGE can't carry a connection over to the next request:
+# each request would open a new MySQL connection. The pooled engines in
+# api/db_backends keep the raw driver connections in a process-wide pool
+# instead. Django still "closes" the connection at the end of every request
+# (CONN_MAX_AGE = 0) and every database_sync_to_async call, which now hands it
+# back to the pool, and the next thread checks out an already open one. The
+# pooled engines are opt-in (see DB_POOL in settings).
+DEFAULT_POOL_OPTIONS = {
+    'SIZE': 10,  # idle connections kept open
+    'MAX_CONNECTIONS': None,  # open connections at most, further checkouts wait (None: no limit)
+    'TIMEOUT': 10,  # seconds to wait for a free connection
+    'HEALTH_CHECK_INTERVAL': 30,  # connections idle longer than this are pinged before reuse
+    'MAX_LIFETIME': 3600,  # seconds before a connection is replaced (keep below MySQL's wait_timeout)
+}
+
+opened = counter('db_pool_connections_opened')
+closed = counter('db_pool_connections_closed')
+checkouts = counter('db_pool_checkouts')
+health_check_failures = counter('db_pool_health_check_failures')
+lost = counter('db_pool_connections_lost')
+wait_seconds = histogram('db_pool_wait_seconds', buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10))
+
+
+class PooledConnection:
+    """A raw driver connection and the times the pool needs to judge it."""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.created_at = time.monotonic()
+        self.returned_at = self.created_at
+
+
+class ConnectionPool:
+    """
+    Open connections of one database alias, shared by all threads of the
+    process. Idle connections are reused most recently returned first, so the
+    ones beyond the load drift to the end and get trimmed at SIZE. `params`
+    are the connection settings the connections were opened with; a pool is
+    retired once they change.
+    """
+
+    def __init__(self, alias, params=None, size=10, max_connections=None, timeout=10, health_check_interval=30,
+                 max_lifetime=3600):
+        self.alias = alias
+        self.params = params
+        self.size = size
+        self.max_connections = None if max_connections is None else max(max_connections, size)
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self.max_lifetime = max_lifetime
+        self._idle = deque()
+        self._in_use = 0
+        self._retired = False
+        self._condition = threading.Condition()
+
+    def checkout(self, connect, ping):
+        """
+        (PooledConnection, reused) for the caller, opening a connection with
+        connect() when none is idle. Connections idle for longer than
+        health_check_interval are checked with ping(raw) first.
+        """
+        started = time.monotonic()
+        deadline = started + self.timeout
+        with self._condition:
+            while not self._idle and self.max_connections is not None and self._in_use >= self.max_connections:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise OperationalError(
+                        f'No free connection in the {self.alias} pool after {self.timeout}s '
+                        f'({self.max_connections} in use)'
+                    )
+                self._condition.wait(remaining)
+            pooled = self._idle.pop() if self._idle else None
+            self._in_use += 1
+        wait_seconds.observe(time.monotonic() - started)
+        checkouts.inc()
+
+        try:
+            while pooled is not None:
+                if self._healthy(pooled, ping):
+                    return pooled, True
+                self._close(pooled)
+                with self._condition:
+                    pooled = self._idle.pop() if self._idle else None
+            pooled = PooledConnection(connect())
+            opened.inc()
+            return pooled, False
+        except BaseException:
+            self.forget()
+            raise
+
+    def checkin(self, pooled, reusable=True):
+        """Takes a connection back; it is closed instead if it isn't reusable, too old or SIZE is reached."""
+        now = time.monotonic()
+        with self._condition:
+            self._in_use -= 1
+            if (reusable and not self._retired and now - pooled.created_at < self.max_lifetime
+                    and len(self._idle) < self.size):
+                pooled.returned_at = now
+                self._idle.append(pooled)
+                pooled = None
+            self._condition.notify()
+        if pooled is not None:
+            self._close(pooled)
+
+    def forget(self):
+        """Frees the slot of a checked out connection that won't come back."""
+        with self._condition:
+            self._in_use -= 1
+            self._condition.notify()
+
+    def _healthy(self, pooled, ping):
+        now = time.monotonic()
+        if now - pooled.created_at >= self.max_lifetime:
+            return False
+        if now - pooled.returned_at < self.health_check_interval:
+            return True
+        try:
+            ping(pooled.raw)
+            return True
+        except Exception as e:
+            health_check_failures.inc()
+            logger.info(f'Dropping a dead {self.alias} connection: {str(e)}')
+            return False
+
+    def _close(self, pooled):
+        closed.inc()
+        try:
+            pooled.raw.close()
+        except Exception:
+            pass
+
+    def retire(self):
+        """Closes the idle connections; those still checked out are closed when they come back."""
+        with self._condition:
+            self._retired = True
+        return self.close_idle()
+
+    def close_idle(self):
+        with self._condition:
+            idle, self._idle = list(self._idle), deque()
+        for pooled in idle:
+            self._close(pooled)
+        return len(idle)
+
+    def stats(self):
+        with self._condition:
+            return {
+                'size': self.size,
+                'max_connections': self.max_connections,
+                'idle': len(self._idle),
+                'in_use': self._in_use,
+            }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _connection_params(settings_dict):
+    """What a connection was opened with; a change (e.g. the test runner swapping NAME) needs new connections."""
+    return repr([
+        settings_dict.get(key) for key in ('ENGINE', 'NAME', 'USER', 'PASSWORD', 'HOST', 'PORT', 'OPTIONS', 'TIME_ZONE')
+    ])
+
+
+def get_pool(alias, settings_dict):
+    params = _connection_params(settings_dict)
+    with _pools_lock:
+        pool = _pools.get(alias)
+        if pool is not None and pool.params != params:
+            pool.retire()
+            pool = None
+        if pool is None:
+            if settings_dict.get('CONN_MAX_AGE') != 0:
+                raise ImproperlyConfigured(
+                    f"DATABASES['{alias}'] uses a pooled engine, set its CONN_MAX_AGE to 0 so connections "
+                    f"go back to the pool at the end of each request"
+                )
+            options = {**DEFAULT_POOL_OPTIONS, **settings_dict.get('POOL', {})}
+            pool = _pools[alias] = ConnectionPool(
+                alias,
+                params=params,
+                size=options['SIZE'],
+                max_connections=options['MAX_CONNECTIONS'],
+                timeout=options['TIMEOUT'],
+                health_check_interval=options['HEALTH_CHECK_INTERVAL'],
+                max_lifetime=options['MAX_LIFETIME'],
+            )
+        return pool
+
+
+def _owner_collected(pool):
+    lost.inc()
+    pool.forget()
+
+
+def pool_stats():
+    """{alias: stats} of every pool created in this process (for MetricsView)."""
+    with _pools_lock:
+        pools = dict(_pools)
+    return {alias: pool.stats() for alias, pool in pools.items()}
+
+
+class PooledDatabaseWrapperMixin:
+    """
+    Mixed into a Django DatabaseWrapper (see api/db_backends): connections
+    come from and go back to the alias's ConnectionPool instead of being
+    opened and closed. Options go in DATABASES[alias]['POOL'].
+
+    A connection's session is reset before it goes back (pool_reset) and
+    init_connection_state runs on every checkout, so nothing a request set up
+    on its connection reaches the next one.
+    """
+
+    _pooled = None
+    _pooled_from = None
+    _pool_finalizer = None
+
+    @property
+    def pool(self):
+        return get_pool(self.alias, self.settings_dict)
+
+    def get_new_connection(self, conn_params):
+        pool = self.pool
+        pooled, _ = pool.checkout(partial(super().get_new_connection, conn_params), self.pool_ping)
+        self._pooled, self._pooled_from = pooled, pool
+        # Threads that end without closing their connection (it isn't returned,
+        # the driver closes it when the wrapper is collected) mustn't hold a slot.
+        self._pool_finalizer = weakref.finalize(self, _owner_collected, pool)
+        return pooled.raw
+
+    def pool_ping(self, raw):
+        cursor = raw.cursor()
+        try:
+            cursor.execute('SELECT 1')
+            cursor.fetchall()
+        finally:
+            cursor.close()
+
+    def pool_reset(self, raw):
+        """Clears the session state a request may have left on the connection."""
+        raw.rollback()
+
+    def _close(self):
+        pooled, self._pooled = self._pooled, None
+        pool, self._pooled_from = self._pooled_from, None
+        if pooled is None:
+            return super()._close()
+        self._pool_finalizer.detach()
+        # A transaction that is still open or a broken connection can't be handed to the next request.
+        reusable = not self.in_atomic_block and self.get_autocommit() and not (
+            self.errors_occurred and not self.is_usable()
+        )
+        if reusable:
+            try:
+                self.pool_reset(pooled.raw)
+            except Exception as e:
+                logger.info(f'Not reusing a {self.alias} connection that failed to reset: {str(e)}')
+                reusable = False
+        pool.checkin(pooled, reusable=reusable)
@@ -0,0 +1,176 @@
+import asyncio
+import logging
+import subprocess
+import threading
+import time
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Device
+
+logger = logging.getLogger(__name__)
+
+# All three props in one `adb shell` round trip, one value per line.
+GETPROP_COMMAND = 'getprop ro.build.version.release; getprop ro.product.model; getprop ro.product.manufacturer'
+
+
+class DeviceRegistry:
+    """
+    Cached inventory of the devices adb can see. Devices are queried concurrently
+    with asyncio subprocesses, the list is kept for ADB_DEVICE_CACHE_TTL seconds
+    (or until `adb track-devices` reports a change when ADB_TRACK_DEVICES is on),
+    and every refresh is upserted into the Device table.
+    """
+
+    def __init__(self, adb_path=None, ttl=None):
+        self.adb_path = adb_path or getattr(settings, 'ADB_PATH', '/usr/bin/adb')
+        self.ttl = ttl if ttl is not None else getattr(settings, 'ADB_DEVICE_CACHE_TTL', 5)
+        self._devices = None
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+        self._in_flight = {}  # event loop -> refresh task, so concurrent callers share one refresh
+        self._tracker = None
+
+    async def _run(self, *args):
+        try:
+            process = await asyncio.create_subprocess_exec(
+                self.adb_path, *args,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            stdout, stderr = await process.communicate()
+            return process.returncode, stdout.decode(errors='replace'), stderr.decode(errors='replace')
+        except NotImplementedError:
+            # Event loops without subprocess support (e.g. SelectorEventLoop on Windows).
+            result = await asyncio.to_thread(
+                subprocess.run, [self.adb_path, *args], capture_output=True, text=True
+            )
+            return result.returncode, result.stdout, result.stderr
+
+    async def _list_udids(self):
+        returncode, stdout, stderr = await self._run('devices')
+        if returncode != 0:
+            raise RuntimeError(f'Failed to get devices: {stderr}')
+        udids = []
+        for line in stdout.split('\n'):
+            line = line.strip()
+            if line and not line.startswith('List of devices') and line.endswith('device'):
+                udids.append(line.split('\t')[0])
+        return udids
+
+    async def _describe(self, udid):
+        try:
+            returncode, stdout, _ = await self._run('-s', udid, 'shell', GETPROP_COMMAND)
+            props = stdout.replace('\r', '').split('\n') if returncode == 0 else []
+            version, model, manufacturer = (props + ['', '', ''])[:3]
+            version = version.strip() or 'Unknown'
+            model = model.strip() or 'Unknown'
+            manufacturer = manufacturer.strip().lower() or 'unknown'
+
+            platform = 'Android'
+            if 'apple' in manufacturer or (len(udid) == 40 and all(c in 'abcdef0123456789' for c in udid.lower())):
+                platform = 'iOS'
+
+            return {
+                'device_uuid': udid,
+                'device_name': model if model != 'Unknown' else f'Device {udid[:8]}',
+                'os_version': version,
+                'platform': platform
+            }
+        except Exception as e:
+            logger.error(f'Error getting device details for {udid}: {str(e)}')
+            return {
+                'device_uuid': udid,
+                'device_name': f'Device {udid[:8]}',
+                'os_version': 'Unknown',
+                'platform': 'Unknown'
+            }
+
+    async def refresh(self):
+        udids = await self._list_udids()
+        devices = list(await asyncio.gather(*(self._describe(udid) for udid in udids)))
+        try:
+            # database_sync_to_async hands the connection back to the pool (api.db_pool) afterwards.
+            await database_sync_to_async(self._upsert_devices)(devices)
+        except Exception as e:
+            logger.error(f'Failed to store devices: {str(e)}')
+        with self._lock:
+            self._devices = devices
+            self._fetched_at = time.monotonic()
+        return devices
+
+    async def get_devices(self, force=False):
+        self._ensure_tracking()
+        with self._lock:
+            if not force and self._devices is not None and time.monotonic() - self._fetched_at < self.ttl:
+                return list(self._devices)
+
+        loop = asyncio.get_running_loop()
+        task = self._in_flight.get(loop)
+        if task is None:
+            task = loop.create_task(self.refresh())
+            self._in_flight[loop] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(loop, None))
+        return list(await asyncio.shield(task))
+
+    def invalidate(self):
+        with self._lock:
+            self._fetched_at = 0.0
+
+    def _upsert_devices(self, devices):
+        """Insert new devices and refresh changed ones, one row per device_uuid."""
+        existing = {}
+        for row in Device.objects.filter(device_uuid__in=[d['device_uuid'] for d in devices]).order_by('id'):
+            existing.setdefault(row.device_uuid, row)
+
+        now = timezone.now()
+        to_create, to_update = [], []
+        for device in devices:
+            row = existing.get(device['device_uuid'])
+            if row is None:
+                to_create.append(Device(**device))
+                continue
+            if device['os_version'] == 'Unknown':
+                continue  # keep what we knew if adb shell failed this time
+            if (row.device_name, row.os_version, row.platform) != (device['device_name'], device['os_version'], device['platform']):
+                row.device_name = device['device_name']
+                row.os_version = device['os_version']
+                row.platform = device['platform']
+                row.updated_at = now
+                to_update.append(row)
+
+        if to_create:
+            # device_uuid is unique: a concurrent refresh that inserted the device first wins.
+            Device.objects.bulk_create(to_create, ignore_conflicts=True)
+        if to_update:
+            Device.objects.bulk_update(to_update, ['device_name', 'os_version', 'platform', 'updated_at'])
+
+    def _ensure_tracking(self):
+        if self._tracker is not None or not getattr(settings, 'ADB_TRACK_DEVICES', False):
+            return
+        with self._lock:
+            if self._tracker is None:
+                self._tracker = threading.Thread(target=lambda: asyncio.run(self._track()), daemon=True)
+                self._tracker.start()
+
+    async def _track(self):
+        """Invalidates the cache whenever `adb track-devices` reports a change; restarts if adb exits."""
+        while True:
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    self.adb_path, 'track-devices',
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.DEVNULL
+                )
+                while await process.stdout.read(4096):
+                    self.invalidate()
+                await process.wait()
+            except Exception as e:
+                logger.warning(f'adb track-devices stopped: {str(e)}')
+            self.invalidate()
+            await asyncio.sleep(5)
+
+
+device_registry = DeviceRegistry()
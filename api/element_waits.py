@@ -0,0 +1,105 @@
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class WaitStrategy:
+    """
+    Decides how long to sleep between "find and check readiness" polls while
+    waiting for an element. Strategies get feedback through record() so they can
+    learn how long a locator usually takes to become ready.
+    """
+
+    def intervals(self, key):
+        """Yields successive sleep intervals (seconds) for one wait on `key`."""
+        raise NotImplementedError
+
+    def record(self, key, elapsed):
+        pass
+
+
+class FixedIntervalWait(WaitStrategy):
+    """The original behaviour: poll every `interval` seconds."""
+
+    def __init__(self, interval=0.5):
+        self.interval = interval
+
+    def intervals(self, key):
+        while True:
+            yield self.interval
+
+
+class ExponentialBackoffWait(WaitStrategy):
+    """Polls quickly at first so fast screens are not delayed, then backs off to max_interval."""
+
+    def __init__(self, initial=0.05, factor=2.0, max_interval=1.0):
+        self.initial = initial
+        self.factor = factor
+        self.max_interval = max_interval
+
+    def intervals(self, key):
+        interval = self.initial
+        while True:
+            yield interval
+            interval = min(interval * self.factor, self.max_interval)
+
+
+class AdaptiveWait(ExponentialBackoffWait):
+    """
+    Exponential backoff that remembers how long each locator usually takes to be
+    ready (EWMA). For a locator known to take ~2 s it sleeps most of that
+    time in one go instead of polling through it, and then backs off as usual.
+    """
+
+    def __init__(self, initial=0.05, factor=2.0, max_interval=1.0, alpha=0.3, max_keys=5000):
+        super().__init__(initial, factor, max_interval)
+        self.alpha = alpha
+        self.max_keys = max_keys
+        self._expected = OrderedDict()
+        self._lock = threading.Lock()
+
+    def expected(self, key):
+        with self._lock:
+            return self._expected.get(key)
+
+    def intervals(self, key):
+        expected = self.expected(key)
+        if expected and expected > self.initial:
+            # Sleep through most of the usual delay, then resume fine-grained polling.
+            yield expected * 0.8
+        yield from super().intervals(key)
+
+    def record(self, key, elapsed):
+        with self._lock:
+            previous = self._expected.pop(key, None)
+            self._expected[key] = elapsed if previous is None else (
+                self.alpha * elapsed + (1 - self.alpha) * previous
+            )
+            while len(self._expected) > self.max_keys:
+                self._expected.popitem(last=False)
+
+
+WAIT_STRATEGIES = {
+    'fixed': FixedIntervalWait,
+    'exponential': ExponentialBackoffWait,
+    'adaptive': AdaptiveWait,
+}
+
+_strategy = None
+_strategy_lock = threading.Lock()
+
+
+def get_wait_strategy():
+    """
+    Process-wide strategy named by settings.APPIUM_WAIT_STRATEGY: one of
+    WAIT_STRATEGIES or a dotted path to a WaitStrategy subclass.
+    """
+    global _strategy
+    with _strategy_lock:
+        if _strategy is None:
+            name = getattr(settings, 'APPIUM_WAIT_STRATEGY', 'adaptive')
+            strategy_class = WAIT_STRATEGIES.get(name) or import_string(name)
+            _strategy = strategy_class(**getattr(settings, 'APPIUM_WAIT_STRATEGY_OPTIONS', {}))
+        return _strategy
@@ -0,0 +1,124 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+
+from .metrics import counter
+from .models import TestCase, TestStepTest
+
+# A test case's execution plan is everything the runner, RerunDataHandler and
+# BatchTestCasesView need from its steps, compiled once and kept in the default
+# cache: the step payloads in step_order and the dynamic steps a tester has to
+# fill in. Plans are keyed by a version read from the database on every lookup:
+# the test case's updated_at, its steps' max updated_at and their count (a
+# deleted step changes the count). The default cache is per process, so a
+# version bumped in one worker would never reach the others; a version derived
+# from the rows changes everywhere as soon as an edit commits, at the cost of
+# one grouped query per lookup instead of a compile.
+PLAN_KEY = 'plan:{test_case_id}:{version}'
+
+hits = counter('execution_plan_cache_hits')
+misses = counter('execution_plan_cache_misses')
+
+
+def step_payload(step, testcase):
+    """Same shape the frontend gets from RerunDataHandler and posts back to execute-step."""
+    return {
+        "ID": step.id,
+        "Code": testcase.code,
+        "Name": testcase.name,
+        "Step_order": step.step_order,
+        "ElementId": step.element_id,
+        "Action": step.action,
+        "ElementIdentifier": step.element_identifier_type.name if step.element_identifier_type else None,
+        "InputType": step.input_type,
+        "LabelName": step.parameter_name,
+        "InputFieldType": step.input_field_type,
+        "ActualInput": step.actual_input,
+        "TestCase_id": step.testcase_id,
+        "Application_id": testcase.application_id,
+        "Timeout": step.wait_timeout
+    }
+
+
+def dynamic_step(step):
+    """A step the tester supplies the input for (BatchTestCasesView's dynamic_test_steps)."""
+    return {
+        "step_id": step.id,
+        "step_order": step.step_order,
+        "action": step.action,
+        "input_type": step.input_type,
+        "input_field_type": step.input_field_type,
+        "parameter_name": step.parameter_name,
+        "element_id": step.element_id
+    }
+
+
+def compile_plans(test_case_ids):
+    """Builds the plans of these test cases from the database in two queries."""
+    test_cases = TestCase.objects.in_bulk(test_case_ids)
+    plans = {
+        test_case_id: {'test_case_id': test_case_id, 'version': None, 'steps': [], 'dynamic_steps': []}
+        for test_case_id in test_cases
+    }
+    steps = TestStepTest.objects.filter(
+        testcase_id__in=test_cases.keys()
+    ).select_related("element_identifier_type").order_by("testcase_id", "step_order")
+    for step in steps:
+        plan = plans[step.testcase_id]
+        plan['steps'].append(step_payload(step, test_cases[step.testcase_id]))
+        if step.input_field_type == 'dynamic':
+            plan['dynamic_steps'].append(dynamic_step(step))
+        if plan['version'] is None or step.updated_at > plan['version']:
+            plan['version'] = step.updated_at  # when the newest step changed, for debugging stale plans
+    return plans
+
+
+def _versions(test_case_ids):
+    """{test_case_id: version} of the test cases that exist, in one query."""
+    rows = TestCase.objects.filter(id__in=test_case_ids).values('id', 'updated_at').annotate(
+        steps_updated_at=Max('stepstest__updated_at'), step_count=Count('stepstest')
+    )
+    return {
+        row['id']: '{}-{}-{}'.format(
+            row['updated_at'].timestamp() if row['updated_at'] else 0,
+            row['steps_updated_at'].timestamp() if row['steps_updated_at'] else 0,
+            row['step_count'],
+        )
+        for row in rows
+    }
+
+
+def get_plans(test_case_ids):
+    """
+    {test_case_id: plan} from the cache, compiling the missing ones in one go.
+    Unknown test case ids are left out. Every call returns fresh objects, so
+    callers may modify the steps (e.g. apply_dynamic_inputs).
+    """
+    test_case_ids = list(dict.fromkeys(test_case_ids))
+    ttl = getattr(settings, 'EXECUTION_PLAN_CACHE_TTL', 3600)
+    if not test_case_ids:
+        return {}
+    if not ttl:
+        return compile_plans(test_case_ids)
+
+    versions = _versions(test_case_ids)
+    keys = {
+        test_case_id: PLAN_KEY.format(test_case_id=test_case_id, version=versions[test_case_id])
+        for test_case_id in test_case_ids if test_case_id in versions
+    }
+    stored = cache.get_many(keys.values())
+    plans = {test_case_id: stored[key] for test_case_id, key in keys.items() if key in stored}
+    hits.inc(len(plans))
+
+    missing = [test_case_id for test_case_id in keys if test_case_id not in plans]
+    if missing:
+        misses.inc(len(missing))
+        compiled = compile_plans(missing)
+        cache.set_many({keys[test_case_id]: plan for test_case_id, plan in compiled.items()}, ttl)
+        plans.update(compiled)
+    return plans
+
+
+def get_plan(test_case_id):
+    """The plan of one test case, or None if it doesn't exist."""
+    return get_plans([test_case_id]).get(test_case_id)
@@ -0,0 +1,190 @@
+import json
+import logging
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+ELEMENT_KEY = 'element-6066-11e4-a52e-4f735466cecf'  # W3C WebDriver element reference
+
+# Locator values containing this never match, so load tests can script failures.
+MISSING_MARKER = 'missing'
+
+
+class FakeWebDriverServer:
+    """
+    A stand-in Appium server speaking enough of the W3C WebDriver protocol for
+    AppiumService: sessions, find element(s), displayed/enabled/attribute/text,
+    click, send_keys and clear. Every element lookup succeeds (except values
+    containing MISSING_MARKER) and every action is a no-op, after a simulated
+    delay; `failure_rates` makes commands fail at random.
+
+    latency:       {command: seconds}; commands are 'session', 'find', 'action',
+                   'query' and 'default'. Each delay is jittered by +-jitter.
+    failure_rates: {command: probability}; 'session' fails session creation,
+                   'find' answers "no such element", 'action' fails click/send_keys.
+
+    Meant for load tests of the orchestration layer, not for test coverage.
+    """
+
+    def __init__(self, host='127.0.0.1', port=4723, latency=None, failure_rates=None, jitter=0.2, seed=None):
+        self.latency = {'session': 0.5, 'find': 0.05, 'action': 0.1, 'query': 0.01, 'default': 0.01}
+        self.latency.update(latency or {})
+        self.failure_rates = dict(failure_rates or {})
+        self.jitter = jitter
+        self.random = random.Random(seed)
+        self.sessions = {}  # session id -> {'elements': {element id: (strategy, value)}}
+        self.commands = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def address(self):
+        host, port = self._httpd.server_address[:2]
+        return host, port
+
+    def start(self):
+        """Serves in a background thread (port 0 picks a free port, see `address`)."""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._httpd.serve_forever()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def _delay(self, command):
+        with self._lock:
+            self.commands += 1
+            latency = self.latency.get(command, self.latency['default'])
+            latency *= 1 + self.random.uniform(-self.jitter, self.jitter)
+            fails = self.random.random() < self.failure_rates.get(command, 0)
+        time.sleep(max(latency, 0))
+        return fails
+
+    # -- commands; each returns (http status, value) ---------------------------------
+
+    def new_session(self, body):
+        if self._delay('session'):
+            return 500, {'error': 'session not created', 'message': 'Simulated session failure'}
+        capabilities = body.get('capabilities', {}).get('alwaysMatch', {})
+        session_id = uuid.uuid4().hex
+        with self._lock:
+            self.sessions[session_id] = {'elements': {}}
+        return 200, {'sessionId': session_id, 'capabilities': {**capabilities, 'platformName': 'Android'}}
+
+    def delete_session(self, session_id):
+        self._delay('default')
+        with self._lock:
+            self.sessions.pop(session_id, None)
+        return 200, None
+
+    def find(self, session, body, many=False):
+        fails = self._delay('find')
+        value = str(body.get('value', ''))
+        if fails or MISSING_MARKER in value:
+            if many:
+                return 200, []
+            return 404, {'error': 'no such element', 'message': f'Simulated: no element for {value}'}
+        element_id = uuid.uuid4().hex
+        with self._lock:
+            session['elements'][element_id] = (body.get('using'), value)
+        reference = {ELEMENT_KEY: element_id, 'ELEMENT': element_id}
+        return 200, [reference] if many else reference
+
+    def element_query(self, session, element_id, query, name=None):
+        self._delay('query')
+        strategy, value = session['elements'][element_id]
+        if query in ('displayed', 'enabled'):
+            return 200, True
+        if query == 'text':
+            return 200, f'Text of {value}'
+        if query == 'attribute':
+            # Stable per locator, so AppiumService can learn a fast-path locator.
+            return 200, {'resource-id': f'fake:id/{abs(hash(value)) % 10 ** 8}', 'content-desc': None}.get(name)
+        return 200, None
+
+    def element_action(self, session, element_id, action):
+        if self._delay('action'):
+            return 500, {'error': 'unknown error', 'message': f'Simulated {action} failure'}
+        return 200, None
+
+    def dispatch(self, method, path, body):
+        if method == 'GET' and path == '/status':
+            return 200, {'ready': True, 'message': 'fake webdriver server', 'build': {'version': 'fake'}}
+        if method == 'POST' and path == '/session':
+            return self.new_session(body)
+
+        match = re.match(r'^/session/([^/]+)(/.*)?$', path)
+        if not match:
+            return 404, {'error': 'unknown command', 'message': f'{method} {path}'}
+        session_id, rest = match.group(1), match.group(2) or ''
+        with self._lock:
+            session = self.sessions.get(session_id)
+        if session is None:
+            return 404, {'error': 'invalid session id', 'message': f'No session {session_id}'}
+
+        if method == 'DELETE' and rest == '':
+            return self.delete_session(session_id)
+        if method == 'POST' and rest in ('/element', '/elements'):
+            return self.find(session, body, many=rest == '/elements')
+
+        match = re.match(r'^/element/([^/]+)/(\w+)(?:/(.+))?$', rest)
+        if match:
+            element_id, command, name = match.groups()
+            if element_id not in session['elements']:
+                return 404, {'error': 'stale element reference', 'message': element_id}
+            if method == 'GET':
+                return self.element_query(session, element_id, command, name)
+            if command in ('click', 'value', 'clear'):
+                return self.element_action(session, element_id, command)
+
+        # Anything else a client may send (timeouts, settings, ...) is accepted and ignored.
+        self._delay('default')
+        return 200, None
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # keep-alive, like a real Appium server
+            # Headers and body go out in two writes; with Nagle on, delayed ACKs add ~40 ms per command.
+            disable_nagle_algorithm = True
+
+            def _respond(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                raw = self.rfile.read(length) if length else b''
+                try:
+                    body = json.loads(raw) if raw else {}
+                except ValueError:
+                    body = {}
+                path = self.path.split('?', 1)[0].rstrip('/')
+                if path.startswith('/wd/hub'):
+                    path = path[len('/wd/hub'):]
+                try:
+                    status, value = server.dispatch(self.command, path, body)
+                except Exception as e:
+                    logger.exception('Fake WebDriver command failed')
+                    status, value = 500, {'error': 'unknown error', 'message': str(e)}
+                payload = json.dumps({'value': value}).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = do_POST = do_DELETE = _respond
+
+            def log_message(self, format, *args):
+                logger.debug(format, *args)
+
+        return Handler
@@ -0,0 +1,79 @@
+import threading
+from collections import OrderedDict
+
+from appium.webdriver.common.appiumby import AppiumBy
+
+from .metrics import counter
+
+# Slow to resolve on Android: the driver has to walk/serialise the UI hierarchy.
+SLOW_STRATEGIES = {AppiumBy.XPATH, AppiumBy.ANDROID_UIAUTOMATOR, AppiumBy.CLASS_NAME}
+
+# Cheapest first. Each entry is (element attribute, strategy it can be looked up with).
+FAST_PATH_ATTRIBUTES = (
+    ('content-desc', AppiumBy.ACCESSIBILITY_ID),
+    ('resource-id', AppiumBy.ID),
+)
+
+# Remembered when an element has no unique fast locator, so we don't re-learn every run.
+NO_FAST_PATH = object()
+
+
+class LocatorCache:
+    """
+    Per-application memory of the cheapest locator that last found a step's element.
+    Keys are (application_id, TestStepTest id); values are (strategy, value) tuples
+    or NO_FAST_PATH. Bounded LRU, shared by every pooled session in the process.
+    """
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = counter('locator_cache_hits')
+        self.misses = counter('locator_cache_misses')
+        self.invalidations = counter('locator_cache_invalidations')
+
+    def get(self, application_id, step_id):
+        key = (application_id, step_id)
+        with self._lock:
+            locator = self._entries.get(key)
+            if locator is not None:
+                self._entries.move_to_end(key)
+        (self.misses if locator is None else self.hits).inc()
+        return locator
+
+    def remember(self, application_id, step_id, locator):
+        key = (application_id, step_id)
+        with self._lock:
+            self._entries[key] = locator
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, application_id, step_id):
+        with self._lock:
+            removed = self._entries.pop((application_id, step_id), None)
+        if removed is not None:
+            self.invalidations.inc()
+
+    def invalidate_application(self, application_id):
+        with self._lock:
+            keys = [key for key in self._entries if key[0] == application_id]
+            for key in keys:
+                del self._entries[key]
+        self.invalidations.inc(len(keys))
+
+    def stats(self):
+        with self._lock:
+            size = len(self._entries)
+        lookups = self.hits.value + self.misses.value
+        return {
+            'size': size,
+            'hits': self.hits.value,
+            'misses': self.misses.value,
+            'invalidations': self.invalidations.value,
+            'hit_rate': round(self.hits.value / lookups, 4) if lookups else None,
+        }
+
+
+locator_cache = LocatorCache()
@@ -0,0 +1,213 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+
+from channels.layers import get_channel_layer
+from django.conf import settings
+
+from .metrics import counter
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_GROUP = 'appium'
+
+
+def session_group(session_id):
+    """Channels group of the viewers watching one Appium session."""
+    return f'appium.session.{session_id}'
+
+
+class LogHistory:
+    """
+    Recent log lines per session, numbered with a per-session sequence, so a
+    viewer that reconnects can ask for everything after the last number it saw.
+    Each session keeps its last APPIUM_LOG_HISTORY_SIZE lines and all sessions
+    together at most APPIUM_LOG_HISTORY_MAX_BYTES (least recently active
+    sessions are trimmed first). Ended sessions are forgotten
+    APPIUM_LOG_HISTORY_RETENTION seconds after end_session().
+
+    The history lives in the process running the Appium session, which is also
+    the one serving its websocket under the single ASGI server this app uses.
+    """
+
+    def __init__(self, size=None, max_bytes=None, retention=None):
+        self.size = size or getattr(settings, 'APPIUM_LOG_HISTORY_SIZE', 500)
+        self.max_bytes = max_bytes or getattr(settings, 'APPIUM_LOG_HISTORY_MAX_BYTES', 8 * 1024 * 1024)
+        self.retention = retention if retention is not None else getattr(settings, 'APPIUM_LOG_HISTORY_RETENTION', 300)
+        self._sessions = OrderedDict()  # session id -> {'lines': deque[(seq, message)], 'seq': int}, least recently active first
+        self._ended = {}  # session id -> monotonic time it ended
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def append(self, session_id, message):
+        """Stores the line and returns its sequence number."""
+        size = len(message)
+        with self._lock:
+            self._purge_ended()
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._sessions[session_id] = {'lines': deque(), 'seq': 0}
+            self._sessions.move_to_end(session_id)
+            session['seq'] += 1
+            session['lines'].append((session['seq'], message))
+            self._bytes += size
+            if len(session['lines']) > self.size:
+                self._bytes -= len(session['lines'].popleft()[1])
+            while self._bytes > self.max_bytes and self._sessions:
+                self._trim_oldest()
+            return session['seq']
+
+    def since(self, session_id, last_seq):
+        """(lines after last_seq as [(seq, message)], how many of the wanted lines were already evicted)."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return [], 0
+            lines = [line for line in session['lines'] if line[0] > last_seq]
+            first_kept = lines[0][0] if lines else session['seq'] + 1
+            return lines, max(first_kept - last_seq - 1, 0)
+
+    def last_seq(self, session_id):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            return session['seq'] if session else 0
+
+    def end(self, session_id):
+        with self._lock:
+            if session_id in self._sessions:
+                self._ended[session_id] = time.monotonic()
+
+    def _purge_ended(self):
+        cutoff = time.monotonic() - self.retention
+        for session_id, ended_at in list(self._ended.items()):
+            if ended_at <= cutoff:
+                del self._ended[session_id]
+                session = self._sessions.pop(session_id, None)
+                if session:
+                    self._bytes -= sum(len(message) for _, message in session['lines'])
+
+    def _trim_oldest(self):
+        # Emptied sessions stay (a few bytes) so their sequence keeps counting.
+        for session in self._sessions.values():
+            if session['lines']:
+                self._bytes -= len(session['lines'].popleft()[1])
+                return
+
+
+class LogAggregator:
+    """
+    Coalesces Appium log lines into websocket frames. emit() only appends to a
+    per-session buffer and never waits on the channel layer; a background thread
+    sends each session's pending lines as one `log_batch` event every
+    APPIUM_LOG_FLUSH_INTERVAL seconds, at most APPIUM_LOG_BATCH_SIZE lines per
+    frame. When a viewer or Redis can't keep up, a buffer holds at most
+    APPIUM_LOG_BUFFER_SIZE lines: the oldest are dropped from the live feed (they
+    stay in the LogHistory) and the next frame says how many were skipped.
+    """
+
+    def __init__(self, flush_interval=None, batch_size=None, buffer_size=None, history=None):
+        self.history = history or LogHistory()
+        self.flush_interval = flush_interval or getattr(settings, 'APPIUM_LOG_FLUSH_INTERVAL', 0.1)
+        self.batch_size = batch_size or getattr(settings, 'APPIUM_LOG_BATCH_SIZE', 50)
+        self.buffer_size = buffer_size or getattr(settings, 'APPIUM_LOG_BUFFER_SIZE', 1000)
+        self._buffers = {}  # session id (None for session-less lines) -> deque of (seq, message)
+        self._dropped = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self.sent_frames = counter('appium_log_frames_sent')
+        self.sent_lines = counter('appium_log_lines_sent')
+        self.dropped_lines = counter('appium_log_lines_dropped')
+
+    def emit(self, session_id, message):
+        with self._lock:
+            # Numbered under the buffer lock so each buffer stays in sequence order.
+            seq = self.history.append(session_id, message)
+            buffer = self._buffers.get(session_id)
+            if buffer is None:
+                buffer = self._buffers[session_id] = deque()
+            if len(buffer) >= self.buffer_size:
+                buffer.popleft()
+                self._dropped[session_id] = self._dropped.get(session_id, 0) + 1
+                self.dropped_lines.inc()
+            buffer.append((seq, message))
+            full = len(buffer) >= self.batch_size
+        self._ensure_running()
+        if full:
+            self._wakeup.set()
+
+    def _take_batches(self):
+        batches = []
+        with self._lock:
+            for session_id in list(self._buffers):
+                buffer = self._buffers[session_id]
+                lines = [buffer.popleft() for _ in range(min(self.batch_size, len(buffer)))]
+                dropped = self._dropped.pop(session_id, 0)
+                if not buffer:
+                    del self._buffers[session_id]
+                if lines or dropped:
+                    batches.append((session_id, lines, dropped))
+        return batches
+
+    async def flush(self):
+        """Sends one frame per session with pending lines; returns how many sessions had some."""
+        batches = self._take_batches()
+        if not batches:
+            return 0
+        channel_layer = get_channel_layer()
+        for session_id, lines, dropped in batches:
+            messages = [message for _, message in lines]
+            # Sequence numbers run without gaps, so first_seq locates every line of the frame
+            # and a viewer can replay what it missed (AppiumConsumer.receive).
+            event = {
+                'type': 'log_batch',
+                'session_id': session_id,
+                'first_seq': lines[0][0] if lines else None,
+                'messages': messages,
+                'dropped': dropped,
+            }
+            groups = [GLOBAL_GROUP] if session_id is None else [session_group(session_id)]
+            if session_id is not None and getattr(settings, 'APPIUM_LOG_GLOBAL_GROUP', True):
+                groups.append(GLOBAL_GROUP)
+            for group in groups:
+                try:
+                    await channel_layer.group_send(group, event)
+                except Exception as e:
+                    # e.g. ChannelFull: this frame is lost, the run must not notice.
+                    self.dropped_lines.inc(len(messages))
+                    logger.warning(f'Dropped {len(messages)} log line(s) for {group}: {str(e)}')
+                    continue
+                self.sent_frames.inc()
+                self.sent_lines.inc(len(messages))
+        return len(batches)
+
+    async def drain(self):
+        """Flushes until every buffer is empty, e.g. before the channel layer goes away."""
+        while await self.flush():
+            pass
+
+    def _ensure_running(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=lambda: asyncio.run(self._run()), daemon=True)
+                self._thread.start()
+
+    def end_session(self, session_id):
+        self.history.end(session_id)
+
+    async def _run(self):
+        while True:
+            # Sleep off the loop so emit() can wake us early when a batch fills up.
+            await asyncio.to_thread(self._wakeup.wait, self.flush_interval)
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f'Log flush failed: {str(e)}')
+
+
+log_aggregator = LogAggregator()
@@ -0,0 +1,126 @@
+import importlib.util
+import json
+import statistics
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from api import db_pool
+from api.models import TestCase
+
+
+class Command(BaseCommand):
+    help = (
+        'Simulates concurrent testers against the default database, once with the stock Django engine '
+        'and once with the pooled one (api.db_pool). Each request runs on a thread of its own and closes '
+        'its connection at the end, as under ASGI with CONN_MAX_AGE = 0, so the difference is the '
+        'connection setup the pool saves.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--testers', type=int, default=8, help='Concurrent testers')
+        parser.add_argument('--requests', type=int, default=50, help='Requests per tester')
+        parser.add_argument('--queries', type=int, default=3, help='Queries per request')
+        parser.add_argument('--output', help='Write the results to this JSON file')
+
+    def handle(self, *args, **options):
+        settings_dict = connections['default'].settings_dict
+        connection_class = type(connections['default'])
+        if issubclass(connection_class, db_pool.PooledDatabaseWrapperMixin):
+            stock_class = next(
+                cls for cls in connection_class.__mro__[1:] if not issubclass(cls, db_pool.PooledDatabaseWrapperMixin)
+            )
+            direct_engine, pooled_engine = stock_class.__module__.rpartition('.')[0], settings_dict['ENGINE']
+        else:
+            # Pooling is off (MB_AUTOMATION_DB_POOL); compare with the pooled twin of the stock engine.
+            direct_engine = settings_dict['ENGINE']
+            pooled_engine = f"api.db_backends.{direct_engine.rpartition('.')[2]}"
+            if importlib.util.find_spec(pooled_engine) is None:
+                raise CommandError(f'No pooled engine for {direct_engine} in api.db_backends')
+
+        results = {}
+        for mode, engine in (('direct', direct_engine), ('pooled', pooled_engine)):
+            alias = f'benchmark_{mode}'
+            connections.settings[alias] = {**settings_dict, 'ENGINE': engine, 'CONN_MAX_AGE': 0}
+            results[mode] = self._run(alias, options)
+            if mode == 'pooled':
+                pool = db_pool.get_pool(alias, connections.settings[alias])
+                results[mode]['pool'] = pool.stats()
+                pool.close_idle()
+            self.stdout.write(self._line(mode, results[mode]))
+
+        direct, pooled = results['direct'], results['pooled']
+        if direct['requests_per_second']:
+            self.stdout.write(
+                f'pooled: {pooled["requests_per_second"] / direct["requests_per_second"]:.2f}x requests/s, '
+                f'{direct["connections_opened"] - pooled["connections_opened"]} fewer connections opened'
+            )
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump({'database': connections['default'].vendor, **options, 'results': results}, output, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'Results written to {options["output"]}'))
+
+    def _run(self, alias, options):
+        opened = []
+
+        def count_connection(sender, connection, **kwargs):
+            if connection.alias == alias:
+                opened.append(1)
+
+        def request(timings, connect_timings):
+            # One request: a fresh thread, its own connection, closed at the end.
+            connection = connections[alias]
+            started = time.perf_counter()
+            try:
+                connection.ensure_connection()
+                connect_timings.append(time.perf_counter() - started)
+                for _ in range(options['queries']):
+                    list(TestCase.objects.using(alias).order_by('id').values_list('id', 'name')[:20])
+            finally:
+                connection.close()
+            timings.append(time.perf_counter() - started)
+
+        def tester(timings, connect_timings):
+            for _ in range(options['requests']):
+                thread = threading.Thread(target=request, args=(timings, connect_timings))
+                thread.start()
+                thread.join()
+
+        opened_before = db_pool.opened.value
+        timings, connect_timings = [], []
+        connection_created.connect(count_connection)
+        try:
+            started = time.perf_counter()
+            testers = [
+                threading.Thread(target=tester, args=(timings, connect_timings)) for _ in range(options['testers'])
+            ]
+            for thread in testers:
+                thread.start()
+            for thread in testers:
+                thread.join()
+            elapsed = time.perf_counter() - started
+        finally:
+            connection_created.disconnect(count_connection)
+
+        pooled = issubclass(type(connections[alias]), db_pool.PooledDatabaseWrapperMixin)
+        timings.sort()
+        return {
+            'requests': len(timings),
+            'elapsed_seconds': round(elapsed, 3),
+            'requests_per_second': round(len(timings) / elapsed, 1) if elapsed else None,
+            'p50_ms': round(statistics.median(timings) * 1000, 3) if timings else None,
+            'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1000, 3) if timings else None,
+            'connect_p50_ms': round(statistics.median(connect_timings) * 1000, 3) if connect_timings else None,
+            # connection_created also fires when a pooled connection is handed out again.
+            'connections_opened': db_pool.opened.value - opened_before if pooled else len(opened),
+        }
+
+    def _line(self, mode, result):
+        return (
+            f'{mode:<7} {result["requests"]:>6} requests in {result["elapsed_seconds"]:>7.3f} s  '
+            f'{result["requests_per_second"]:>8.1f} req/s  p50 {result["p50_ms"]:>7.3f} ms  p95 {result["p95_ms"]:>7.3f} ms  '
+            f'connect p50 {result["connect_p50_ms"]:>7.3f} ms  {result["connections_opened"]:>5} connections opened'
+        )
@@ -0,0 +1,213 @@
+import json
+import statistics
+import subprocess
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.models import Application, BatchAssignment, CustomTestGroup, TestCase, TestExecution, TestStepTest, User
+
+
+class Command(BaseCommand):
+    help = (
+        'Times the main read and write endpoints through the Django test client against data made by '
+        'generate_synthetic_data: p50/p95 latency, SQL queries, peak Python memory and response size. '
+        'Writes run in a transaction that is rolled back, so the data stays the same between runs.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefix', default='bench', help='Prefix given to generate_synthetic_data')
+        parser.add_argument('--iterations', type=int, default=20, help='Timed requests per endpoint')
+        parser.add_argument('--warmup', type=int, default=2, help='Untimed requests per endpoint first')
+        parser.add_argument('--endpoints', help='Comma separated endpoint names (default: all)')
+        parser.add_argument('--cold', action='store_true', help='Clear the cache before every request')
+        parser.add_argument('--output', help='Write the results to this JSON file')
+        parser.add_argument('--compare', help='Earlier --output file to print the differences against')
+
+    def handle(self, *args, **options):
+        endpoints = self._endpoints(options['prefix'])
+        if options['endpoints']:
+            wanted = options['endpoints'].split(',')
+            unknown = set(wanted) - set(endpoints)
+            if unknown:
+                raise CommandError(f'Unknown endpoints: {", ".join(sorted(unknown))}. Known: {", ".join(endpoints)}')
+            endpoints = {name: endpoints[name] for name in wanted}
+
+        results = {}
+        for name, (user, method, path, body) in endpoints.items():
+            results[name] = self._measure(user, method, path, body, options)
+            self.stdout.write(self._line(name, results[name]))
+
+        report = {
+            'meta': {
+                'created_at': timezone.now().isoformat(),
+                'git_commit': self._git_commit(),
+                'database': connection.vendor,
+                'iterations': options['iterations'],
+                'cold_cache': options['cold'],
+                'scale': {
+                    model.__name__: model.objects.count()
+                    for model in (Application, TestCase, TestStepTest, BatchAssignment, TestExecution)
+                },
+            },
+            'endpoints': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'Results written to {options["output"]}'))
+        if options['compare']:
+            self._compare(options['compare'], results)
+
+    def _endpoints(self, prefix):
+        """name -> (user, method, path, JSON body or None), built from the synthetic data."""
+        try:
+            manager = User.objects.get(username=f'{prefix}_manager')
+        except User.DoesNotExist:
+            raise CommandError(f'No {prefix} data; run `manage.py generate_synthetic_data --prefix {prefix}` first')
+        batch = BatchAssignment.objects.filter(assigned_by=manager).order_by('-totaltestcases', 'id').first()
+        if batch is None:
+            raise CommandError('The synthetic data has no batches; generate it with --batches > 0')
+        tester = batch.assigned_to
+        application = batch.application or batch.suite.application
+        test_case = TestCase.objects.filter(application=application).order_by('id').first()
+        test_case_ids = list(TestCase.objects.filter(application=application).order_by('id').values_list('id', flat=True))
+        group = CustomTestGroup.objects.filter(created_by=manager).first()
+
+        executions = TestExecution.objects.filter(batch=batch).order_by('id')[:20]
+        step_ids = {}
+        for step_id, test_case_id in TestStepTest.objects.filter(
+            testcase_id__in=[execution.test_case_id for execution in executions]
+        ).values_list('id', 'testcase_id'):
+            step_ids.setdefault(test_case_id, []).append(step_id)
+        batch_results = {
+            'batch_id': batch.id,
+            'overall_status': 'completed',
+            'test_case_results': [
+                {
+                    'test_execution_id': execution.id,
+                    'status': 'passed',
+                    'step_results': [
+                        {'test_step_id': step_id, 'status': 'passed', 'duration': 0.5}
+                        for step_id in step_ids.get(execution.test_case_id, [])
+                    ],
+                }
+                for execution in executions
+            ],
+        }
+
+        endpoints = {
+            'suite_applications': (manager, 'get', f'/getSuiteApplications/{application.id}/', None),
+            'test_executions': (manager, 'get', '/test-executions/', None),
+            'manager_test_results': (manager, 'get', '/get-manager-testresults/', None),
+            'manager_batches': (manager, 'get', '/getmyassignedbatchtestsmanager/', None),
+            'manager_executed_batches': (manager, 'get', '/get-manager-pending-batch/', None),
+            'tester_test_results': (tester, 'get', '/get-my-testresults/', None),
+            'tester_batches': (tester, 'get', '/getmyassignedbatchtests/', None),
+            'tester_executed_batches': (tester, 'get', '/get-my-batch-testresults/', None),
+            'batch_test_cases': (tester, 'get', f'/getbatchtestcases/{batch.id}/', None),
+            'rerun_steps': (tester, 'get', f'/rerun/{test_case.id}/', None),
+            'save_batch_results': (tester, 'post', '/save-batch-test-results/', batch_results),
+            'assign_batch': (manager, 'post', '/assignbatchtest/', {
+                'name': f'{prefix} benchmark batch', 'priority': 'medium',
+                'assigned_to_id': tester.id, 'application_id': application.id,
+            }),
+            'create_custom_group': (manager, 'post', '/setCustomGroup/', {
+                'name': f'{prefix} benchmark group', 'application_id': application.id,
+                'description': 'benchmark', 'test_cases': test_case_ids[:200],
+            }),
+        }
+        if group is not None:
+            endpoints['update_custom_group'] = (manager, 'put', f'/update_custom_group/{group.id}/', {
+                'test_cases': test_case_ids[:200][::-1],
+            })
+        return endpoints
+
+    def _request(self, client, method, path, body):
+        with transaction.atomic():
+            if body is None:
+                response = getattr(client, method)(path)
+            else:
+                response = getattr(client, method)(path, json.dumps(body), content_type='application/json')
+            content = b''.join(response.streaming_content) if response.streaming else response.content
+            transaction.set_rollback(True)  # writes leave nothing behind
+        return response.status_code, len(content)
+
+    def _measure(self, user, method, path, body, options):
+        client = Client()
+        client.cookies['access_token'] = str(AccessToken.for_user(user))
+        for _ in range(options['warmup']):
+            self._request(client, method, path, body)
+
+        timings, queries = [], []
+        for _ in range(options['iterations']):
+            if options['cold']:
+                cache.clear()
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                status, size = self._request(client, method, path, body)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries.append(len(captured))
+
+        # One more request under tracemalloc, which would skew the timings above.
+        if options['cold']:
+            cache.clear()
+        tracemalloc.start()
+        try:
+            self._request(client, method, path, body)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        timings.sort()
+        return {
+            'method': method.upper(),
+            'path': path,
+            'status': status,
+            'p50_ms': round(statistics.median(timings), 2),
+            'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 2),
+            'mean_ms': round(statistics.fmean(timings), 2),
+            'max_ms': round(timings[-1], 2),
+            'queries': max(queries),
+            'peak_memory_kb': round(peak / 1024, 1),
+            'response_bytes': size,
+        }
+
+    def _line(self, name, result):
+        return (
+            f'{name:<26} {result["status"]:>3}  p50 {result["p50_ms"]:>8.2f} ms  p95 {result["p95_ms"]:>8.2f} ms  '
+            f'{result["queries"]:>4} queries  {result["peak_memory_kb"]:>9.1f} KB peak  {result["response_bytes"]:>9} B'
+        )
+
+    def _compare(self, path, results):
+        with open(path) as previous_file:
+            previous = json.load(previous_file)
+        self.stdout.write(f'\nCompared with {path} ({previous["meta"].get("git_commit") or "unknown commit"}):')
+        for name, result in results.items():
+            before = previous['endpoints'].get(name)
+            if before is None:
+                self.stdout.write(f'{name:<26} new')
+                continue
+            changes = []
+            for key in ('p50_ms', 'p95_ms', 'queries', 'peak_memory_kb'):
+                change = result[key] - before[key]
+                percent = f' ({change / before[key]:+.0%})' if before[key] else ''
+                changes.append(f'{key} {before[key]} -> {result[key]}{percent}')
+            self.stdout.write(f'{name:<26} ' + ', '.join(changes))
+
+    def _git_commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+                cwd=settings.BASE_DIR
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
@@ -0,0 +1,102 @@
+import re
+
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.management.commands.benchmark_endpoints import Command as BenchmarkCommand
+
+
+class Command(BenchmarkCommand):
+    help = (
+        'Runs the benchmark_endpoints requests once, EXPLAINs every SELECT they send and flags full '
+        'table scans of tables with at least --min-rows rows. Needs generate_synthetic_data first. '
+        'Exits with an error when a scan is found and --fail-on-scan is given.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefix', default='bench', help='Prefix given to generate_synthetic_data')
+        parser.add_argument('--endpoints', help='Comma separated endpoint names (default: all)')
+        parser.add_argument('--min-rows', type=int, default=1000, help='Ignore scans of tables smaller than this')
+        parser.add_argument('--verbose-plans', action='store_true', help='Print the plan of every query')
+        parser.add_argument('--fail-on-scan', action='store_true', help='Exit non-zero if a full scan is flagged')
+
+    def handle(self, *args, **options):
+        endpoints = self._endpoints(options['prefix'])
+        if options['endpoints']:
+            wanted = options['endpoints'].split(',')
+            unknown = set(wanted) - set(endpoints)
+            if unknown:
+                raise CommandError(f'Unknown endpoints: {", ".join(sorted(unknown))}. Known: {", ".join(endpoints)}')
+            endpoints = {name: endpoints[name] for name in wanted}
+
+        table_rows = {}
+        flagged = 0
+        for name, (user, method, path, body) in endpoints.items():
+            client = Client()
+            client.cookies['access_token'] = str(AccessToken.for_user(user))
+            with CaptureQueriesContext(connection) as captured:
+                self._request(client, method, path, body)
+            selects = list(dict.fromkeys(
+                query['sql'] for query in captured.captured_queries if query['sql'].lstrip().upper().startswith('SELECT')
+            ))
+
+            scans = []
+            for sql in selects:
+                plan, scanned = self._explain(sql)
+                for table in scanned:
+                    if table not in table_rows:
+                        table_rows[table] = self._count(table)
+                    if table_rows[table] >= options['min_rows']:
+                        scans.append((table, sql))
+                if options['verbose_plans']:
+                    self.stdout.write(f'  {sql}\n' + '\n'.join(f'    {line}' for line in plan))
+
+            flagged += len(scans)
+            style = self.style.WARNING if scans else self.style.SUCCESS
+            self.stdout.write(style(f'{name:<26} {len(selects):>3} selects  {len(scans)} full scans'))
+            for table, sql in scans:
+                self.stdout.write(f'  full scan of {table} ({table_rows[table]} rows): {sql[:300]}')
+
+        if flagged and options['fail_on_scan']:
+            raise CommandError(f'{flagged} full table scans found')
+
+    def _explain(self, sql):
+        """(plan lines, tables read with a full scan) for one query, per database vendor."""
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                plan = [row[-1] for row in cursor.fetchall()]
+                # "SCAN api_stepresult" is a full scan; "SCAN t USING (COVERING) INDEX ..." walks an index.
+                scanned = [
+                    match.group(1) for line in plan
+                    for match in [re.match(r'SCAN (\w+)(?: AS \w+)?$', line)] if match
+                ]
+            elif connection.vendor == 'mysql':
+                cursor.execute(f'EXPLAIN {sql}')
+                columns = [column[0] for column in cursor.description]
+                rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+                plan = [
+                    f'{row["table"]}: type={row["type"]} key={row["key"]} rows={row["rows"]} {row.get("Extra") or ""}'
+                    for row in rows
+                ]
+                scanned = [row['table'] for row in rows if row['type'] == 'ALL']
+            else:
+                cursor.execute(f'EXPLAIN {sql}')
+                plan = [row[0] for row in cursor.fetchall()]
+                scanned = [
+                    match.group(1) for line in plan for match in [re.search(r'Seq Scan on (\w+)', line)] if match
+                ]
+        # Subqueries and repeated joins read tables under Django's aliases ("api_testcase" U0).
+        aliases = dict((alias, table) for table, alias in re.findall(r'["`](\w+)["`] (?:AS )?["`]?([TU]\d+)\b', sql))
+        return plan, [aliases.get(table, table) for table in scanned]
+
+    def _count(self, table):
+        # Derived tables (MySQL's <derived2>) and unresolved aliases aren't real tables and count as 0.
+        if table not in connection.introspection.table_names():
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) FROM {connection.ops.quote_name(table)}')
+            return cursor.fetchone()[0]
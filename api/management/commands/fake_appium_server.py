@@ -0,0 +1,55 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.fake_webdriver import FakeWebDriverServer
+
+
+def parse_rates(value):
+    """'find=0.05,action=0.1' -> {'find': 0.05, 'action': 0.1}"""
+    rates = {}
+    for item in filter(None, (value or '').split(',')):
+        name, _, number = item.partition('=')
+        try:
+            rates[name.strip()] = float(number)
+        except ValueError:
+            raise CommandError(f'Expected command=number, got {item!r}')
+    return rates
+
+
+class Command(BaseCommand):
+    help = (
+        'Runs a fake Appium server that answers WebDriver session, find element, click and send_keys '
+        'commands after a configurable delay, so AppiumService can be exercised without a phone '
+        '(see load_test_appium). Point APPIUM_HOST/APPIUM_PORT at it.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=4723)
+        parser.add_argument(
+            '--latency', default='',
+            help='Seconds per command, e.g. session=0.5,find=0.05,action=0.1,query=0.01,default=0.01'
+        )
+        parser.add_argument('--jitter', type=float, default=0.2, help='Random +- share added to every latency')
+        parser.add_argument('--failure-rates', default='', help='Failure probability per command, e.g. find=0.02,action=0.01')
+        parser.add_argument('--seed', type=int, help='Random seed, for reproducible latencies and failures')
+
+    def handle(self, *args, **options):
+        server = FakeWebDriverServer(
+            options['host'], options['port'],
+            latency=parse_rates(options['latency']),
+            failure_rates=parse_rates(options['failure_rates']),
+            jitter=options['jitter'],
+            seed=options['seed'],
+        )
+        host, port = server.address
+        self.stdout.write(self.style.SUCCESS(f'Fake Appium server listening on http://{host}:{port}'))
+        self.stdout.write(f'Latency: {json.dumps(server.latency)}  failure rates: {json.dumps(server.failure_rates)}')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.stop()
+            self.stdout.write(f'Stopped after {server.commands} commands')
@@ -0,0 +1,252 @@
+import random
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from api.batch_assignment import batch_source_cases, insert_batch_test_cases
+from api.batch_progress import recompute_batch_counters
+from api.models import (
+    Application, BatchAssignment, BatchAssignmentTestCase, CustomTestGroup, CustomTestGroupItems, Device,
+    ElementIdentifierType, StepResult, TestAssignment, TestCase, TestExecution, TestStepTest, TestSuite, TestType, User
+)
+
+BULK_BATCH_SIZE = 1000
+IDENTIFIER_TYPES = ['ID', 'XPATH', 'ACCESSIBILITY_ID', 'CLASS_NAME', 'ANDROID_UIAUTOMATOR']
+
+
+class Command(BaseCommand):
+    help = (
+        'Fills the database with synthetic applications, suites, test cases, steps, batches, '
+        'executions and step results for benchmarking (see benchmark_endpoints). '
+        'Everything is owned by <prefix>_manager / <prefix>_tester<N> users, so --flush removes it again.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefix', default='bench', help='Name prefix of the generated users and applications')
+        parser.add_argument('--applications', type=int, default=2)
+        parser.add_argument('--suites', type=int, default=5, help='Suites per application')
+        parser.add_argument('--cases', type=int, default=20, help='Test cases per suite')
+        parser.add_argument('--steps', type=int, default=10, help='Steps per test case')
+        parser.add_argument('--testers', type=int, default=2)
+        parser.add_argument('--devices', type=int, default=2)
+        parser.add_argument('--batches', type=int, default=10, help='Batch assignments, spread over testers and applications')
+        parser.add_argument('--executed', type=float, default=0.5, help='Share of each batch\'s test cases that was run')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed, for reproducible data')
+        parser.add_argument('--flush', action='store_true', help='Delete data generated earlier with this prefix first')
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.prefix = options['prefix']
+        if options['flush']:
+            self._flush()
+
+        with transaction.atomic():
+            manager, testers = self._users(options['testers'])
+            devices = self._devices(options['devices'])
+            applications = self._applications(manager, options['applications'])
+            suites = self._suites(manager, applications, options['suites'])
+            cases = self._test_cases(manager, suites, options['cases'])
+            self._steps(cases, options['steps'])
+            self._custom_groups(manager, applications, cases)
+            batches = self._batches(manager, testers, applications, suites, options['batches'])
+            executions = self._executions(batches, devices, options['executed'])
+            results = self._step_results(executions)
+            recompute_batch_counters([batch.id for batch in batches])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {len(applications)} applications, {len(suites)} suites, {len(cases)} test cases, '
+            f'{len(cases) * options["steps"]} steps, {len(batches)} batches, {len(executions)} executions '
+            f'and {results} step results'
+        ))
+
+    def _flush(self):
+        # Applications, suites, test cases, batches and executions all cascade from their users.
+        users = User.objects.filter(username__startswith=f'{self.prefix}_')
+        Application.objects.filter(created_by__in=users).delete()
+        deleted, _ = users.delete()
+        Device.objects.filter(device_uuid__startswith=f'{self.prefix}-').delete()
+        self.stdout.write(f'Flushed {deleted} rows of earlier {self.prefix} data')
+
+    def _bulk(self, model, objects, created):
+        """bulk_create, then the created rows re-read with `created` (MySQL doesn't return ids)."""
+        model.objects.bulk_create(objects, batch_size=BULK_BATCH_SIZE)
+        return list(created.order_by('id'))
+
+    def _users(self, tester_count):
+        manager, _ = User.objects.get_or_create(username=f'{self.prefix}_manager', defaults={'role': 'manager'})
+        testers = [
+            User.objects.get_or_create(username=f'{self.prefix}_tester{index}', defaults={'role': 'tester'})[0]
+            for index in range(1, max(tester_count, 1) + 1)
+        ]
+        return manager, testers
+
+    def _devices(self, count):
+        return [
+            Device.objects.get_or_create(
+                device_uuid=f'{self.prefix}-device-{index}',
+                defaults={'device_name': f'Synthetic device {index}', 'platform': 'Android', 'os_version': '14'}
+            )[0]
+            for index in range(1, count + 1)
+        ]
+
+    def _applications(self, manager, count):
+        start = Application.objects.filter(created_by=manager).count()
+        last_id = Application.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        return self._bulk(Application, [
+            Application(name=f'{self.prefix}-app-{start + index}', created_by=manager) for index in range(1, count + 1)
+        ], Application.objects.filter(created_by=manager, id__gt=last_id))
+
+    def _suites(self, manager, applications, per_application):
+        return self._bulk(TestSuite, [
+            TestSuite(
+                application=application, name=f'Suite {index}',
+                description=f'Synthetic suite {index} of {application.name}', created_by=manager
+            )
+            for application in applications for index in range(1, per_application + 1)
+        ], TestSuite.objects.filter(application__in=applications))
+
+    def _test_cases(self, manager, suites, per_suite):
+        return self._bulk(TestCase, [
+            TestCase(
+                code=f'TC-{suite.id}-{index:04d}', suite=suite, application_id=suite.application_id,
+                name=f'{suite.name} case {index}', description='Synthetic test case', created_by=manager
+            )
+            for suite in suites for index in range(1, per_suite + 1)
+        ], TestCase.objects.filter(suite__in=suites))
+
+    def _steps(self, cases, per_case):
+        identifier_types = [
+            ElementIdentifierType.objects.get_or_create(name=name)[0] for name in IDENTIFIER_TYPES
+        ]
+        steps = []
+        for case in cases:
+            for order in range(1, per_case + 1):
+                dynamic = order % 5 == 0
+                steps.append(TestStepTest(
+                    testcase=case,
+                    step_order=order,
+                    element_identifier_type=self.random.choice(identifier_types),
+                    element_id=f'//android.widget.Button[@resource-id="synthetic:{case.id}:{order}"]',
+                    action='send_keys' if dynamic else 'click',
+                    input_type='dynamic' if dynamic else None,
+                    parameter_name='Phone Number' if dynamic else None,
+                    input_field_type='dynamic' if dynamic else 'static',
+                ))
+        TestStepTest.objects.bulk_create(steps, batch_size=BULK_BATCH_SIZE)
+
+    def _custom_groups(self, manager, applications, cases):
+        # One group per application with a random half of its test cases, in random order.
+        items = []
+        for application in applications:
+            group = CustomTestGroup.objects.create(
+                name=f'{self.prefix} group {application.id}', application=application,
+                description='Synthetic custom group', created_by=manager
+            )
+            application_cases = [case for case in cases if case.application_id == application.id]
+            picked = self.random.sample(application_cases, len(application_cases) // 2)
+            items.extend(
+                CustomTestGroupItems(custom_group=group, test_case=case, order_ingroup=order)
+                for order, case in enumerate(picked, start=1)
+            )
+        CustomTestGroupItems.objects.bulk_create(items, batch_size=BULK_BATCH_SIZE)
+
+    def _batches(self, manager, testers, applications, suites, count):
+        if not applications:
+            return []
+        application_type, _ = TestType.objects.get_or_create(name='Application')
+        suite_type, _ = TestType.objects.get_or_create(name='Suite')
+        batches = []
+        for index in range(count):
+            # Alternate whole-application and single-suite batches.
+            source = {'application': applications[index % len(applications)]} if index % 2 == 0 else {
+                'suite': suites[index % len(suites)]
+            }
+            batch = BatchAssignment.objects.create(
+                name=f'{self.prefix} batch {index + 1}',
+                assigned_by=manager,
+                assigned_to=testers[index % len(testers)],
+                assignment_type=application_type if 'application' in source else suite_type,
+                status=self.random.choice(['pending', 'in_progress', 'completed']),
+                priority=self.random.choice(['low', 'medium', 'high']),
+                deadline=timezone.now() + timedelta(days=7),
+                completedtestcases=0,
+                passedtestcases=0,
+                **source
+            )
+            batch.totaltestcases = insert_batch_test_cases([batch.id], batch_source_cases(**source), timezone.now())
+            batch.save(update_fields=['totaltestcases'])
+            batches.append(batch)
+        return batches
+
+    def _executions(self, batches, devices, executed_share):
+        executions = []
+        for batch in batches:
+            test_case_ids = list(
+                BatchAssignmentTestCase.objects.filter(batch=batch).order_by('id').values_list('test_case_id', flat=True)
+            )
+            for test_case_id in test_case_ids[:int(len(test_case_ids) * executed_share)]:
+                executions.append(TestExecution(
+                    test_case_id=test_case_id,
+                    batch=batch,
+                    executed_by_id=batch.assigned_to_id,
+                    executed_device=self.random.choice(devices) if devices else None,
+                    overallstatus='passed' if self.random.random() < 0.8 else 'failed',
+                ))
+        executions = self._bulk(TestExecution, executions, TestExecution.objects.filter(batch__in=batches))
+        links = {
+            (link.batch_id, link.test_case_id): link
+            for link in BatchAssignmentTestCase.objects.filter(batch__in=batches)
+        }
+        linked = []
+        for execution in executions:
+            link = links[(execution.batch_id, execution.test_case_id)]
+            link.execution_id = execution.id
+            linked.append(link)
+        BatchAssignmentTestCase.objects.bulk_update(linked, ['execution'], batch_size=BULK_BATCH_SIZE)
+
+        # Individually assigned copies of the same runs, for the assignment dashboards.
+        TestAssignment.objects.bulk_create([
+            TestAssignment(
+                test_case_id=execution.test_case_id,
+                assigned_by_id=execution.batch.assigned_by_id,
+                assigned_to_id=execution.executed_by_id,
+                execution=execution,
+                status='completed_pass' if execution.overallstatus == 'passed' else 'completed_fail',
+                priority=execution.batch.priority,
+            )
+            for execution in TestExecution.objects.filter(id__in=[e.id for e in executions]).select_related('batch')
+        ], batch_size=BULK_BATCH_SIZE)
+        return executions
+
+    def _step_results(self, executions):
+        steps = {}
+        for step_id, test_case_id in TestStepTest.objects.filter(
+            testcase_id__in={execution.test_case_id for execution in executions}
+        ).order_by('step_order').values_list('id', 'testcase_id'):
+            steps.setdefault(test_case_id, []).append(step_id)
+
+        now = timezone.now()
+        results = []
+        for execution in executions:
+            failed_at = None
+            if execution.overallstatus == 'failed':
+                failed_at = self.random.randrange(len(steps.get(execution.test_case_id, [None])))
+            for index, step_id in enumerate(steps.get(execution.test_case_id, [])):
+                duration = round(self.random.uniform(0.2, 3.0), 3)
+                status = 'passed' if failed_at is None or index < failed_at else (
+                    'failed' if index == failed_at else 'skipped'
+                )
+                results.append(StepResult(
+                    test_execution=execution,
+                    test_step_id=step_id,
+                    status=status,
+                    duration=duration,
+                    time_start=now,
+                    time_end=now + timedelta(seconds=duration),
+                    log_message=f'Step {index + 1} {status}',
+                    error='Element not found' if status == 'failed' else None,
+                ))
+        StepResult.objects.bulk_create(results, batch_size=BULK_BATCH_SIZE)
+        return len(results)
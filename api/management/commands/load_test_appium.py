@@ -0,0 +1,181 @@
+import asyncio
+import json
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from api.appium_service import CriticalStepError
+from api.execution_plan import get_plans
+from api.fake_webdriver import MISSING_MARKER, FakeWebDriverServer
+from api.log_stream import log_aggregator
+from api.management.commands.fake_appium_server import parse_rates
+from api.metrics import snapshot
+from api.session_pool import AppiumSessionPool
+
+IDENTIFIERS = ['XPATH', 'ID', 'ACCESSIBILITY_ID', 'ANDROID_UIAUTOMATOR', 'CLASS_NAME']
+
+
+class Command(BaseCommand):
+    help = (
+        'Drives many concurrent Appium sessions through AppiumSessionPool / AppiumService '
+        '(start_session, execute_step, end_session) and reports step throughput and latency. '
+        'Runs against an embedded fake_appium_server by default, so no phone is needed.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sessions', type=int, default=8, help='Concurrent sessions (one fake device each)')
+        parser.add_argument('--steps', type=int, default=50, help='Steps run per session')
+        parser.add_argument('--test-cases', help='Comma separated test case ids whose steps are run in turn '
+                                                 '(default: synthetic steps)')
+        parser.add_argument('--missing-rate', type=float, default=0.0,
+                            help='Share of synthetic steps whose element never appears')
+        parser.add_argument('--step-timeout', type=float, default=1.0, help='Element wait per step, in seconds')
+        parser.add_argument('--server', help='host:port of a running (fake) Appium server instead of an embedded one')
+        parser.add_argument('--latency', default='', help='Embedded server latencies, see fake_appium_server')
+        parser.add_argument('--failure-rates', default='', help='Embedded server failure rates, see fake_appium_server')
+        parser.add_argument('--redis-logs', action='store_true',
+                            help='Send session logs through the configured channel layer instead of an in-memory one')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', help='Write the results to this JSON file')
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        steps = self._steps(options)
+
+        server = None
+        if options['server']:
+            host, _, port = options['server'].rpartition(':')
+        else:
+            server = FakeWebDriverServer(
+                port=0,
+                latency=parse_rates(options['latency']),
+                failure_rates=parse_rates(options['failure_rates']),
+                seed=options['seed'],
+            ).start()
+            host, port = server.address
+
+        overrides = {'APPIUM_HOST': host, 'APPIUM_PORT': int(port), 'APPIUM_MAX_SESSIONS': options['sessions']}
+        if not options['redis_logs']:
+            overrides['CHANNEL_LAYERS'] = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+        try:
+            with override_settings(**overrides):
+                report = asyncio.run(self._run(steps, options))
+        finally:
+            if server is not None:
+                server.stop()
+        if server is not None:
+            report['server_commands'] = server.commands
+
+        self._print(report)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'Results written to {options["output"]}'))
+
+    def _steps(self, options):
+        """The step payloads every session runs, repeated up to --steps."""
+        if options['test_cases']:
+            test_case_ids = [int(test_case_id) for test_case_id in options['test_cases'].split(',')]
+            plans = get_plans(test_case_ids)
+            steps = [step for test_case_id in test_case_ids for step in plans.get(test_case_id, {}).get('steps', [])]
+            if not steps:
+                raise CommandError('These test cases have no steps')
+        else:
+            steps = []
+            for order in range(1, options['steps'] + 1):
+                identifier = IDENTIFIERS[order % len(IDENTIFIERS)]
+                missing = self.random.random() < options['missing_rate']
+                steps.append({
+                    'ID': order,
+                    'Step_order': order,
+                    'ElementId': f'//android.widget.Button[@text="{MISSING_MARKER if missing else "step"} {order}"]',
+                    'ElementIdentifier': identifier,
+                    'Action': 'send_keys' if order % 4 == 0 else 'click',
+                    'ActualInput': f'input {order}',
+                    'Application_id': 0,
+                })
+        steps = [{**step, 'Timeout': options['step_timeout']} for step in steps]
+        return [steps[index % len(steps)] for index in range(options['steps'])]
+
+    async def _run(self, steps, options):
+        pool = AppiumSessionPool(max_sessions=options['sessions'])
+        started = time.perf_counter()
+        sessions = await asyncio.gather(*(
+            self._session(pool, index, steps) for index in range(options['sessions'])
+        ))
+        elapsed = time.perf_counter() - started
+        # Send the remaining log lines while the overridden CHANNEL_LAYERS is still in place.
+        await log_aggregator.drain()
+
+        step_times = sorted(t for session in sessions for t in session['step_seconds'])
+        start_times = sorted(session['start_seconds'] for session in sessions if session['start_seconds'] is not None)
+        executed = len(step_times)
+        return {
+            'sessions': options['sessions'],
+            'steps_per_session': len(steps),
+            'elapsed_seconds': round(elapsed, 3),
+            'steps_executed': executed,
+            'steps_per_second': round(executed / elapsed, 2) if elapsed else None,
+            'step_p50_ms': self._ms(statistics.median(step_times)) if step_times else None,
+            'step_p95_ms': self._ms(step_times[min(executed - 1, int(executed * 0.95))]) if step_times else None,
+            'session_start_p50_ms': self._ms(statistics.median(start_times)) if start_times else None,
+            'sessions_failed': sum(1 for session in sessions if session['error']),
+            'steps_failed': sum(session['steps_failed'] for session in sessions),
+            'elements_not_found': sum(session['not_found'] for session in sessions),
+            'errors': sorted({session['error'] for session in sessions if session['error']}),
+            # AppiumService's own find/action split and locator cache counters, for this run only.
+            'metrics': {name: value for name, value in snapshot().items() if name.startswith(('appium_', 'locator_'))},
+        }
+
+    async def _session(self, pool, index, steps):
+        result = {'start_seconds': None, 'step_seconds': [], 'steps_failed': 0, 'not_found': 0, 'error': None}
+        capabilities = {'platformName': 'Android', 'appium:udid': f'load-test-{index}',
+                        'appium:deviceName': f'Load test device {index}'}
+        started = time.perf_counter()
+        try:
+            session = await pool.acquire(capabilities, user_id=index)
+        except Exception as e:
+            result['error'] = f'{type(e).__name__}: {e}'
+            return result
+        result['start_seconds'] = time.perf_counter() - started
+
+        try:
+            for step in steps:
+                started = time.perf_counter()
+                try:
+                    response = await pool.execute_step(session.session_id, step, user_id=index)
+                    if not response['success']:
+                        result['steps_failed'] += 1
+                except CriticalStepError:
+                    result['not_found'] += 1
+                result['step_seconds'].append(time.perf_counter() - started)
+        except Exception as e:
+            result['error'] = f'{type(e).__name__}: {e}'
+        finally:
+            try:
+                await pool.release(session.session_id, user_id=index)
+            except Exception as e:
+                result['error'] = result['error'] or f'{type(e).__name__}: {e}'
+        return result
+
+    def _ms(self, seconds):
+        return round(seconds * 1000, 2)
+
+    def _print(self, report):
+        self.stdout.write(
+            f'{report["sessions"]} sessions x {report["steps_per_session"]} steps in {report["elapsed_seconds"]} s: '
+            f'{report["steps_per_second"]} steps/s'
+        )
+        self.stdout.write(
+            f'step p50 {report["step_p50_ms"]} ms  p95 {report["step_p95_ms"]} ms  '
+            f'session start p50 {report["session_start_p50_ms"]} ms'
+        )
+        self.stdout.write(
+            f'{report["sessions_failed"]} sessions failed, {report["steps_failed"]} actions failed, '
+            f'{report["elements_not_found"]} elements not found'
+        )
+        for error in report['errors']:
+            self.stdout.write(self.style.ERROR(f'  {error}'))
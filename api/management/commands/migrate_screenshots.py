@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.blob_store import get_blob_store, store_screenshot
+from api.models import StepResult
+
+
+class Command(BaseCommand):
+    help = 'Moves base64 StepResult.actual_screenshot values into the blob store, leaving only the hash on the row.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200, help='Rows loaded and updated per transaction')
+        parser.add_argument('--limit', type=int, default=None, help='Stop after this many rows')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        limit = options['limit']
+        store = get_blob_store()
+        last_id = 0
+        moved = 0
+
+        while limit is None or moved < limit:
+            size = batch_size if limit is None else min(batch_size, limit - moved)
+            # Walk by id so each batch is an index range scan, not an ever-growing OFFSET.
+            rows = list(
+                StepResult.objects.filter(id__gt=last_id, actual_screenshot__isnull=False)
+                .exclude(actual_screenshot='')
+                .order_by('id')
+                .only('id', 'actual_screenshot', 'screenshot_hash')[:size]
+            )
+            if not rows:
+                break
+
+            for row in rows:
+                row.screenshot_hash = store_screenshot(row.actual_screenshot, store=store)
+                row.actual_screenshot = None
+            with transaction.atomic():
+                StepResult.objects.bulk_update(rows, ['screenshot_hash', 'actual_screenshot'])
+
+            last_id = rows[-1].id
+            moved += len(rows)
+            self.stdout.write(f'Moved {moved} screenshots (last id {last_id})')
+
+        self.stdout.write(self.style.SUCCESS(f'Done: {moved} screenshots moved to the blob store'))
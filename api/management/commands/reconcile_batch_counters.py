@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.batch_progress import batch_counts
+from api.models import BatchAssignment
+
+
+class Command(BaseCommand):
+    help = 'Recounts BatchAssignment total/completed/passed test cases and fixes any that drifted.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('batch_ids', nargs='*', type=int, help='Only these batches (default: all)')
+        parser.add_argument('--batch-size', type=int, default=500, help='Batches checked per transaction')
+        parser.add_argument('--dry-run', action='store_true', help='Report drift without writing')
+
+    def handle(self, *args, **options):
+        batches = BatchAssignment.objects.order_by('id')
+        if options['batch_ids']:
+            batches = batches.filter(id__in=options['batch_ids'])
+
+        checked = fixed = 0
+        last_id = 0
+        while True:
+            chunk = list(
+                batches.filter(id__gt=last_id)[:options['batch_size']]
+            )
+            if not chunk:
+                break
+            last_id = chunk[-1].id
+            counts = batch_counts([batch.id for batch in chunk])
+
+            drifted = []
+            for batch in chunk:
+                row = counts.get(batch.id, {'total': 0, 'completed': 0, 'passed': 0})
+                expected = (row['total'], row['completed'], row['passed'])
+                stored = (batch.totaltestcases, batch.completedtestcases, batch.passedtestcases)
+                if stored != expected:
+                    self.stdout.write(f'Batch {batch.id}: total/completed/passed {stored} -> {expected}')
+                    batch.totaltestcases, batch.completedtestcases, batch.passedtestcases = expected
+                    drifted.append(batch)
+
+            if drifted and not options['dry_run']:
+                with transaction.atomic():
+                    BatchAssignment.objects.bulk_update(
+                        drifted, ['totaltestcases', 'completedtestcases', 'passedtestcases']
+                    )
+            checked += len(chunk)
+            fixed += len(drifted)
+
+        verb = 'would be fixed' if options['dry_run'] else 'fixed'
+        self.stdout.write(self.style.SUCCESS(f'Checked {checked} batches, {fixed} {verb}'))
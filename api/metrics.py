@@ -0,0 +1,81 @@
+import bisect
+import threading
+
+# Upper bounds in seconds, tuned for per-step Appium latencies.
+DEFAULT_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60)
+
+
+class Histogram:
+    """Bucketed (non-cumulative) histogram, cheap enough to record on every step."""
+
+    def __init__(self, name, buckets=DEFAULT_LATENCY_BUCKETS):
+        self.name = name
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self):
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+        labels = [f'le_{b}' for b in self.buckets] + ['le_inf']
+        return {
+            'count': count,
+            'sum': round(total, 4),
+            'mean': round(total / count, 4) if count else None,
+            'buckets': dict(zip(labels, counts)),
+        }
+
+
+class Counter:
+    def __init__(self, name):
+        self.name = name
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self):
+        return self._value
+
+    def snapshot(self):
+        return self._value
+
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def _get_or_create(name, factory):
+    with _registry_lock:
+        metric = _registry.get(name)
+        if metric is None:
+            metric = _registry[name] = factory()
+        return metric
+
+
+def histogram(name, buckets=DEFAULT_LATENCY_BUCKETS):
+    return _get_or_create(name, lambda: Histogram(name, buckets))
+
+
+def counter(name):
+    return _get_or_create(name, lambda: Counter(name))
+
+
+def snapshot():
+    """All metrics recorded in this process, keyed by name."""
+    with _registry_lock:
+        metrics = dict(_registry)
+    return {name: metric.snapshot() for name, metric in sorted(metrics.items())}
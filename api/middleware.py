@@ -1,4 +1,12 @@
 # api/middleware.py
+import json
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
 from django.http import JsonResponse
 from rest_framework.exceptions import AuthenticationFailed
 from rest_framework_simplejwt.tokens import UntypedToken
@@ -6,6 +14,11 @@ from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from django.utils.deprecation import MiddlewareMixin
 
+from .metrics import histogram
+
+profiling_logger = logging.getLogger('api.profiling')
+request_seconds = histogram('http_request_seconds')
+
 
 class JWTAuthenticationFromCookieMiddleware(MiddlewareMixin):
     def process_request(self, request):
@@ -23,3 +36,80 @@ class JWTAuthenticationFromCookieMiddleware(MiddlewareMixin):
             except (TokenError, InvalidToken):
                 return JsonResponse({'detail': 'Invalid or expired tokenjj'}, status=401)
         return None
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryProfilingMiddleware:
+    """
+    Opt-in (QUERY_PROFILING) per-request profile: SQL query count, time spent in
+    the database, wall time and response size. Sent back as a Server-Timing
+    header and logged as one structured `api.profiling` record per request.
+
+    A view can declare `query_budget = <max queries>` (QUERY_BUDGET_DEFAULT
+    applies otherwise). Going over it is logged as a warning, or raises
+    QueryBudgetExceeded when QUERY_BUDGET_STRICT is on, so tests catch new
+    N+1 patterns.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_PROFILING', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        profile = {'queries': 0, 'db_seconds': 0.0}
+
+        def record(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                profile['queries'] += 1
+                profile['db_seconds'] += time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(record))
+            response = self.get_response(request)
+        wall_seconds = time.perf_counter() - started
+
+        view = getattr(request, 'profiled_view', None)
+        budget = getattr(view, 'query_budget', getattr(settings, 'QUERY_BUDGET_DEFAULT', None))
+        size = None if response.streaming else len(response.content)
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={profile["db_seconds"] * 1000:.1f};desc="{profile["queries"]} queries"',
+            f'app;dur={(wall_seconds - profile["db_seconds"]) * 1000:.1f}',
+            f'total;dur={wall_seconds * 1000:.1f}',
+        ])
+        record_data = {
+            'method': request.method,
+            'path': request.path,
+            'view': view.__name__ if view is not None else None,
+            'status': response.status_code,
+            'queries': profile['queries'],
+            'query_budget': budget,
+            'db_ms': round(profile['db_seconds'] * 1000, 1),
+            'wall_ms': round(wall_seconds * 1000, 1),
+            'response_bytes': size,
+        }
+        profiling_logger.info(json.dumps(record_data), extra={'profile': record_data})
+        request_seconds.observe(wall_seconds)
+
+        if budget is not None and profile['queries'] > budget:
+            message = (
+                f'{record_data["view"]} ran {profile["queries"]} queries for '
+                f'{request.method} {request.path}, budget is {budget}'
+            )
+            if getattr(settings, 'QUERY_BUDGET_STRICT', False):
+                raise QueryBudgetExceeded(message)
+            profiling_logger.warning(message)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Class-based views are wrapped in a function; the budget lives on the class.
+        request.profiled_view = getattr(view_func, 'view_class', view_func)
+        return None
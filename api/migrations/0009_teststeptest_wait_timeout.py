@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_alter_batchassignment_unique_together_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='teststeptest',
+            name='wait_timeout',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_teststeptest_wait_timeout'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stepresult',
+            name='screenshot_hash',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+    ]
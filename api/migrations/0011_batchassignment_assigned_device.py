@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_stepresult_screenshot_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='batchassignment',
+            name='assigned_device',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='api.device'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:28
+
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+DELETE_BATCH_SIZE = 1000
+
+
+def delete_duplicate_step_results(apps, schema_editor):
+    # Keep the newest result of every (execution, step) pair, which is the one
+    # update_or_create and result ingest have been reading back.
+    StepResult = apps.get_model('api', 'StepResult')
+    duplicates = StepResult.objects.values('test_execution_id', 'test_step_id').annotate(
+        keep=Max('id'), results=Count('id')
+    ).filter(results__gt=1).order_by()
+    stale = []
+    for row in duplicates:
+        stale.extend(StepResult.objects.filter(
+            test_execution_id=row['test_execution_id'], test_step_id=row['test_step_id'], id__lt=row['keep']
+        ).values_list('id', flat=True))
+    for start in range(0, len(stale), DELETE_BATCH_SIZE):
+        StepResult.objects.filter(id__in=stale[start:start + DELETE_BATCH_SIZE]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_batchassignment_assigned_device'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_step_results, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='batchassignment',
+            index=models.Index(fields=['assigned_to', 'status', 'updated_at'], name='batch_to_status_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='batchassignment',
+            index=models.Index(fields=['assigned_by', 'status', 'updated_at'], name='batch_by_status_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='testassignment',
+            index=models.Index(fields=['assigned_to', 'status'], name='testassign_to_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='testassignment',
+            index=models.Index(fields=['assigned_by', 'status'], name='testassign_by_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='testexecution',
+            index=models.Index(fields=['batch', 'overallstatus'], name='testexec_batch_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='teststeptest',
+            index=models.Index(fields=['testcase', 'step_order'], name='teststep_case_order_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='stepresult',
+            constraint=models.UniqueConstraint(fields=('test_execution', 'test_step'), name='stepresult_execution_step_uniq'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-18 13:00
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicate_devices(apps, schema_editor):
+    # Keep the oldest row of every device_uuid, the one the device registry has
+    # been reusing, and move executions and batch assignments over to it before
+    # the duplicates go (executions would cascade with them).
+    Device = apps.get_model('api', 'Device')
+    TestExecution = apps.get_model('api', 'TestExecution')
+    BatchAssignment = apps.get_model('api', 'BatchAssignment')
+    duplicates = Device.objects.exclude(device_uuid=None).values('device_uuid').annotate(
+        keep=Min('id'), rows=Count('id')
+    ).filter(rows__gt=1).order_by()
+    for row in duplicates:
+        stale = list(Device.objects.filter(device_uuid=row['device_uuid'], id__gt=row['keep']).values_list('id', flat=True))
+        TestExecution.objects.filter(executed_device_id__in=stale).update(executed_device_id=row['keep'])
+        BatchAssignment.objects.filter(assigned_device_id__in=stale).update(assigned_device_id=row['keep'])
+        Device.objects.filter(id__in=stale).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_step_result_unique_and_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_devices, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='device',
+            name='device_uuid',
+            field=models.CharField(blank=True, max_length=255, null=True, unique=True),
+        ),
+    ]
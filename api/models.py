@@ -129,11 +129,16 @@ class TestStepTest(models.Model):
     parameter_name = models.CharField(max_length=100, null=True, blank=True, default=None)  # e.g., "Phone Number"
     input_field_type = models.CharField(max_length=50, null=True, blank=True, default='static')
     element_screenshots = models.CharField(max_length=255, blank=True, null=True)
+    wait_timeout = models.FloatField(blank=True, null=True)  # seconds to wait for the element; APPIUM_ELEMENT_TIMEOUT if unset
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['step_order']
+        indexes = [
+            # Execution plans, rerun and recorder load a test case's steps in step_order.
+            models.Index(fields=['testcase', 'step_order'], name='teststep_case_order_idx'),
+        ]
 
     def __str__(self):
         return f"Step {self.step_order} for TestCase {self.testcase.id}"
@@ -179,7 +184,7 @@ class TestStep(models.Model):
         unique_together = ('testcase', 'step_order')
 
 class Device(models.Model):
-    device_uuid = models.CharField(max_length=255, blank=True, null=True)
+    device_uuid = models.CharField(max_length=255, blank=True, null=True, unique=True)
     device_name = models.CharField(max_length=255)
     platform = models.CharField(max_length=255)
     os_version = models.CharField(max_length=255)
@@ -202,6 +207,12 @@ class TestExecution(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Batch progress counters (api.batch_progress) count a batch's executions per status.
+            models.Index(fields=['batch', 'overallstatus'], name='testexec_batch_status_idx'),
+        ]
+
 class TestAssignment(models.Model):
     test_case = models.ForeignKey(TestCase, on_delete=models.CASCADE)
     assigned_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='test_assignments_made' )
@@ -226,6 +237,13 @@ class TestAssignment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Tester and manager dashboards: one user's assignments, filtered by status.
+            models.Index(fields=['assigned_to', 'status'], name='testassign_to_status_idx'),
+            models.Index(fields=['assigned_by', 'status'], name='testassign_by_status_idx'),
+        ]
+
 class TestType(models.Model):
      name = models.CharField(max_length=255)
      created_at = models.DateTimeField(auto_now_add=True)
@@ -281,6 +299,7 @@ class BatchAssignment(models.Model):
     customgroup = models.ForeignKey(CustomTestGroup, on_delete=models.SET_NULL, null=True, blank=True)
     application = models.ForeignKey('Application', on_delete=models.SET_NULL, null=True, blank=True)
     suite = models.ForeignKey('TestSuite', on_delete=models.SET_NULL, null=True, blank=True)
+    assigned_device = models.ForeignKey(Device, on_delete=models.SET_NULL, null=True, blank=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, blank=True, null=True)
     notes = models.TextField(blank=True, null=True)
     priority = models.CharField(max_length=10, choices=TestAssignment.PRIORITY_CHOICES, default='medium')
@@ -303,6 +322,11 @@ class BatchAssignment(models.Model):
     
     class Meta:
         unique_together = ('name', "assigned_by", "application", "customgroup", "suite")
+        indexes = [
+            # Batch lists: one user's batches, filtered by status, newest activity first.
+            models.Index(fields=['assigned_to', 'status', 'updated_at'], name='batch_to_status_updated_idx'),
+            models.Index(fields=['assigned_by', 'status', 'updated_at'], name='batch_by_status_updated_idx'),
+        ]
 
 
 class BatchAssignmentTestCase(models.Model):
@@ -319,7 +343,8 @@ class StepResult(models.Model):
     test_step = models.ForeignKey(TestStepTest, on_delete=models.CASCADE)
     actual_id = models.TextField(blank=True, null=True)
     actual_input = models.CharField(max_length=20, blank=True, null=True)
-    actual_screenshot = models.TextField(blank=True, null=True)
+    actual_screenshot = models.TextField(blank=True, null=True)  # legacy base64, moved out by `manage.py migrate_screenshots`
+    screenshot_hash = models.CharField(max_length=64, blank=True, null=True)  # key in api.blob_store
     STATUS_CHOICES = [
         ('passed', 'Passed'),
         ('failed', 'Failed'),
@@ -334,6 +359,12 @@ class StepResult(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = [
+            # One result per step of an execution; result ingest and the batch runner upsert on it.
+            models.UniqueConstraint(fields=['test_execution', 'test_step'], name='stepresult_execution_step_uniq'),
+        ]
+
 class UIComparator(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     figma_design = models.CharField(max_length=255)
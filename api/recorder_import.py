@@ -0,0 +1,54 @@
+from django.db import transaction
+
+from .models import ElementIdentifierType, TestStepTest
+
+# Appium recorder `by` flags (lower-cased, dashes removed) -> ElementIdentifierType.name
+IDENTIFIER_FLAGS = {
+    "android uiautomator": "ANDROID_UIAUTOMATOR",
+    "id": "ID",
+    "class name": "CLASS_NAME",
+    "xpath": "XPATH",
+    "accessibility id": "ACCESSIBILITY_ID"
+}
+
+BULK_BATCH_SIZE = 500
+
+
+def normalize_by_flag(by_flag):
+    return str(by_flag).strip().replace("-", "").lower()
+
+
+class IdentifierTypes:
+    """All ElementIdentifierType rows, loaded with one query for a whole import."""
+
+    def __init__(self):
+        self.by_name = {identifier.name: identifier for identifier in ElementIdentifierType.objects.all()}
+
+    def identifier_name(self, by_flag):
+        return IDENTIFIER_FLAGS.get(normalize_by_flag(by_flag))
+
+    def get(self, by_flag):
+        """ElementIdentifierType for a recorder `by` flag, or None if unknown."""
+        return self.by_name.get(self.identifier_name(by_flag))
+
+
+def bulk_create_steps(steps):
+    """
+    Inserts unsaved TestStepTest objects with bulk_create in one transaction and
+    makes sure each has its id afterwards. MySQL doesn't return ids from a bulk
+    insert, so they are read back by (testcase, step_order) in one query.
+    """
+    if not steps:
+        return steps
+    with transaction.atomic():
+        TestStepTest.objects.bulk_create(steps, batch_size=BULK_BATCH_SIZE)
+        if any(step.pk is None for step in steps):
+            ids = {
+                (testcase_id, step_order): step_id
+                for step_id, testcase_id, step_order in TestStepTest.objects.filter(
+                    testcase_id__in={step.testcase_id for step in steps}
+                ).values_list('id', 'testcase_id', 'step_order')
+            }
+            for step in steps:
+                step.pk = ids.get((step.testcase_id, step.step_order))
+    return steps
@@ -0,0 +1,150 @@
+import logging
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .batch_progress import recompute_batch_counters
+from .blob_store import store_screenshot
+from .models import StepResult, TestExecution, TestStepTest
+
+logger = logging.getLogger(__name__)
+
+BULK_BATCH_SIZE = 500
+# Longer inputs are cut like the batch runner does; one oversized value would otherwise fail the whole batch.
+ACTUAL_INPUT_MAX_LENGTH = StepResult._meta.get_field('actual_input').max_length
+
+
+# StepResult columns an upload sets; updated_at follows whenever one of them changes.
+UPDATED_FIELDS = (
+    'actual_id', 'actual_input', 'status', 'duration', 'time_start', 'time_end', 'log_message', 'error',
+    'screenshot_hash',
+)
+
+
+def _as_id(value):
+    """Ids arrive from JSON as ints or numeric strings; anything else never matches a row."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_time(value):
+    if not value or not isinstance(value, str):
+        return value or None
+    return parse_datetime(value)
+
+
+def _step_result_values(step_data, now):
+    actual_input = step_data.get('actual_input')
+    return {
+        'actual_id': step_data.get('actual_id'),
+        'actual_input': str(actual_input)[:ACTUAL_INPUT_MAX_LENGTH] if actual_input is not None else None,
+        'status': step_data.get('status'),
+        'duration': step_data.get('duration'),
+        'time_start': _parse_time(step_data.get('time_start')),
+        'time_end': _parse_time(step_data.get('time_end')),
+        'log_message': step_data.get('log_message'),
+        'error': step_data.get('error'),
+        'screenshot_hash': store_screenshot(step_data.get('screenshot')),
+        'updated_at': now,
+    }
+
+
+def upsert_step_results(rows):
+    """
+    Bulk equivalent of StepResult.objects.update_or_create(test_execution, test_step)
+    for many rows. `rows` is a list of (test_execution_id, step_data) where
+    step_data carries test_step_id and the result fields. New (execution, step)
+    pairs are bulk-inserted; existing results keep their id and created_at and
+    are bulk-updated, only the rows and columns whose values changed. Runs a
+    fixed number of queries per 500 rows; call it inside a transaction.
+    Returns (saved_count, errors) where errors are (execution_id, step_id, message).
+    """
+    errors = []
+    latest = {}
+    for execution_id, step_data in rows:
+        # A step reported twice in one upload: the last report wins, as before.
+        latest[(execution_id, _as_id(step_data.get('test_step_id')))] = step_data
+    if not latest:
+        return 0, errors
+
+    step_ids = {step_id for _, step_id in latest}
+    valid_step_ids = set(
+        TestStepTest.objects.filter(id__in=[s for s in step_ids if s]).values_list('id', flat=True)
+    )
+    existing = {
+        (result.test_execution_id, result.test_step_id): result
+        for result in StepResult.objects.filter(
+            test_execution_id__in={execution_id for execution_id, _ in latest},
+            test_step_id__in=valid_step_ids
+        ).only('id', 'test_execution_id', 'test_step_id', *UPDATED_FIELDS)
+    }
+
+    now = timezone.now()
+    to_create, to_update, changed_fields = [], [], set()
+    saved = 0
+    for (execution_id, step_id), step_data in latest.items():
+        if step_id not in valid_step_ids:
+            errors.append((execution_id, step_id, f"Failed to save step result for Test Step ID {step_data.get('test_step_id')}: TestStepTest matching query does not exist."))
+            continue
+        saved += 1
+        values = _step_result_values(step_data, now)
+        result = existing.get((execution_id, step_id))
+        if result is None:
+            to_create.append(StepResult(test_execution_id=execution_id, test_step_id=step_id, **values))
+            continue
+        changed = [field for field in UPDATED_FIELDS if getattr(result, field) != values[field]]
+        if changed:
+            for field in changed:
+                setattr(result, field, values[field])
+            result.updated_at = now
+            changed_fields.update(changed)
+            to_update.append(result)
+
+    if to_update:
+        StepResult.objects.bulk_update(to_update, [*sorted(changed_fields), 'updated_at'], batch_size=BULK_BATCH_SIZE)
+    StepResult.objects.bulk_create(to_create, batch_size=BULK_BATCH_SIZE)
+    return saved, errors
+
+
+def ingest_batch_results(batch, test_case_results):
+    """
+    Saves the SaveBatchTestResultsView payload in one transaction: executions and
+    steps are looked up with one query each, step results are bulk inserted /
+    updated, and the batch counters are recomputed in SQL.
+    Returns (saved_test_case_count, errors).
+    """
+    execution_ids = {_as_id(tc.get('test_execution_id')) for tc in test_case_results}
+    executions = TestExecution.objects.in_bulk(
+        [execution_id for execution_id in execution_ids if execution_id is not None]
+    )
+    errors = []
+    rows = []
+    updated_executions = []
+    case_for_execution = {}
+    now = timezone.now()
+
+    for tc_result in test_case_results:
+        execution_id = _as_id(tc_result.get('test_execution_id'))
+        execution = executions.get(execution_id)
+        if execution is None or execution.batch_id != batch.id:
+            errors.append(f"Failed to process Test Case Execution ID {tc_result.get('test_execution_id')}: TestExecution matching query does not exist.")
+            continue
+        execution.overallstatus = tc_result.get('status')
+        execution.updated_at = now
+        updated_executions.append(execution)
+        case_for_execution[execution_id] = tc_result
+        rows.extend((execution_id, step_data) for step_data in tc_result.get('step_results', []))
+
+    with transaction.atomic():
+        TestExecution.objects.bulk_update(updated_executions, ['overallstatus', 'updated_at'], batch_size=BULK_BATCH_SIZE)
+        _, step_errors = upsert_step_results(rows)
+        recompute_batch_counters([batch.id])
+
+    errors.extend(message for _, _, message in step_errors)
+    for message in errors:
+        logger.error(message)
+    failed_executions = {execution_id for execution_id, _, _ in step_errors}
+    return len(set(case_for_execution) - failed_executions), errors
@@ -0,0 +1,154 @@
+import json
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import StepResult, TestAssignment, TestExecution
+from .result_ingest import _as_id, upsert_step_results
+
+logger = logging.getLogger(__name__)
+
+READ_CHUNK_SIZE = 64 * 1024
+
+
+class NDJSONLineTooLong(Exception):
+    pass
+
+
+def iter_ndjson(stream, max_line_bytes=None, chunk_size=READ_CHUNK_SIZE):
+    """
+    Yields (line_number, parsed object or ValueError) for each non-empty line of a
+    newline-delimited JSON body. The stream is read in fixed-size chunks, so at
+    most one line (capped at max_line_bytes) is held in memory at a time.
+    """
+    max_line_bytes = max_line_bytes or getattr(settings, 'RESULT_STREAM_MAX_LINE_BYTES', 16 * 1024 * 1024)
+    parts, size = [], 0  # pieces of the line being read, joined once its newline arrives
+    line_number = 0
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        *lines, rest = chunk.split(b'\n')
+        for line in lines:
+            if parts:
+                line, parts, size = b''.join(parts) + line, [], 0
+            line_number += 1
+            if line.strip():
+                yield line_number, _parse_line(line)
+        if rest:
+            parts.append(rest)
+            size += len(rest)
+            if size > max_line_bytes:
+                raise NDJSONLineTooLong(f'Line {line_number + 1} is longer than {max_line_bytes} bytes')
+    line = b''.join(parts)
+    if line.strip():
+        yield line_number + 1, _parse_line(line)
+
+
+def _parse_line(line):
+    try:
+        item = json.loads(line)
+    except ValueError as e:
+        return e
+    if not isinstance(item, dict):
+        return ValueError('Each line must be a JSON object')
+    return item
+
+
+class ResultStreamWriter:
+    """
+    Persists the result lines of one POST in small transactions. Step lines are
+    buffered and flushed every RESULT_STREAM_FLUSH_ROWS rows (or sooner once their
+    screenshots pass RESULT_STREAM_FLUSH_BYTES), which bounds memory and keeps the
+    lines saved so far if processing fails halfway through the body.
+
+    The body itself is only available once the whole request has arrived: under
+    ASGI, Django reads it completely before the view runs, and a client that
+    disconnects mid-upload has nothing of that POST saved. Resuming therefore
+    works per request, see StreamTestResultsView.
+
+    Step line:      {"test_execution_id": 12, "test_step_id": 229, "status": "passed", ...}
+    Execution line: {"test_execution_id": 12, "overall_status": "passed"}
+    """
+
+    def __init__(self, default_execution_id=None):
+        self.default_execution_id = default_execution_id
+        self.flush_rows = getattr(settings, 'RESULT_STREAM_FLUSH_ROWS', 50)
+        self.flush_bytes = getattr(settings, 'RESULT_STREAM_FLUSH_BYTES', 8 * 1024 * 1024)
+        self.executions = {}  # id -> TestExecution, or None when it does not exist
+        self.pending = []
+        self.pending_bytes = 0
+        self.saved = 0
+        self.finished = {}
+        self.errors = []
+
+    def add(self, line_number, item):
+        if isinstance(item, Exception):
+            self.errors.append(f'Line {line_number}: invalid JSON ({str(item)})')
+            return
+        execution_id = _as_id(item.get('test_execution_id', self.default_execution_id))
+        if self._get_execution(execution_id) is None:
+            self.errors.append(f"Line {line_number}: Test Case Execution ID {item.get('test_execution_id', self.default_execution_id)} does not exist")
+            return
+
+        if item.get('test_step_id') is None:
+            if not item.get('overall_status'):
+                self.errors.append(f'Line {line_number}: expected test_step_id or overall_status')
+                return
+            # Steps for this execution must be saved before it is marked finished.
+            self.flush()
+            self._finish_execution(execution_id, item['overall_status'])
+            return
+
+        self.pending.append((execution_id, item))
+        self.pending_bytes += len(item.get('screenshot') or '')
+        if len(self.pending) >= self.flush_rows or self.pending_bytes >= self.flush_bytes:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        rows, self.pending, self.pending_bytes = self.pending, [], 0
+        with transaction.atomic():
+            saved, errors = upsert_step_results(rows)
+        self.saved += saved
+        self.errors.extend(message for _, _, message in errors)
+
+    def _get_execution(self, execution_id):
+        if execution_id not in self.executions:
+            self.executions[execution_id] = (
+                TestExecution.objects.filter(id=execution_id).first() if execution_id is not None else None
+            )
+        return self.executions[execution_id]
+
+    def _finish_execution(self, execution_id, overall_status):
+        execution = self.executions[execution_id]
+        with transaction.atomic():
+            # Batch counters follow the save through api.signals.
+            execution.overallstatus = overall_status
+            execution.save(update_fields=['overallstatus', 'updated_at'])
+            if not execution.batch_id:
+                TestAssignment.objects.filter(execution=execution).update(
+                    status='completed_pass' if overall_status == 'passed' else 'completed_fail',
+                    updated_at=timezone.now()
+                )
+        self.finished[execution_id] = overall_status
+
+    def summary(self):
+        return {
+            'saved_step_results': self.saved,
+            'finished_executions': self.finished,
+            'errors': self.errors,
+        }
+
+
+def saved_step_ids(execution_ids):
+    """{execution_id: [test_step_id, ...]} already stored, for resuming an interrupted upload."""
+    saved = {execution_id: [] for execution_id in execution_ids}
+    for execution_id, step_id in StepResult.objects.filter(
+        test_execution_id__in=execution_ids
+    ).values_list('test_execution_id', 'test_step_id').order_by('test_execution_id', 'test_step_id'):
+        saved[execution_id].append(step_id)
+    return saved
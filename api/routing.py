@@ -3,4 +3,5 @@ from . import consumers
 
 websocket_urlpatterns = [
     re_path(r'ws/appium/$', consumers.AppiumConsumer.as_asgi()),
+    re_path(r'ws/appium/(?P<session_id>[\w-]+)/$', consumers.AppiumConsumer.as_asgi()),
 ]
\ No newline at end of file
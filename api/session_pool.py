@@ -0,0 +1,215 @@
+import asyncio
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager
+
+from django.conf import settings
+
+from .appium_service import AppiumService
+
+logger = logging.getLogger(__name__)
+
+
+class SessionPoolError(Exception):
+    """Base error for session pool failures (maps to a 4xx response in the views)."""
+    status_code = 400
+
+
+class SessionNotFoundError(SessionPoolError):
+    status_code = 404
+
+
+class SessionOwnerError(SessionPoolError):
+    status_code = 403
+
+
+class DeviceBusyError(SessionPoolError):
+    status_code = 409
+
+
+class SessionPoolFullError(SessionPoolError):
+    status_code = 503
+
+
+class PooledSession:
+    """One live Appium driver bound to a device (UDID) and the tester who opened it."""
+
+    def __init__(self, service, udid, user_id=None):
+        self.service = service
+        self.udid = udid
+        self.user_id = user_id
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        # threading.Lock rather than asyncio.Lock: sessions are touched from the
+        # request loop and from batch-runner loops, and an asyncio.Lock is bound
+        # to a single event loop.
+        self.lock = threading.Lock()
+
+    @property
+    def session_id(self):
+        return self.service.session_id
+
+    def touch(self):
+        self.last_used = time.monotonic()
+
+    def idle_seconds(self):
+        return time.monotonic() - self.last_used
+
+    def as_dict(self):
+        return {
+            'sessionId': self.session_id,
+            'udid': self.udid,
+            'user_id': self.user_id,
+            'idle_seconds': round(self.idle_seconds(), 1),
+            'busy': self.lock.locked(),
+        }
+
+
+class AppiumSessionPool:
+    """
+    Process-wide registry of Appium sessions keyed by session id, with at most one
+    session per device. Only the tester who opened a session (its user_id) may
+    run steps on it or end it. Steps on the same session are serialised through the
+    session lock; different sessions run concurrently.
+    """
+
+    def __init__(self, max_sessions=None, idle_timeout=None):
+        self.max_sessions = max_sessions or getattr(settings, 'APPIUM_MAX_SESSIONS', 4)
+        self.idle_timeout = idle_timeout or getattr(settings, 'APPIUM_SESSION_IDLE_TIMEOUT', 900)
+        self._sessions = {}
+        self._by_udid = {}
+        # udids with a session start in flight, so two testers can't race for a phone
+        self._starting = set()
+        self._registry_lock = threading.Lock()
+
+    @asynccontextmanager
+    async def _locked(self, session):
+        if not session.lock.acquire(blocking=False):
+            # BRIDGE: wait for the other caller in a worker thread, not on the loop.
+            acquiring = asyncio.get_running_loop().run_in_executor(None, session.lock.acquire)
+            try:
+                await asyncio.shield(acquiring)
+            except asyncio.CancelledError:
+                # The worker thread takes the lock anyway; hand it straight back
+                # or the session stays locked for good.
+                acquiring.add_done_callback(
+                    lambda future: session.lock.release() if not future.cancelled() and future.result() else None
+                )
+                raise
+        with self._registry_lock:
+            current = self._sessions.get(session.session_id)
+        if current is not session:
+            # Released while we waited; its driver has quit.
+            session.lock.release()
+            raise SessionNotFoundError(f'No active session with id {session.session_id}')
+        try:
+            yield session
+        finally:
+            session.touch()
+            session.lock.release()
+
+    def get(self, session_id):
+        with self._registry_lock:
+            session = self._sessions.get(session_id)
+        if session is None:
+            raise SessionNotFoundError(f'No active session with id {session_id}')
+        return session
+
+    def get_owned(self, session_id, user_id):
+        """The session, if it was opened by user_id; another tester's session raises SessionOwnerError."""
+        session = self.get(session_id)
+        if session.user_id != user_id:
+            raise SessionOwnerError(f'Session {session_id} belongs to another tester')
+        return session
+
+    def sessions(self):
+        with self._registry_lock:
+            return list(self._sessions.values())
+
+    def _reserve_device(self, udid, user_id, reuse=True):
+        """Returns an existing reusable session, or None after reserving a slot for a new one."""
+        with self._registry_lock:
+            existing = self._by_udid.get(udid)
+            if existing is not None:
+                if existing.user_id != user_id:
+                    raise DeviceBusyError(f'Device {udid} is already in use by another tester')
+                if not reuse:
+                    raise DeviceBusyError(f'Device {udid} already has an open session')
+                return existing
+            if udid in self._starting:
+                raise DeviceBusyError(f'A session is already starting on device {udid}')
+            if len(self._sessions) + len(self._starting) >= self.max_sessions:
+                raise SessionPoolFullError(
+                    f'Maximum of {self.max_sessions} concurrent Appium sessions reached'
+                )
+            self._starting.add(udid)
+            return None
+
+    async def acquire(self, capabilities, user_id=None, reuse=True):
+        """
+        Starts (or reuses) a session for the device named by capabilities['appium:udid'].
+        A tester asking again for a device they already hold gets the same session back,
+        unless reuse is False: then the device counts as busy.
+        """
+        udid = capabilities.get('appium:udid') or capabilities.get('udid')
+        if not udid:
+            raise SessionPoolError("capabilities must include 'appium:udid'")
+
+        await self.evict_idle()
+
+        existing = self._reserve_device(udid, user_id, reuse)
+        if existing is not None:
+            existing.touch()
+            return existing
+
+        try:
+            service = AppiumService()
+            await service.start_session(capabilities)
+            session = PooledSession(service, udid, user_id)
+            with self._registry_lock:
+                self._sessions[session.session_id] = session
+                self._by_udid[udid] = session
+            logger.info(f'Pooled session {session.session_id} on {udid} ({len(self._sessions)}/{self.max_sessions})')
+            return session
+        finally:
+            with self._registry_lock:
+                self._starting.discard(udid)
+
+    async def execute_step(self, session_id, step, user_id=None):
+        session = self.get_owned(session_id, user_id)
+        async with self._locked(session):
+            return await session.service.execute_step(step)
+
+    async def release(self, session_id, user_id=None):
+        session = self.get_owned(session_id, user_id)
+        async with self._locked(session):
+            with self._registry_lock:
+                self._sessions.pop(session_id, None)
+                if self._by_udid.get(session.udid) is session:
+                    del self._by_udid[session.udid]
+            return await session.service.end_session()
+
+    async def evict_idle(self):
+        """Ends sessions nobody has used for idle_timeout seconds. Busy sessions are left alone."""
+        stale = [
+            s for s in self.sessions()
+            if s.idle_seconds() > self.idle_timeout and not s.lock.locked()
+        ]
+        for session in stale:
+            logger.info(f'Evicting idle session {session.session_id} on {session.udid}')
+            try:
+                await self.release(session.session_id, user_id=session.user_id)
+            except SessionNotFoundError:
+                pass
+            except Exception as e:
+                logger.error(f'Failed to evict session {session.session_id}: {str(e)}')
+        return len(stale)
+
+    async def get_session_info(self, session_id):
+        session = self.get(session_id)
+        info = await session.service.get_session_info()
+        return {**session.as_dict(), **(info or {})}
+
+
+session_pool = AppiumSessionPool()
@@ -0,0 +1,135 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .authentication import token_cache
+from .batch_progress import COMPLETED_STATUSES, recompute_batch_counters
+from .dashboard_cache import invalidate_users
+from .locator_cache import locator_cache
+from .models import (
+    BatchAssignment, BatchAssignmentTestCase, TestAssignment, TestCase, TestExecution, TestStepTest, User
+)
+
+# BatchAssignment.completedtestcases / passedtestcases follow every change to the
+# latest execution of a batch's test cases made through save()/delete(): a status
+# change of a TestExecution or a BatchAssignmentTestCase pointed at a new run. A
+# re-run replaces the earlier result of its case, so counters are recounted from
+# BatchAssignmentTestCase.execution rather than incremented. The recount runs once
+# the change commits, so it also sees what concurrent executions committed. Bulk
+# writes (queryset.update, bulk_update) skip signals, so those paths call
+# batch_progress.recompute_batch_counters instead; `manage.py reconcile_batch_counters`
+# repairs any drift.
+
+
+def _contribution(status):
+    """(completed, passed) that an execution in this status adds to its batch."""
+    return int(status in COMPLETED_STATUSES), int(status == 'passed')
+
+
+def recompute_on_commit(batch_ids):
+    batch_ids = {batch_id for batch_id in batch_ids if batch_id}
+    if batch_ids:
+        transaction.on_commit(lambda: recompute_batch_counters(batch_ids))
+
+
+def _remember_state(instance):
+    # Read from __dict__ so rows loaded with .only()/.defer() don't each trigger a query;
+    # their state is unknown (None) and a save falls back to a recount.
+    values = instance.__dict__
+    if 'batch_id' in values and 'overallstatus' in values:
+        instance._counted_state = (values['batch_id'], values['overallstatus'])
+    else:
+        instance._counted_state = None
+
+
+@receiver(post_init, sender=TestExecution)
+def remember_execution_state(sender, instance, **kwargs):
+    _remember_state(instance)
+
+
+@receiver(post_save, sender=TestExecution)
+def update_batch_counters_on_save(sender, instance, created, **kwargs):
+    old_batch_id, old_status = (None, None) if created or instance._counted_state is None else instance._counted_state
+    # A new execution counts once a BatchAssignmentTestCase points at it, see below.
+    unchanged = created or (
+        instance._counted_state is not None and old_batch_id == instance.batch_id
+        and _contribution(old_status) == _contribution(instance.overallstatus)
+    )
+    if not unchanged:
+        recompute_on_commit([old_batch_id, instance.batch_id])
+    _remember_state(instance)
+
+
+@receiver(post_delete, sender=TestExecution)
+def update_batch_counters_on_delete(sender, instance, **kwargs):
+    recompute_on_commit([instance.batch_id])
+
+
+@receiver(post_save, sender=BatchAssignmentTestCase)
+@receiver(post_delete, sender=BatchAssignmentTestCase)
+def update_batch_counters_on_link(sender, instance, **kwargs):
+    recompute_on_commit([instance.batch_id])
+
+
+# Cached dashboards (api.dashboard_cache) of everyone an assignment or execution
+# shows up for are dropped once the change commits. Creating/deleting test cases
+# of an application or suite batch is left to the short cache TTL.
+
+def invalidate_dashboards(user_ids):
+    user_ids = set(user_ids)
+    transaction.on_commit(lambda: invalidate_users(user_ids))
+
+
+def batch_user_ids(batch_ids):
+    user_ids = set()
+    for assigned_by_id, assigned_to_id in BatchAssignment.objects.filter(
+        id__in=[batch_id for batch_id in batch_ids if batch_id]
+    ).values_list('assigned_by_id', 'assigned_to_id'):
+        user_ids.update((assigned_by_id, assigned_to_id))
+    return user_ids
+
+
+@receiver(post_save, sender=TestAssignment)
+@receiver(post_delete, sender=TestAssignment)
+@receiver(post_save, sender=BatchAssignment)
+@receiver(post_delete, sender=BatchAssignment)
+def invalidate_assignment_dashboards(sender, instance, **kwargs):
+    invalidate_dashboards([instance.assigned_by_id, instance.assigned_to_id])
+
+
+@receiver(post_save, sender=BatchAssignmentTestCase)
+@receiver(post_delete, sender=BatchAssignmentTestCase)
+def invalidate_batch_test_case_dashboards(sender, instance, **kwargs):
+    invalidate_dashboards(batch_user_ids([instance.batch_id]))
+
+
+@receiver(post_save, sender=TestExecution)
+@receiver(post_delete, sender=TestExecution)
+def invalidate_execution_dashboards(sender, instance, **kwargs):
+    invalidate_dashboards({instance.executed_by_id} | batch_user_ids([instance.batch_id]))
+
+
+# A changed or deleted user (deactivation, role change) must not be served from
+# the cookie-auth token cache; the next request re-reads them from the database.
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_tokens(sender, instance, **kwargs):
+    user_id = instance.pk
+    token_cache.invalidate_user(user_id)
+    # Again once committed: a request that read the old row in between may have cached it.
+    transaction.on_commit(lambda: token_cache.invalidate_user(user_id))
+
+
+# An edited or deleted step must not be found through the fast-path locator
+# AppiumService learned for its old element.
+@receiver(post_save, sender=TestStepTest)
+@receiver(post_delete, sender=TestStepTest)
+def invalidate_step_locator(sender, instance, created=False, **kwargs):
+    if created or not instance.testcase_id:
+        return
+    testcase = instance._state.fields_cache.get('testcase')
+    if testcase is not None:
+        application_id = testcase.application_id
+    else:
+        application_id = TestCase.objects.filter(id=instance.testcase_id).values_list('application_id', flat=True).first()
+    locator_cache.invalidate(application_id, instance.pk)
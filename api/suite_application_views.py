@@ -1,3 +1,6 @@
+import functools
+import json
+
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status as http_status
@@ -7,9 +10,112 @@ from .permissions import IsManager
 from .models import *
 from django.shortcuts import get_object_or_404
 from rest_framework import viewsets
+from rest_framework.utils import encoders
+from django.http import StreamingHttpResponse
 from django.db.models import Prefetch
-from django.db.models import Case, When, Value, IntegerField
+from django.db.models import Q
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
 from rest_framework import status
+from .dashboard_cache import cached_dashboard
+from .pagination import keyset_paginate
+from .batch_assignment import batch_source_cases, insert_batch_test_cases
+from .execution_plan import get_plans
+
+
+def batch_test_case_ids(batches):
+    """
+    {batch_id: [test_case_id, ...]} for a page of batches in at most two queries,
+    instead of one TestCase query per batch: BatchAssignmentTestCase rows for
+    custom groups, and one TestCase query for every application / suite batch.
+    """
+    ids = {batch.id: [] for batch in batches}
+    custom_group_ids = [batch.id for batch in batches if batch.assignment_type.name == "Custom_Group"]
+    application_ids = {batch.application_id for batch in batches if batch.assignment_type.name == "Application" and batch.application_id}
+    suite_ids = {batch.suite_id for batch in batches if batch.assignment_type.name == "Suite" and batch.suite_id}
+
+    if custom_group_ids:
+        for batch_id, test_case_id in BatchAssignmentTestCase.objects.filter(
+            batch_id__in=custom_group_ids
+        ).order_by('id').values_list('batch_id', 'test_case_id'):
+            ids[batch_id].append(test_case_id)
+
+    if application_ids or suite_ids:
+        by_application, by_suite = {}, {}
+        for test_case_id, application_id, suite_id in TestCase.objects.filter(
+            Q(application_id__in=application_ids) | Q(suite_id__in=suite_ids)
+        ).order_by('id').values_list('id', 'application_id', 'suite_id'):
+            by_application.setdefault(application_id, []).append(test_case_id)
+            by_suite.setdefault(suite_id, []).append(test_case_id)
+        for batch in batches:
+            if batch.assignment_type.name == "Application" and batch.application_id:
+                ids[batch.id] = by_application.get(batch.application_id, [])
+            elif batch.assignment_type.name == "Suite" and batch.suite_id:
+                ids[batch.id] = by_suite.get(batch.suite_id, [])
+    return ids
+
+
+GROUP_ITEMS_BATCH_SIZE = 500
+
+
+def parse_test_case_ids(values):
+    """
+    Test case ids from a request body as ints; JSON clients send them as
+    numbers or numeric strings. Raises ValueError naming the first id that
+    isn't numeric.
+    """
+    test_case_ids = []
+    for value in values:
+        try:
+            test_case_ids.append(int(value))
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid test case id: {value!r}")
+    return test_case_ids
+
+
+def sync_custom_group_items(custom_group, test_case_ids):
+    """
+    Makes the group's items match test_case_ids (in that order) with a fixed
+    number of queries: one IN query validates the ids, then only the
+    difference is written - new cases are bulk-inserted, kept cases whose
+    position moved get order_ingroup bulk-updated, dropped cases are deleted.
+    Unknown ids are skipped and repeated ids count once, at their first
+    position; order_ingroup is the 1-based position in the request.
+    test_case_ids must be ints (see parse_test_case_ids). Returns how many
+    items the group has afterwards. Call inside a transaction.
+    """
+    valid_ids = set(TestCase.objects.filter(id__in=set(test_case_ids)).values_list('id', flat=True))
+    wanted = {}
+    for order, test_case_id in enumerate(test_case_ids, start=1):
+        if test_case_id in valid_ids and test_case_id not in wanted:
+            wanted[test_case_id] = order
+
+    existing, stale = {}, []
+    for item in CustomTestGroupItems.objects.filter(custom_group=custom_group).order_by('id'):
+        if item.test_case_id in wanted and item.test_case_id not in existing:
+            existing[item.test_case_id] = item
+        else:
+            stale.append(item.id)
+
+    now = timezone.now()
+    moved = []
+    for test_case_id, item in existing.items():
+        if item.order_ingroup != wanted[test_case_id]:
+            item.order_ingroup = wanted[test_case_id]
+            item.updated_at = now
+            moved.append(item)
+
+    if stale:
+        CustomTestGroupItems.objects.filter(id__in=stale).delete()
+    if moved:
+        CustomTestGroupItems.objects.bulk_update(moved, ['order_ingroup', 'updated_at'], batch_size=GROUP_ITEMS_BATCH_SIZE)
+    CustomTestGroupItems.objects.bulk_create([
+        CustomTestGroupItems(custom_group=custom_group, test_case_id=test_case_id, order_ingroup=order)
+        for test_case_id, order in wanted.items() if test_case_id not in existing
+    ], batch_size=GROUP_ITEMS_BATCH_SIZE)
+    return len(wanted)
+
 
 class SuiteApplicationsView(APIView):
     """
@@ -17,6 +123,7 @@ class SuiteApplicationsView(APIView):
     Permission: Authenticated users only
     """
     permission_classes = [IsAuthenticated, IsManager]
+    query_budget = 4
     def get(self, request, application_id):
         try:
             application = get_object_or_404(Application, id=application_id)
@@ -24,9 +131,9 @@ class SuiteApplicationsView(APIView):
             # Optimized query with prefetch_related and filtering
             test_suites = TestSuite.objects.filter(
                 application=application
-            ).prefetch_related(
+            ).select_related('created_by').prefetch_related(
                 Prefetch('testcase_set', 
-                        queryset=TestCase.objects.all().order_by('name'),
+                        queryset=TestCase.objects.select_related('created_by').order_by('name'),
                         to_attr='ordered_test_cases')
             ).order_by('name')
             
@@ -119,32 +226,28 @@ class SetCustomGroupView(viewsets.ViewSet):
                     status=http_status.HTTP_400_BAD_REQUEST
                 )
 
-            # Create the custom test group
-            custom_group = CustomTestGroup.objects.create(
-                name=name,
-                application=application,
-                description=description,
-                created_by=request.user
-            )
+            try:
+                test_case_ids = parse_test_case_ids(test_case_ids)
+            except ValueError as e:
+                return Response({"error": str(e)}, status=http_status.HTTP_400_BAD_REQUEST)
+
+            with transaction.atomic():
+                # Create the custom test group
+                custom_group = CustomTestGroup.objects.create(
+                    name=name,
+                    application=application,
+                    description=description,
+                    created_by=request.user
+                )
 
-            # Create group items for each test case
-            for order, test_case_id in enumerate(test_case_ids, start=1):
-                try:
-                    test_case = TestCase.objects.get(id=test_case_id)
-                    CustomTestGroupItems.objects.create(
-                        custom_group=custom_group,
-                        test_case=test_case,
-                        order_ingroup=order
-                    )
-                except TestCase.DoesNotExist:
-                    # If a test case doesn't exist, skip it (or you could return an error)
-                    continue
+                # Create group items for each test case (unknown ids are skipped)
+                added = sync_custom_group_items(custom_group, test_case_ids)
 
             return Response(
                 {
                     "message": "Custom test group created successfully",
                     "group_id": custom_group.id,
-                    "total_test_cases_added": len(test_case_ids)
+                    "total_test_cases_added": added
                 },
                 status=http_status.HTTP_201_CREATED
             )
@@ -287,35 +390,28 @@ class SetCustomGroupView(viewsets.ViewSet):
                     {"error": "test_cases must be an array"},
                     status=http_status.HTTP_400_BAD_REQUEST
                 )
+
+            try:
+                test_case_ids = parse_test_case_ids(test_case_ids)
+            except ValueError as e:
+                return Response({"error": str(e)}, status=http_status.HTTP_400_BAD_REQUEST)
             
-            # Update group metadata if provided
-            if 'name' in request.data:
-                custom_group.name = request.data['name']
-            if 'description' in request.data:
-                custom_group.description = request.data['description']
-            custom_group.save()
-            
-            # Delete all existing group items
-            CustomTestGroupItems.objects.filter(custom_group=custom_group).delete()
-            
-            # Create new group items in the specified order
-            for order, test_case_id in enumerate(test_case_ids, start=1):
-                try:
-                    test_case = TestCase.objects.get(id=test_case_id)
-                    CustomTestGroupItems.objects.create(
-                        custom_group=custom_group,
-                        test_case=test_case,
-                        order_ingroup=order
-                    )
-                except TestCase.DoesNotExist:
-                    # Skip invalid test case IDs
-                    continue
+            with transaction.atomic():
+                # Update group metadata if provided
+                if 'name' in request.data:
+                    custom_group.name = request.data['name']
+                if 'description' in request.data:
+                    custom_group.description = request.data['description']
+                custom_group.save()
+
+                # Only add, reorder and remove the items that changed
+                total = sync_custom_group_items(custom_group, test_case_ids)
             
             return Response(
                 {
                     "message": "Custom test group updated successfully",
                     "group_id": custom_group.id,
-                    "total_test_cases": len(test_case_ids)
+                    "total_test_cases": total
                 },
                 status=http_status.HTTP_200_OK
             )
@@ -458,6 +554,11 @@ class SetCustomGroupView(viewsets.ViewSet):
             )
         
 class AssignBatchToTesterView(APIView):
+    """
+    Creates a batch for every tester in assigned_to_id (one id or a list) and,
+    when device_ids is given, for every tester/device pair. The test cases of
+    all of them are copied into BatchAssignmentTestCase with one INSERT ... SELECT.
+    """
     permission_classes = [IsAuthenticated, IsManager]
 
     def post(self, request):
@@ -470,74 +571,78 @@ class AssignBatchToTesterView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
+            try:
+                tester_ids = self._id_list(request.data['assigned_to_id'], 'assigned_to_id')
+                device_ids = self._id_list(request.data.get('device_ids'), 'device_ids')
+            except ValueError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            if not tester_ids:
+                return Response({"error": "assigned_to_id must not be empty"}, status=status.HTTP_400_BAD_REQUEST)
+            if User.objects.filter(id__in=tester_ids).count() != len(tester_ids):
+                return Response({"error": "Unknown tester in assigned_to_id"}, status=status.HTTP_400_BAD_REQUEST)
+            if device_ids and Device.objects.filter(id__in=device_ids).count() != len(device_ids):
+                return Response({"error": "Unknown device in device_ids"}, status=status.HTTP_400_BAD_REQUEST)
+
             # Determine assignment type and source
             if 'custom_group_id' in request.data:
                 assignment_type_name = 'Custom_Group'
-                custom_group = get_object_or_404(CustomTestGroup, id=request.data['custom_group_id'])
-                total_test_cases = CustomTestGroupItems.objects.filter(
-                    custom_group=custom_group
-                ).count()
                 source_field = 'customgroup'
-                source = custom_group
+                source = get_object_or_404(CustomTestGroup, id=request.data['custom_group_id'])
             elif 'application_id' in request.data:
                 assignment_type_name = 'Application'
-                application = get_object_or_404(Application, id=request.data['application_id'])
-                total_test_cases = TestCase.objects.filter(application=application).count()
                 source_field = 'application'
-                source = application
+                source = get_object_or_404(Application, id=request.data['application_id'])
             elif 'suite_id' in request.data:
                 assignment_type_name = 'Suite'
-                suite = get_object_or_404(TestSuite, id=request.data['suite_id'])
-                total_test_cases = TestCase.objects.filter(suite=suite).count()
                 source_field = 'suite'
-                source = suite
+                source = get_object_or_404(TestSuite, id=request.data['suite_id'])
             else:
                 return Response(
                     {"error": "Either custom_group_id, application_id, or suite_id must be provided"},
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            if total_test_cases == 0:
-                return Response(
-                    {"error": "No test cases found for this assignment"},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-
             # Get or create the test type
             assignment_type, _ = TestType.objects.get_or_create(name=assignment_type_name)
 
-            # Create batch assignment
-            batch_assignment = BatchAssignment.objects.create(
-                name=request.data['name'],
-                assigned_by=request.user,
-                assigned_to_id=request.data['assigned_to_id'],
-                assignment_type=assignment_type,
-                **{source_field: source},
-                status='pending',
-                notes=request.data.get('notes', ''),
-                priority=request.data['priority'],
-                totaltestcases=total_test_cases,
-                completedtestcases=0,
-                passedtestcases=0,
-                deadline=request.data.get('deadline')
-            )
-
-            # For custom groups, create BatchAssignmentTestCase entries
-            if source_field == 'customgroup':
-                group_items = CustomTestGroupItems.objects.filter(
-                    custom_group=custom_group
-                ).select_related('test_case')
-                
-                for item in group_items:
-                    BatchAssignmentTestCase.objects.create(
-                        batch=batch_assignment,
-                        test_case=item.test_case
+            with transaction.atomic():
+                batch_ids = [
+                    BatchAssignment.objects.create(
+                        name=request.data['name'],
+                        assigned_by=request.user,
+                        assigned_to_id=tester_id,
+                        assigned_device_id=device_id,
+                        assignment_type=assignment_type,
+                        **{source_field: source},
+                        status='pending',
+                        notes=request.data.get('notes', ''),
+                        priority=request.data['priority'],
+                        totaltestcases=0,
+                        completedtestcases=0,
+                        passedtestcases=0,
+                        deadline=request.data.get('deadline')
+                    ).id
+                    for tester_id in tester_ids
+                    for device_id in (device_ids or [None])
+                ]
+
+                inserted = insert_batch_test_cases(
+                    batch_ids, batch_source_cases(**{source_field: source}), timezone.now()
+                )
+                total_test_cases = inserted // len(batch_ids)
+                if total_test_cases == 0:
+                    transaction.set_rollback(True)
+                    return Response(
+                        {"error": "No test cases found for this assignment"},
+                        status=status.HTTP_400_BAD_REQUEST
                     )
+                BatchAssignment.objects.filter(id__in=batch_ids).update(totaltestcases=total_test_cases)
 
             return Response(
                 {
                     "message": "Batch assignment created successfully",
-                    "batch_id": batch_assignment.id,
+                    "batch_id": batch_ids[0],
+                    "batch_ids": batch_ids,
                     "total_test_cases": total_test_cases,
                     "assignment_type": assignment_type_name,
                     "assignment_source": source_field
@@ -546,18 +651,32 @@ class AssignBatchToTesterView(APIView):
             )
 
         except Exception as e:
-            if 'batch_assignment' in locals():
-                batch_assignment.delete()
             return Response(
                 {"error": str(e)},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+
+    def _id_list(self, value, field):
+        """One id or a list of ids, without duplicates, in request order. Raises ValueError on a non-numeric id."""
+        if value in (None, '', []):
+            return []
+        values = value if isinstance(value, list) else [value]
+        ids = []
+        for v in values:
+            try:
+                ids.append(int(v))
+            except (TypeError, ValueError):
+                raise ValueError(f"Invalid id in {field}: {v!r}")
+        return list(dict.fromkeys(ids))
         
 
 class TesterAssignedBatchTestsView(APIView):
     permission_classes = [IsAuthenticated, IsTester]
+    query_budget = 3
 
+    @cached_dashboard('tester-assigned-batches')
     def get(self, request):
+        """Newest first, keyset paginated: ?limit= (default DASHBOARD_PAGE_SIZE) and ?cursor=next_cursor."""
         try:
             # Get all batch assignments for the current user
             batch_assignments = BatchAssignment.objects.filter(
@@ -569,26 +688,15 @@ class TesterAssignedBatchTestsView(APIView):
                 'assignment_type',
                 'customgroup',
                 'application'
-            ).prefetch_related(
-                'batchassignmenttestcase_set__test_case'
-            ).order_by('-created_at')
-            
+            )
+            batch_assignments, next_cursor = keyset_paginate(
+                batch_assignments, request, ordering=('-created_at', '-id'),
+                default_limit=settings.DASHBOARD_PAGE_SIZE
+            )
+            test_case_ids = batch_test_case_ids(batch_assignments)
+
             results = []
             for batch in batch_assignments:
-                # Initialize test_case_ids
-                test_case_ids = []
-                
-                if batch.assignment_type.name == "Custom_Group":
-                    # Get test cases from BatchAssignmentTestCase for Custom_Group assignments
-                    test_case_ids = list(batch.batchassignmenttestcase_set.all()
-                                       .values_list('test_case_id', flat=True))
-                elif batch.assignment_type.name == "Application":
-                    # Get all test cases for this application from TestCase table
-                    if batch.application:
-                        test_case_ids = list(TestCase.objects.filter(
-                            application=batch.application
-                        ).values_list('id', flat=True))
-                
                 results.append({
                     "batch_id": batch.id,
                     "batch_name": batch.name,
@@ -604,11 +712,12 @@ class TesterAssignedBatchTestsView(APIView):
                     "passed_test_cases": batch.passedtestcases,
                     "application_id": batch.application.id if batch.application else None,
                     "custom_group_id": batch.customgroup.id if batch.customgroup else None,
-                    "test_case_ids": test_case_ids  # Array of test case IDs
+                    "test_case_ids": test_case_ids[batch.id]  # Array of test case IDs
                 })
 
             return Response({
                 "count": len(results),
+                "next_cursor": next_cursor,
                 "results": results
             }, status=200)
 
@@ -621,8 +730,11 @@ class TesterAssignedBatchTestsView(APIView):
 
 class ManagerAssignedBatchTestsView(APIView):
     permission_classes = [IsAuthenticated, IsManager]
+    query_budget = 3
 
+    @cached_dashboard('manager-assigned-batches')
     def get(self, request):
+        """Newest first, keyset paginated: ?limit= (default DASHBOARD_PAGE_SIZE) and ?cursor=next_cursor."""
         try:
             # Get all batch assignments for the current user
             batch_assignments = BatchAssignment.objects.filter(
@@ -637,38 +749,28 @@ class ManagerAssignedBatchTestsView(APIView):
                 'application',
                 'suite',
                 'suite__application'  # Add this for suite application access
-            ).prefetch_related(
-                'batchassignmenttestcase_set__test_case'
-            ).order_by('-created_at')
-            
+            )
+            batch_assignments, next_cursor = keyset_paginate(
+                batch_assignments, request, ordering=('-created_at', '-id'),
+                default_limit=settings.DASHBOARD_PAGE_SIZE
+            )
+            test_case_ids = batch_test_case_ids(batch_assignments)
+
             results = []
             for batch in batch_assignments:
-                # Initialize test_case_ids and application info
-                test_case_ids = []
+                # Determine application info based on assignment type
                 application_id = None
                 application_name = None
-                
-                # Determine application info based on assignment type
+
                 if batch.assignment_type.name == "Custom_Group" and batch.customgroup:
                     application_id = batch.customgroup.application.id
                     application_name = batch.customgroup.application.name
-                    # Get test cases from BatchAssignmentTestCase
-                    test_case_ids = list(batch.batchassignmenttestcase_set.all()
-                                       .values_list('test_case_id', flat=True))
                 elif batch.assignment_type.name == "Application" and batch.application:
                     application_id = batch.application.id
                     application_name = batch.application.name
-                    # Get all test cases for this application
-                    test_case_ids = list(TestCase.objects.filter(
-                        application=batch.application
-                    ).values_list('id', flat=True))
                 elif batch.assignment_type.name == "Suite" and batch.suite:
                     application_id = batch.suite.application.id
                     application_name = batch.suite.application.name
-                    # Get all test cases for this suite
-                    test_case_ids = list(TestCase.objects.filter(
-                        suite=batch.suite
-                    ).values_list('id', flat=True))
                 
                 results.append({
                     "batch_id": batch.id,
@@ -687,11 +789,12 @@ class ManagerAssignedBatchTestsView(APIView):
                     "application_name": application_name,  # Added application name
                     "custom_group_id": batch.customgroup.id if batch.customgroup else None,
                     "suite_id": batch.suite.id if batch.suite else None,  # Added suite ID
-                    "test_case_ids": test_case_ids
+                    "test_case_ids": test_case_ids[batch.id]
                 })
 
             return Response({
                 "count": len(results),
+                "next_cursor": next_cursor,
                 "results": results
             }, status=200)
 
@@ -703,7 +806,15 @@ class ManagerAssignedBatchTestsView(APIView):
 
 
 class BatchTestCasesView(APIView):
+    """
+    Test cases of a batch with their dynamic steps, in run order.
+    ?limit= / ?offset= return one page (next_offset is null on the last one);
+    ?include_steps=true adds every test case's full step payloads. Pages of more
+    than BATCH_TEST_CASES_STREAM_THRESHOLD test cases are streamed, building
+    STREAM_CHUNK_SIZE test cases at a time instead of the whole list.
+    """
     permission_classes = [IsAuthenticated, IsTester]
+    STREAM_CHUNK_SIZE = 200
 
     def get(self, request, batch_id):
         try:
@@ -719,69 +830,39 @@ class BatchTestCasesView(APIView):
                 assigned_to=request.user
             )
 
-            # Initialize variables
-            test_cases_data = []
             custom_group = batch.customgroup
             application = batch.application
             suite = batch.suite  # Added suite
 
-            # Get test cases based on assignment type
-            if custom_group:
-                # Custom Group logic (existing implementation)
-                batch_test_cases = BatchAssignmentTestCase.objects.filter(
-                    batch=batch
-                ).select_related(
-                    'test_case',
-                    'execution'
-                ).annotate(
-                    order_in_group=Case(
-                        When(
-                            test_case__customtestgroupitems__custom_group=custom_group,
-                            then='test_case__customtestgroupitems__order_ingroup'
-                        ),
-                        default=Value(99999),
-                        output_field=IntegerField()
-                    )
-                ).order_by('order_in_group', 'test_case__name')
-
-                # Get unique test cases while preserving order
-                seen_test_case_ids = set()
-                
-                for batch_test_case in batch_test_cases:
-                    test_case = batch_test_case.test_case
-                    
-                    if test_case.id in seen_test_case_ids:
-                        continue
-                    seen_test_case_ids.add(test_case.id)
-
-                    test_cases_data.append(self._prepare_test_case_data(test_case, batch_test_case))
+            try:
+                offset = max(int(request.query_params.get('offset', 0)), 0)
+                limit = request.query_params.get('limit')
+                limit = max(int(limit), 1) if limit else None
+            except ValueError:
+                return Response({"error": "limit and offset must be numbers"}, status=status.HTTP_400_BAD_REQUEST)
+            include_steps = request.query_params.get('include_steps', '').lower() in ('1', 'true', 'yes')
 
+            # (test_case_id, batch_test_case execution id or None, listed in the batch) in display order
+            if custom_group:
+                ordered = self._custom_group_order(batch, custom_group)
             elif application:
-                # Application logic - get all test cases ordered by suite_id then name
-                test_cases = TestCase.objects.filter(
+                # Application logic - all test cases ordered by suite_id then name
+                ordered = [(test_case_id, None, False) for test_case_id in TestCase.objects.filter(
                     application=application
-                ).select_related('suite') \
-                 .order_by('suite__id', 'name')
-
-                for test_case in test_cases:
-                    test_cases_data.append(self._prepare_test_case_data(test_case, None))
-
+                ).order_by('suite__id', 'name', 'id').values_list('id', flat=True)]
             elif suite:
-                # Suite logic - get all test cases for the suite ordered by name
-                test_cases = TestCase.objects.filter(
+                # Suite logic - all test cases of the suite ordered by name
+                ordered = [(test_case_id, None, False) for test_case_id in TestCase.objects.filter(
                     suite=suite
-                ).select_related('suite') \
-                 .order_by('name')
-
-                for test_case in test_cases:
-                    test_cases_data.append(self._prepare_test_case_data(test_case, None))
-
+                ).order_by('name', 'id').values_list('id', flat=True)]
             else:
                 return Response(
                     {"error": "Batch assignment has no valid assignment source (custom group, application, or suite)"},
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
+            page = ordered[offset:offset + limit] if limit else ordered[offset:]
+            end = offset + len(page)
             response_data = {
                 "batch_id": batch.id,
                 "batch_name": batch.name,
@@ -795,10 +876,19 @@ class BatchTestCasesView(APIView):
                 "application_name": application.name if application else None,
                 "suite_id": suite.id if suite else None,  # Added suite info
                 "suite_name": suite.name if suite else None,  # Added suite info
-                "test_cases": test_cases_data,
-                "count": len(test_cases_data)
+                "test_cases": [],
+                "count": len(ordered),
+                "offset": offset,
+                "next_offset": end if end < len(ordered) else None
             }
 
+            if len(page) > getattr(settings, 'BATCH_TEST_CASES_STREAM_THRESHOLD', 500):
+                return StreamingHttpResponse(
+                    self._stream(response_data, self._test_cases_data(batch, page, include_steps)),
+                    content_type='application/json'
+                )
+
+            response_data["test_cases"] = list(self._test_cases_data(batch, page, include_steps))
             return Response(response_data, status=status.HTTP_200_OK)
 
         except Exception as e:
@@ -807,39 +897,79 @@ class BatchTestCasesView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-    def _prepare_test_case_data(self, test_case, batch_test_case):
+    def _custom_group_order(self, batch, custom_group):
+        """The batch's test cases by the group's item order, then name; each test case once."""
+        group_order = {}
+        for test_case_id, order in CustomTestGroupItems.objects.filter(
+            custom_group=custom_group
+        ).values_list('test_case_id', 'order_ingroup'):
+            order = -1 if order is None else order  # NULL sorts first, as in the database
+            group_order[test_case_id] = min(order, group_order.get(test_case_id, order))
+
+        rows = BatchAssignmentTestCase.objects.filter(batch=batch).order_by('id').values_list(
+            'test_case_id', 'execution_id', 'test_case__name'
+        )
+        ordered, seen_test_case_ids = [], set()
+        for test_case_id, execution_id, _ in sorted(rows, key=lambda row: (group_order.get(row[0], 99999), row[2])):
+            if test_case_id in seen_test_case_ids:
+                continue
+            seen_test_case_ids.add(test_case_id)
+            ordered.append((test_case_id, execution_id, True))
+        return ordered
+
+    def _test_cases_data(self, batch, page, include_steps):
+        """
+        Yields the page's test case entries, loading STREAM_CHUNK_SIZE test cases
+        and their cached execution plans (dynamic steps) at a time.
+        """
+        for start in range(0, len(page), self.STREAM_CHUNK_SIZE):
+            chunk = page[start:start + self.STREAM_CHUNK_SIZE]
+            test_case_ids = [test_case_id for test_case_id, _, _ in chunk]
+            test_cases = TestCase.objects.select_related('suite').in_bulk(test_case_ids)
+            plans = get_plans(test_case_ids)
+            for test_case_id, execution_id, in_batch in chunk:
+                if test_case_id in test_cases:
+                    yield self._prepare_test_case_data(
+                        test_cases[test_case_id], batch, in_batch, execution_id, plans.get(test_case_id), include_steps
+                    )
+
+    def _stream(self, response_data, test_cases_data):
+        """The response_data JSON, with its test_cases array written one entry at a time."""
+        # Same encoding as DRF's JSONRenderer (which renders None as an empty body)
+        render = functools.partial(json.dumps, cls=encoders.JSONEncoder, ensure_ascii=False, separators=(',', ':'))
+        yield '{'
+        for index, (key, value) in enumerate(response_data.items()):
+            yield (',' if index else '') + render(key) + ':'
+            if key != 'test_cases':
+                yield render(value)
+                continue
+            yield '['
+            for position, test_case_data in enumerate(test_cases_data):
+                yield (',' if position else '') + render(test_case_data)
+            yield ']'
+        yield '}'
+
+    def _prepare_test_case_data(self, test_case, batch, in_batch, execution_id, plan, include_steps):
         """Helper method to prepare test case data with dynamic steps"""
-        dynamic_steps = []
-        test_steps = TestStepTest.objects.filter(
-            testcase=test_case,
-            input_field_type='dynamic'
-        ).order_by('step_order')
-        
-        for step in test_steps:
-            dynamic_steps.append({
-                "step_id": step.id,
-                "step_order": step.step_order,
-                "action": step.action,
-                "input_type": step.input_type,
-                "input_field_type": step.input_field_type,
-                "parameter_name": step.parameter_name,
-                "element_id": step.element_id
-            })
-
-        return {
+        dynamic_steps = plan['dynamic_steps'] if plan else []
+
+        data = {
             "testcase": test_case.name,
             "testcase_id": test_case.id,
             "code": test_case.code,
             "suite_id": test_case.suite.id,  # Include suite ID in response
             "suite_name": test_case.suite.name,  # Include suite name in response
-            "status": batch_test_case.batch.status if batch_test_case else 'pending',
-            "execution_id": batch_test_case.execution.id if batch_test_case and batch_test_case.execution else None,
+            "status": batch.status if in_batch else 'pending',
+            "execution_id": execution_id,
             "description": test_case.description,
             "created_at": test_case.created_at,
             "updated_at": test_case.updated_at,
             "has_dynamic_steps": len(dynamic_steps) > 0,
             "dynamic_test_steps": dynamic_steps if dynamic_steps else None
         }
+        if include_steps:
+            data["steps"] = plan['steps'] if plan else []
+        return data
     
 
 class GetCustomGroupTypeView(APIView):
@@ -0,0 +1,104 @@
+import logging
+import time
+
+from django.utils import timezone
+
+from .appium_service import CriticalStepError
+from .execution_plan import get_plans
+
+logger = logging.getLogger(__name__)
+
+
+def load_step_payloads_for(test_cases):
+    """Step payloads for several test cases from their cached execution plans, keyed by test case id."""
+    plans = get_plans([tc.id for tc in test_cases])
+    return {tc.id: plans[tc.id]['steps'] if tc.id in plans else [] for tc in test_cases}
+
+
+def load_step_payloads(testcase):
+    return load_step_payloads_for([testcase])[testcase.id]
+
+
+def apply_dynamic_inputs(steps, inputs):
+    """
+    Fills ActualInput for dynamic steps. `inputs` maps step id (int or str, as it
+    arrives from JSON) to the value the tester entered.
+    """
+    if not inputs:
+        return steps
+    for step in steps:
+        value = inputs.get(str(step["ID"]), inputs.get(step["ID"]))
+        if value is not None:
+            step["ActualInput"] = value
+    return steps
+
+
+async def run_steps(pool, session_id, steps, on_step=None, user_id=None):
+    """
+    Runs steps in order on a pooled session. Stops at the first CriticalStepError,
+    like the frontend does. `on_step(step, outcome)` is awaited after every step.
+    Returns (passed, outcomes).
+    """
+    outcomes = []
+    passed = True
+    for step in steps:
+        time_start = timezone.now()
+        started = time.time()
+        try:
+            result = await pool.execute_step(session_id, step, user_id=user_id)
+            outcome = {
+                "test_step_id": step["ID"],
+                "status": "passed" if result.get("success") else "failed",
+                "actual_id": result.get("actual_id"),
+                "actual_input": step.get("ActualInput"),
+                "duration": result.get("duration"),
+                "error": result.get("error"),
+                "log_message": f'Step {step["Step_order"]}: {step["Action"]} completed',
+                "critical": False,
+            }
+        except CriticalStepError as e:
+            outcome = {
+                "test_step_id": step["ID"],
+                "status": "failed",
+                "actual_id": None,
+                "actual_input": step.get("ActualInput"),
+                "duration": round(time.time() - started, 4),
+                "error": e.message,
+                "log_message": f'CRITICAL: {e.message}',
+                "critical": True,
+            }
+        outcome["time_start"] = time_start
+        outcome["time_end"] = timezone.now()
+        outcomes.append(outcome)
+
+        if outcome["status"] != "passed":
+            passed = False
+        if on_step:
+            await on_step(step, outcome)
+        if outcome["critical"]:
+            break
+    return passed, outcomes
+
+
+async def stream_test_case(pool, session_id, steps, user_id=None):
+    """
+    Runs a whole test case inside one event-loop task and pushes each step outcome
+    to the AppiumConsumer websocket as soon as it is known.
+    """
+    session = pool.get_owned(session_id, user_id)
+
+    async def emit(step, outcome):
+        event = {
+            **outcome,
+            "step_order": step["Step_order"],
+            "test_case_id": step["TestCase_id"],
+            "time_start": outcome["time_start"].isoformat(),
+            "time_end": outcome["time_end"].isoformat(),
+        }
+        try:
+            await session.service._socket_emit_step_result(event)
+        except Exception as e:
+            # A missing websocket must not fail the run; the HTTP response has everything.
+            logger.warning(f"Could not stream result of step {step['ID']}: {str(e)}")
+
+    return await run_steps(pool, session_id, steps, on_step=emit, user_id=user_id)
@@ -10,9 +10,24 @@ from django.shortcuts import get_object_or_404
 import json
 from rest_framework import status
 from rest_framework.exceptions import PermissionDenied
-from django.utils.dateparse import parse_datetime
 logger = logging.getLogger(__name__)
-from django.db.models import Prefetch
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.http import FileResponse, HttpResponseNotModified
+from django.urls import reverse
+from django.conf import settings
+from .result_ingest import ingest_batch_results
+from .blob_store import get_blob_store, is_blob_hash, store_screenshot, content_type_for
+from .dashboard_cache import cached_dashboard
+from .pagination import keyset_paginate
+from .result_stream import NDJSONLineTooLong, ResultStreamWriter, iter_ndjson, saved_step_ids
+
+def screenshot_url(request, blob_hash, thumbnail=False):
+    if not blob_hash:
+        return None
+    url = reverse('step-screenshot', args=[blob_hash])
+    return request.build_absolute_uri(url + ('?variant=thumbnail' if thumbnail else ''))
+
 
 class SaveTestResultView(APIView):
 
@@ -112,7 +127,7 @@ class SaveTestResultView(APIView):
                         'time_end': step_data.get('time_end'),
                         'log_message': step_data.get('log_message'),
                         'error': step_data.get('error'),
-                        'actual_screenshot' : step_data.get('screenshot')
+                        'screenshot_hash': store_screenshot(step_data.get('screenshot'))
                     }
                 )
 
@@ -125,7 +140,7 @@ class SaveTestResultView(APIView):
                     "actual_input": step_result.actual_input,
                     "log_message": step_result.log_message,
                     "error": step_result.error,
-                    "screenshoot" : step_result.actual_screenshot
+                    "screenshoot" : screenshot_url(request, step_result.screenshot_hash)
                 })
             
             return Response({
@@ -328,6 +343,9 @@ class StartBatchTestExecution(APIView):
 
 class SaveBatchTestResultsView(APIView):
     permission_classes = [IsAuthenticated, IsTester]
+    # 10 queries whatever the size, plus one INSERT or UPDATE per 500 step results
+    # (result_ingest.BULK_BATCH_SIZE): uploads of up to 5000 results stay within it on MySQL.
+    query_budget = 20
 
     def post(self, request):
         try:
@@ -335,7 +353,6 @@ class SaveBatchTestResultsView(APIView):
             batch_id = data.get('batch_id')
             overall_status = data.get('overall_status')
             test_case_results = data.get('test_case_results', [])
-            completed_at = data.get('completed_at')
 
             if not all([batch_id, overall_status]):
                 return Response(
@@ -343,85 +360,21 @@ class SaveBatchTestResultsView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            batch_assignment = BatchAssignment.objects.select_related(
-                'assigned_to', 'assigned_by', 'assignment_type'
-            ).get(id=batch_id)
-            
-            # --- We can optimistically save the main batch info first ---
+            batch_assignment = BatchAssignment.objects.get(id=batch_id)
             batch_assignment.status = overall_status
-            batch_assignment.completedtestcases = len(test_case_results)
-            batch_assignment.passedtestcases = sum(
-                1 for tc in test_case_results if tc.get('status') == 'passed'
-            )
-            if completed_at:
-                try:
-                    batch_assignment.completed_at = parse_datetime(completed_at)
-                except (ValueError, TypeError):
-                    pass
-            batch_assignment.save()
-
+            batch_assignment.save(update_fields=['status', 'updated_at'])
 
-            # *** CRITICAL CHANGE IS HERE ***
-            # We will now check for errors inside the loop and handle them after.
-            errors_encountered = []
-            saved_results_count = 0
+            # One transaction, a fixed number of queries; counters are recomputed in SQL.
+            saved_results_count, errors_encountered = ingest_batch_results(batch_assignment, test_case_results)
 
-            for tc_result in test_case_results:
-                try:
-                    test_execution = TestExecution.objects.select_related(
-                        'test_case', 'executed_by', 'executed_device'
-                    ).get(id=tc_result.get('test_execution_id'), batch=batch_assignment)
-                    
-                    test_execution.overallstatus = tc_result.get('status')
-                    test_execution.save()
-
-                    for step_data in tc_result.get('step_results', []):
-                        try:
-                            test_step = TestStepTest.objects.get(id=step_data.get('test_step_id'))
-                            
-                            time_start = parse_datetime(step_data.get('time_start')) if step_data.get('time_start') else None
-                            time_end = parse_datetime(step_data.get('time_end')) if step_data.get('time_end') else None
-                            
-                            StepResult.objects.update_or_create(
-                                test_execution=test_execution,
-                                test_step=test_step,
-                                defaults={
-                                    'actual_id': step_data.get('actual_id'),
-                                    'actual_input': step_data.get('actual_input'),
-                                    'status': step_data.get('status'),
-                                    'duration': step_data.get('duration'),
-                                    'time_start': time_start,
-                                    'time_end': time_end,
-                                    'log_message': step_data.get('log_message'),
-                                    'error': step_data.get('error'),
-                                    'actual_screenshot': step_data.get('screenshot')
-                                }
-                            )
-                        except Exception as e:
-                            # Instead of continuing, we log the specific error and append it to our list
-                            error_message = f"Failed to save step result for Test Step ID {step_data.get('test_step_id')}: {str(e)}"
-                            logger.error(error_message)
-                            errors_encountered.append(error_message)
-                    
-                    # If we made it this far without error for the TC, increment the count
-                    if not errors_encountered:
-                        saved_results_count += 1
-
-                except Exception as e:
-                    error_message = f"Failed to process Test Case Execution ID {tc_result.get('test_execution_id')}: {str(e)}"
-                    logger.error(error_message)
-                    errors_encountered.append(error_message)
-
-            # *** After the loop, check if any errors were logged ***
             if errors_encountered:
-                # If there were any failures, return a 500 error with details
+                # Unknown executions or steps were skipped; report them with details
                 return Response({
                     "error": "Failed to save one or more results to the database.",
                     "details": errors_encountered,
                     "saved_results_count": saved_results_count
                 }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-            # If the loop completes with no errors, return a success response
             return Response({
                 "message": "Batch test results saved successfully",
                 "batch_id": batch_assignment.id,
@@ -437,6 +390,98 @@ class SaveBatchTestResultsView(APIView):
             return Response({"error": "An unexpected server error occurred while saving results"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class StreamTestResultsView(APIView):
+    """
+    Upload protocol for step results while a run is going: many small POSTs
+    instead of one large one. A POST is saved only once its whole body has
+    arrived (Django reads ASGI request bodies completely before the view runs),
+    so a client sends every few steps in their own request.
+
+    POST  application/x-ndjson, one result per line:
+        {"test_execution_id": 12, "test_step_id": 229, "status": "passed", "duration": 1.2, "screenshot": "..."}
+        {"test_execution_id": 12, "overall_status": "passed"}
+      test_execution_id may be left out of the lines and given as ?test_execution_id= instead.
+      The response lists saved_step_ids of the executions in the request, as the
+      acknowledgement. Re-sending a step replaces its result, so retrying a POST is safe.
+
+    GET   ?test_execution_id=12,13 or ?batch_id=5
+      Step ids already saved per execution. After a dropped POST or a crash the
+      client resumes by re-sending only the steps missing here.
+    """
+    permission_classes = [IsAuthenticated, IsTester]
+
+    def post(self, request):
+        writer = ResultStreamWriter(default_execution_id=request.query_params.get('test_execution_id'))
+        try:
+            if request.stream is not None:
+                for line_number, item in iter_ndjson(request.stream):
+                    writer.add(line_number, item)
+            writer.flush()
+        except NDJSONLineTooLong as e:
+            writer.errors.append(str(e))
+            return Response({"error": "Result line too long", **writer.summary()}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        except Exception as e:
+            logger.error(f"Error streaming test results: {str(e)}")
+            return Response({"error": "An unexpected server error occurred while saving results", **writer.summary()}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        for message in writer.errors:
+            logger.error(message)
+        touched = [execution_id for execution_id, execution in writer.executions.items() if execution is not None]
+        return Response(
+            {**writer.summary(), "saved_step_ids": saved_step_ids(touched)},
+            status=status.HTTP_207_MULTI_STATUS if writer.errors else status.HTTP_200_OK
+        )
+
+    def get(self, request):
+        batch_id = request.query_params.get('batch_id')
+        execution_ids = request.query_params.get('test_execution_id')
+        if batch_id:
+            execution_ids = list(TestExecution.objects.filter(batch_id=batch_id).values_list('id', flat=True))
+        elif execution_ids:
+            try:
+                execution_ids = [int(execution_id) for execution_id in execution_ids.split(',')]
+            except ValueError:
+                return Response({"error": "test_execution_id must be a comma separated list of ids"}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            return Response({"error": "batch_id or test_execution_id is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({"saved_step_ids": saved_step_ids(execution_ids)}, status=status.HTTP_200_OK)
+
+
+class ScreenshotView(APIView):
+    """
+    GET screenshots/<hash>/[?variant=thumbnail]
+    Serves a stored step screenshot. Blobs never change once written, so the
+    response is cacheable forever and If-None-Match is answered with 304.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, blob_hash):
+        variant = 'thumbnail' if request.query_params.get('variant') == 'thumbnail' else 'original'
+        if not is_blob_hash(blob_hash):
+            return Response({"error": "Invalid screenshot id"}, status=status.HTTP_400_BAD_REQUEST)
+
+        etag = f'"{blob_hash}-{variant}"'
+        if request.headers.get('If-None-Match') == etag:
+            response = HttpResponseNotModified()
+        else:
+            store = get_blob_store()
+            try:
+                blob = store.open(blob_hash, variant)
+            except FileNotFoundError:
+                # No thumbnail is made without Pillow; fall back to the full image.
+                try:
+                    blob = store.open(blob_hash)
+                except FileNotFoundError:
+                    return Response({"error": "Screenshot not found"}, status=status.HTTP_404_NOT_FOUND)
+            head = blob.read(16)
+            blob.seek(0)
+            response = FileResponse(blob, content_type=content_type_for(head))
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, max-age=31536000, immutable'
+        return response
+
+
 class TestResultsListView(APIView):
     permission_classes = [IsAuthenticated, IsTester]
 
@@ -475,7 +520,9 @@ class TestResultsListView(APIView):
                     "duration": result.duration,
                     "log_message": result.log_message,
                     "error": result.error,
-                    "screenshot" : result.actual_screenshot,
+                    "screenshot" : result.actual_screenshot,  # only rows not yet moved by migrate_screenshots
+                    "screenshot_url": screenshot_url(request, result.screenshot_hash),
+                    "thumbnail_url": screenshot_url(request, result.screenshot_hash, thumbnail=True),
                     "created_at": result.created_at
                 })
 
@@ -496,8 +543,11 @@ class TestResultsListView(APIView):
 
 class TesterAssignedTestsView(APIView):
     permission_classes = [IsAuthenticated, IsTester]
+    query_budget = 2
 
+    @cached_dashboard('tester-assigned-tests')
     def get(self, request):
+        """Most recent first, keyset paginated: ?limit= (default DASHBOARD_PAGE_SIZE) and ?cursor=next_cursor."""
         try:
             # Get all test assignments for the current user where execution is not null
             assignments = TestAssignment.objects.filter(
@@ -510,7 +560,11 @@ class TesterAssignedTestsView(APIView):
                 'assigned_by',
                 'execution',
                 'execution__executed_device'
-            ).order_by('-updated_at', 'priority', 'deadline')  # Most recent first, then by priority/deadline
+            )
+            assignments, next_cursor = keyset_paginate(
+                assignments, request, ordering=('-updated_at', '-id'),
+                default_limit=settings.DASHBOARD_PAGE_SIZE
+            )
 
             results = []
             for assignment in assignments:
@@ -537,6 +591,7 @@ class TesterAssignedTestsView(APIView):
 
             return Response({
                 "count": len(results),
+                "next_cursor": next_cursor,
                 "results": results
             }, status=200)
 
@@ -548,8 +603,11 @@ class TesterAssignedTestsView(APIView):
         
 class ManagerAssignedTestsView(APIView):
     permission_classes = [IsAuthenticated, IsManager]
+    query_budget = 2
 
+    @cached_dashboard('manager-assigned-tests')
     def get(self, request):
+        """Most recent first, keyset paginated: ?limit= (default DASHBOARD_PAGE_SIZE) and ?cursor=next_cursor."""
         try:
             # Get all test assignments for the current user where execution is not null
             assignments = TestAssignment.objects.filter(
@@ -562,7 +620,11 @@ class ManagerAssignedTestsView(APIView):
                 'assigned_to',
                 'execution',
                 'execution__executed_device'
-            ).order_by('-updated_at', 'priority', 'deadline')  # Most recent first, then by priority/deadline
+            )
+            assignments, next_cursor = keyset_paginate(
+                assignments, request, ordering=('-updated_at', '-id'),
+                default_limit=settings.DASHBOARD_PAGE_SIZE
+            )
 
             results = []
             for assignment in assignments:
@@ -589,6 +651,7 @@ class ManagerAssignedTestsView(APIView):
 
             return Response({
                 "count": len(results),
+                "next_cursor": next_cursor,
                 "results": results
             }, status=200)
 
@@ -601,6 +664,7 @@ class ManagerAssignedTestsView(APIView):
 
 class TesterExecutedBatchTestsView(APIView):
     permission_classes = [IsAuthenticated, IsTester]
+    query_budget = 3
 
     def get(self, request):
         try:
@@ -614,37 +678,22 @@ class TesterExecutedBatchTestsView(APIView):
                 'assignment_type',
                 'customgroup',
                 'application'
-            ).prefetch_related(
-                'assigned_objects'  # This is the related_name for TestExecution's batch field
             ).order_by('-updated_at')  # Changed to descending order with '-'
-            
+
+            # Execution ids and devices for every batch in one query, instead of one per batch.
+            # Progress numbers come straight from the batch counters (see api.signals).
+            execution_ids = {}
+            device_names = {}
+            for batch_id, execution_id, device_name in TestExecution.objects.filter(
+                batch__in=batch_assignments, executed_by=request.user
+            ).order_by('-updated_at').values_list('batch_id', 'id', 'executed_device__device_name'):
+                execution_ids.setdefault(batch_id, []).append(execution_id)
+                if device_name:
+                    # dict keys keep the order devices were first seen, without duplicates
+                    device_names.setdefault(batch_id, {})[device_name] = None
+
             results = []
             for batch in batch_assignments:
-                # Get all executions for this batch by the current user
-                executions = batch.assigned_objects.filter(
-                    executed_by=request.user
-                ).select_related(
-                    'test_case',
-                    'executed_device'
-                ).order_by('-updated_at')  # Also order executions by updated_at if needed
-                
-                # Collect execution IDs and device info
-                execution_ids = []
-                device_names = []
-                
-                for execution in executions:
-                    execution_ids.append(execution.id)
-                    if execution.executed_device:
-                        device_names.append(execution.executed_device.device_name)
-                
-                # Remove duplicate device names while preserving order
-                seen_devices = set()
-                unique_device_names = []
-                for name in device_names:
-                    if name not in seen_devices:
-                        seen_devices.add(name)
-                        unique_device_names.append(name)
-                
                 results.append({
                     "batch_id": batch.id,
                     "batch_name": batch.name,
@@ -660,8 +709,8 @@ class TesterExecutedBatchTestsView(APIView):
                     "passed_test_cases": batch.passedtestcases,
                     "application_id": batch.application.id if batch.application else None,
                     "custom_group_id": batch.customgroup.id if batch.customgroup else None,
-                    "execution_ids": execution_ids,  # Array of execution IDs
-                    "devices_used": unique_device_names,  # Array of unique device names
+                    "execution_ids": execution_ids.get(batch.id, []),  # Array of execution IDs
+                    "devices_used": list(device_names.get(batch.id, {})),  # Array of unique device names
                     "last_updated": batch.updated_at  # Include the updated_at field
                 })
 
@@ -679,6 +728,7 @@ class TesterExecutedBatchTestsView(APIView):
 
 class ManagerExecutedBatchTestsView(APIView):
     permission_classes = [IsAuthenticated, IsManager]
+    query_budget = 2
 
     def get(self, request):
         try:
@@ -695,21 +745,12 @@ class ManagerExecutedBatchTestsView(APIView):
                 'application',  # For direct Application assignments
                 'suite',
                 'suite__application'  # For Suite assignments
-            ).prefetch_related(
-                Prefetch('assigned_objects',
-                    queryset=TestExecution.objects.select_related(
-                        'executed_by',
-                        'executed_device',
-                        'test_case'
-                    ).order_by('-updated_at')
-                )
             ).order_by('-updated_at')
-            
+
+            # One row per batch: progress comes from the counters api.signals keeps current,
+            # so the batches' executions are not loaded at all.
             results = []
             for batch in batch_assignments:
-                # Get the first execution (since all executions in a batch use same device/tester)
-                execution = batch.assigned_objects.first()
-                
                 # Determine application info based on assignment type
                 application_id = None
                 application_name = None
@@ -735,6 +776,8 @@ class ManagerExecutedBatchTestsView(APIView):
                     "notes": batch.notes,
                     "assignment_type": batch.assignment_type.name if batch.assignment_type else None,
                     "total_test_cases": batch.totaltestcases,
+                    "completed_test_cases": batch.completedtestcases,
+                    "passed_test_cases": batch.passedtestcases,
                     "application_id": application_id,
                     "application_name": application_name,
                     "custom_group_id": batch.customgroup.id if batch.customgroup else None,
@@ -949,6 +992,26 @@ class TestExecutionDetailView(APIView):
 
 class TestExecutionListView(APIView):
     permission_classes = [IsAuthenticated]
+    query_budget = 2
+
+    # fields= name -> expression in the single list query
+    FIELDS = {
+        "id": F('id'),
+        "test_case_id": F('test_case_id'),
+        "test_case_name": F('test_case__name'),
+        "batch_id": F('batch_id'),
+        "device_name": F('executed_device__device_name'),
+        "executed_by": F('executed_by__username'),
+        "status": F('overallstatus'),
+        "passed_steps": F('passed_steps'),
+        "total_steps": F('total_steps'),
+        "created_at": F('created_at'),
+        "updated_at": F('updated_at'),
+    }
+    DEFAULT_FIELDS = [
+        "id", "test_case_id", "test_case_name", "device_name", "executed_by",
+        "status", "progress", "created_at", "updated_at"
+    ]
 
     def get(self, request):
         """
@@ -958,59 +1021,82 @@ class TestExecutionListView(APIView):
         - device_id: filter by device
         - user_id: filter by executor
         - status: filter by status
+        - fields: comma separated subset of the result keys (default: all but the raw step counts)
+        - limit / cursor: keyset pagination, newest first; pass back next_cursor for the next page
         """
         try:
-            queryset = TestExecution.objects.select_related(
-                'test_case', 'device', 'executed_by'
-            ).order_by('-created_at')
-            
+            fields = request.query_params.get('fields')
+            fields = [field.strip() for field in fields.split(',') if field.strip()] if fields else self.DEFAULT_FIELDS
+            unknown = [field for field in fields if field not in self.FIELDS and field != 'progress']
+            if unknown:
+                return Response(
+                    {"error": f"Unknown fields: {', '.join(unknown)}"},
+                    status=http_status.HTTP_400_BAD_REQUEST
+                )
+
+            queryset = TestExecution.objects.all()
+
             # Apply filters
             test_case_id = request.query_params.get('test_case_id')
             if test_case_id:
                 queryset = queryset.filter(test_case_id=test_case_id)
-                
+
             device_id = request.query_params.get('device_id')
             if device_id:
-                queryset = queryset.filter(device_id=device_id)
-                
+                queryset = queryset.filter(executed_device_id=device_id)
+
             user_id = request.query_params.get('user_id')
             if user_id:
                 queryset = queryset.filter(executed_by_id=user_id)
-                
+
             status = request.query_params.get('status')
             if status:
                 queryset = queryset.filter(overallstatus=status)
-            
+
             # For non-manager/admin users, only show their own executions
             if request.user.role not in ['manager', 'admin']:
                 queryset = queryset.filter(executed_by=request.user)
-            
+
+            # Step counts come from correlated subqueries, so they are only
+            # computed for the rows of this page, and only when asked for.
+            if {'progress', 'passed_steps', 'total_steps'} & set(fields):
+                step_counts = StepResult.objects.filter(
+                    test_execution=OuterRef('pk')
+                ).order_by().values('test_execution').annotate(
+                    total=Count('id'),
+                    passed=Count('id', filter=Q(status='passed'))
+                )
+                queryset = queryset.annotate(
+                    total_steps=Coalesce(Subquery(step_counts.values('total')), 0),
+                    passed_steps=Coalesce(Subquery(step_counts.values('passed')), 0)
+                )
+
+            selected = {field: self.FIELDS[field] for field in fields if field in self.FIELDS}
+            if 'progress' in fields:
+                selected.update(passed_steps=self.FIELDS['passed_steps'], total_steps=self.FIELDS['total_steps'])
+            # Aliased so the names can't clash with model fields; the cursor needs created_at / id.
+            queryset = queryset.values('created_at', 'id', **{f'out_{name}': value for name, value in selected.items()})
+
+            rows, next_cursor = keyset_paginate(queryset, request)
+
             data = []
-            for execution in queryset:
-                # Get basic stats about step results
-                step_results = StepResult.objects.filter(test_execution=execution)
-                total_steps = step_results.count()
-                passed_steps = step_results.filter(status='passed').count()
-                
-                data.append({
-                    "id": execution.id,
-                    "test_case_id": execution.test_case.id,
-                    "test_case_name": execution.test_case.name,
-                    "device_name": execution.device.device_name,
-                    "executed_by": execution.executed_by.username,
-                    "status": execution.overallstatus,
-                    "progress": f"{passed_steps}/{total_steps}" if total_steps > 0 else "0/0",
-                    "created_at": execution.created_at,
-                    "updated_at": execution.updated_at
-                })
-            
+            for row in rows:
+                item = {}
+                for field in fields:
+                    if field == 'progress':
+                        item[field] = f"{row['out_passed_steps']}/{row['out_total_steps']}"
+                    else:
+                        item[field] = row[f'out_{field}']
+                data.append(item)
+
             return Response({
                 "count": len(data),
+                "next_cursor": next_cursor,
                 "results": data
             })
-            
+
         except Exception as e:
             return Response(
                 {"error": str(e)},
                 status=http_status.HTTP_400_BAD_REQUEST
-            )
\ No newline at end of file
+            )
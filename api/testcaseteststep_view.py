@@ -5,132 +5,157 @@ from .permissions import IsAdmin
 from rest_framework import status
 from .models import *
 from .serializers import TestCaseSerializer
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
 from django.db.utils import DataError
 from rest_framework.exceptions import ValidationError
+from .recorder_import import IdentifierTypes, bulk_create_steps, normalize_by_flag
 
 class CreateTestCaseWithStepsAPIView(APIView):
+    """
+    Creates a test case and its steps from an Appium recorder export. The body is
+    either one test case (code, name, description, application_id, suite_id,
+    recorded_actions) or {"test_cases": [...]} with several of them; everything
+    is saved in one transaction, so a bad test case leaves nothing behind.
+    """
+
     def clean_element_id(self, element_id):
         return element_id.replace('\"', '"')
 
     def post(self, request):
+        many = 'test_cases' in request.data
+        payloads = request.data.get('test_cases') if many else [request.data]
+        if not isinstance(payloads, list) or not payloads:
+            return Response({'error': 'No test cases provided'}, status=status.HTTP_400_BAD_REQUEST)
+
+        created_by = request.user if request.user.is_authenticated else User.objects.get(id=1)
+        identifier_types = IdentifierTypes()
+        imported = []
+        try:
+            with transaction.atomic():
+                for payload in payloads:
+                    imported.append(self._build_testcase(request, payload, created_by, identifier_types))
+                bulk_create_steps([step for _, steps in imported for step in steps])
+
+        except Exception as e:
+            error = {"error": str(e)}
+            if many and len(imported) < len(payloads):
+                error["index"] = len(imported)  # the test case that failed
+            return Response(error, status=status.HTTP_400_BAD_REQUEST)
+
+        results = [self._result(testcase, steps) for testcase, steps in imported]
+        if not many:
+            return Response({"message": "Test case and steps created successfully", **results[0]}, status=200)
+        return Response({
+            "message": f"{len(results)} test cases and steps created successfully",
+            "test_cases": results,
+            "total_steps": sum(result['total_steps'] for result in results)
+        }, status=200)
+
+    def _build_testcase(self, request, data, created_by, identifier_types):
+        """Saves the test case and returns it with its unsaved steps."""
         testcase_data = {
-            'code': request.data.get('code', '').strip(),
-            'name': request.data.get('name', '').strip(),
-            'description': request.data.get('description', '').strip(),
-            'application_id': request.data.get('application_id'),
-            'suite_id': request.data.get('suite_id'),
-            # 'application_id': request.data.get('id'),
-            # 'suite_id': request.data.get('module_id')
+            'code': (data.get('code') or '').strip(),
+            'name': (data.get('name') or '').strip(),
+            'description': (data.get('description') or '').strip(),
+            'application_id': data.get('application_id'),
+            'suite_id': data.get('suite_id'),
         }
+        recorded_actions = data.get('recorded_actions', [])
 
-        recorded_actions = request.data.get('recorded_actions', [])
-        
         # Validate required fields
         required_fields = ['name', 'application_id', 'suite_id']
         if not all(testcase_data[field] for field in required_fields):
-            return Response({'error': 'Missing required fields'}, status=status.HTTP_400_BAD_REQUEST)
-        
+            raise _MissingData('Missing required fields')
+
         if not recorded_actions:
-            return Response({'error': 'No recorded actions provided'}, status=status.HTTP_400_BAD_REQUEST)
+            raise _MissingData('No recorded actions provided')
 
-        try:
-            # Create test case
-            testcase_serializer = TestCaseSerializer(data=testcase_data, context={'request': request})
-            testcase_serializer.is_valid(raise_exception=True)
-            testcase = testcase_serializer.save(created_by=request.user if request.user.is_authenticated else User.objects.get(id=1))
-
-            # Process recorded actions
-            element_map = {}
-            saved_steps = []
-            step_order = 1
-            
-            for action in recorded_actions:
-                action_type = action['action'].lower()
-                params = action['params']
-                
-                # Process findAndAssign actions
-                if action_type == 'findandassign':
-                    if len(params) < 3:
-                        raise ValidationError("Invalid findAndAssign parameters")
-                    
-                    by_flag, value, el = params[:3]
-                    identifier_type = self._get_identifier_type(by_flag)
-                    element_map[el] = {
-                        'element_id': self.clean_element_id(value),
-                        'element_identifier_type': identifier_type
-                    }
-                    continue
-                
-                # Process interaction actions (click, sendKeys)
-                if action_type in ['click', 'sendkeys']:
-                    if not params or not params[0]:
-                        raise ValidationError(f"Missing element reference in {action_type} action")
-                    
-                    el = params[0]
-                    if el not in element_map:
-                        raise ValidationError(f"Element {el} referenced before being defined")
-                    
-                    step_data = {
-                        'testcase': testcase,
-                        'step_order': step_order,
-                        'element_id': element_map[el]['element_id'],
-                        'element_identifier_type': element_map[el]['element_identifier_type'],
-                        'action': 'click' if action_type == 'click' else 'send_keys'
-                    }
-                    
-                    # Handle sendKeys specific data
-                    if action_type == 'sendkeys':
-                        step_data.update({
-                            'input_field_type': 'dynamic' if action.get('dynamic', False) else 'static',
-                            'parameter_name': action.get('label', ''),
-                            'input_type': action.get('sendKeysType', 'static'),
-                            'actual_input': params[2] if len(params) > 2 else None
-                        })
-                    
-                    # Create the step
-                    step = TestStepTest.objects.create(**step_data)
-                    saved_steps.append({
-                        'id': step.id,
-                        'step_order': step.step_order,
-                        'action': step.action,
-                        'element_id': step.element_id,
-                        'element_identifier_type': step.element_identifier_type.name,
-                        'input_type': step.input_type,
-                        'parameter_name': step.parameter_name,
-                        'input_field_type': step.input_field_type,
-                        'actual_input': step.actual_input
+        testcase_serializer = TestCaseSerializer(data=testcase_data, context={'request': request})
+        testcase_serializer.is_valid(raise_exception=True)
+        testcase = testcase_serializer.save(created_by=created_by)
+
+        # Process recorded actions
+        element_map = {}
+        steps = []
+
+        for action in recorded_actions:
+            action_type = action['action'].lower()
+            params = action['params']
+
+            # Process findAndAssign actions
+            if action_type == 'findandassign':
+                if len(params) < 3:
+                    raise ValidationError("Invalid findAndAssign parameters")
+
+                by_flag, value, el = params[:3]
+                element_map[el] = {
+                    'element_id': self.clean_element_id(value),
+                    'element_identifier_type': self._get_identifier_type(identifier_types, by_flag)
+                }
+                continue
+
+            # Process interaction actions (click, sendKeys)
+            if action_type in ['click', 'sendkeys']:
+                if not params or not params[0]:
+                    raise ValidationError(f"Missing element reference in {action_type} action")
+
+                el = params[0]
+                if el not in element_map:
+                    raise ValidationError(f"Element {el} referenced before being defined")
+
+                step_data = {
+                    'testcase': testcase,
+                    'step_order': len(steps) + 1,
+                    'element_id': element_map[el]['element_id'],
+                    'element_identifier_type': element_map[el]['element_identifier_type'],
+                    'action': 'click' if action_type == 'click' else 'send_keys'
+                }
+
+                # Handle sendKeys specific data
+                if action_type == 'sendkeys':
+                    step_data.update({
+                        'input_field_type': 'dynamic' if action.get('dynamic', False) else 'static',
+                        'parameter_name': action.get('label', ''),
+                        'input_type': action.get('sendKeysType', 'static'),
+                        'actual_input': params[2] if len(params) > 2 else None
                     })
-                    step_order += 1
-
-            return Response({
-                "message": "Test case and steps created successfully",
-                "testcase": {
-                    "id": testcase.id,
-                    "code": testcase.code,
-                    "name": testcase.name
-                },
-                "steps": saved_steps,
-                "total_steps": len(saved_steps)
-            }, status=200)
 
-        except Exception as e:
-            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
-
-    def _get_identifier_type(self, by_flag):
-        by_flag = str(by_flag).strip().replace("-", "").lower()
-        identifier_map = {
-            "android uiautomator": "ANDROID_UIAUTOMATOR",
-            "id": "ID",
-            "class name": "CLASS_NAME",
-            "xpath": "XPATH",
-            "accessibility id": "ACCESSIBILITY_ID"
+                steps.append(TestStepTest(**step_data))
+
+        return testcase, steps
+
+    def _result(self, testcase, steps):
+        return {
+            "testcase": {
+                "id": testcase.id,
+                "code": testcase.code,
+                "name": testcase.name
+            },
+            "steps": [{
+                'id': step.id,
+                'step_order': step.step_order,
+                'action': step.action,
+                'element_id': step.element_id,
+                'element_identifier_type': step.element_identifier_type.name,
+                'input_type': step.input_type,
+                'parameter_name': step.parameter_name,
+                'input_field_type': step.input_field_type,
+                'actual_input': step.actual_input
+            } for step in steps],
+            "total_steps": len(steps)
         }
-        identifier_type = identifier_map.get(by_flag)
+
+    def _get_identifier_type(self, identifier_types, by_flag):
+        by_flag = normalize_by_flag(by_flag)
+        identifier_type = identifier_types.identifier_name(by_flag)
         if not identifier_type:
             raise ValidationError(f"Unsupported locator strategy: {by_flag}")
-        
-        try:
-            return ElementIdentifierType.objects.get(name=identifier_type)
-        except ElementIdentifierType.DoesNotExist:
+
+        identifier = identifier_types.by_name.get(identifier_type)
+        if identifier is None:
             raise ValidationError(f"Invalid identifier type: {identifier_type}")
+        return identifier
+
+
+class _MissingData(Exception):
+    """A payload without the fields a recorder import needs (plain 400 message)."""
@@ -14,8 +14,10 @@ from .appiumview import (
     get_devices, 
     start_session, 
     execute_step, 
+    execute_test_case,
     end_session, 
-    session_info
+    session_info,
+    run_batch
 )
 from django.views.decorators.http import require_http_methods
 from .suite_application_views import *  # Added import
@@ -38,20 +40,26 @@ urlpatterns = [
     path('start-batch-test-execution/', StartBatchTestExecution.as_view(), name='start-batch-test-execution'),
     path('save-batch-test-results/', SaveBatchTestResultsView.as_view(), name='save-batch-test-results'),
     path('save_test_result/', SaveTestResultView.as_view(), name='save-test-result'),
+    path('stream-test-results/', StreamTestResultsView.as_view(), name='stream-test-results'),
     path('test-results/<int:test_execution_id>/', TestResultsListView.as_view(), name='test-results-list'),
     path('test-result/<int:result_id>/', TestResultDetailView.as_view(), name='test-result-detail'),
+    path('test-executions/', TestExecutionListView.as_view(), name='test-execution-list'),
+    path('screenshots/<str:blob_hash>/', ScreenshotView.as_view(), name='step-screenshot'),
     path('get-my-testresults/', TesterAssignedTestsView.as_view(), name='tester-test-results'), 
     path('get-manager-testresults/', ManagerAssignedTestsView.as_view(), name='manager-test-results'),
     path('get-my-batch-testresults/', TesterExecutedBatchTestsView.as_view(), name='executed-batch-tests'),
     path('get-manager-pending-batch/', ManagerExecutedBatchTestsView.as_view(), name='executed-batch-tests'),
     path('testsuitetestcase/<int:suite_id>/', TestSuiteResultView.as_view(), name='test-suite-testcase'),
     path("checkauth/", CheckAuthView.as_view(), name="check_auth"),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
     path("logout/", LogoutView.as_view(), name="logout"),
     path('api/devices/', get_devices, name='get_devices'),
     path('api/start-session/', start_session, name='start_session'),
     path('api/execute-step/', execute_step, name='execute_step'),
+    path('api/execute-test-case/', execute_test_case, name='execute_test_case'),
     path('api/end-session/', end_session, name='end_session'),
     path('api/session-info/', session_info, name='session_info'),
+    path('api/run-batch/', run_batch, name='run_batch'),
     path('getapptestcase/<int:application_id>/', TestcaseApplicationViewSet.as_view(), name='application'),
     path('getSuiteApplications/<int:application_id>/', SuiteApplicationsView.as_view(), name='suite-applications'),
     path('setCustomGroup/', SetCustomGroupView.as_view({'post': 'post'}), name='set-custom-group'), 
@@ -24,6 +24,12 @@ from rest_framework_simplejwt.state import token_backend
 import jwt
 from jwt import ExpiredSignatureError
 from .models import *
+from .execution_plan import get_plan
+from . import metrics
+from .locator_cache import locator_cache
+from .authentication import token_cache
+from .db_pool import pool_stats
+from .recorder_import import IdentifierTypes, bulk_create_steps, normalize_by_flag
 
 
 class UserViewSet(viewsets.ModelViewSet):
@@ -199,6 +205,7 @@ class ParseStepsAPIView(APIView):
         # # Handle structured JSON format
         if recorded_actions:
             element_map = {}
+            identifier_types = IdentifierTypes()  # one query instead of one per findAndAssign
             for action in recorded_actions:
                 action_raw = action.get("action", "").lower()
 
@@ -215,21 +222,13 @@ class ParseStepsAPIView(APIView):
 
                 if normalized_action == "findAndAssign":
                     by_flag, value, el = params[:3]
-                    by_flag = by_flag.strip().replace("-", "").lower()  # Normalize
-                    identifier_map = {
-                        "android uiautomator": "ANDROID_UIAUTOMATOR",
-                        "id": "ID",
-                        "class name": "CLASS_NAME",
-                        "xpath": "XPATH",
-                        "accessibility id": "ACCESSIBILITY_ID"
-                    }
-                    identifier_type = identifier_map.get(by_flag)
+                    by_flag = normalize_by_flag(by_flag)
+                    identifier_type = identifier_types.identifier_name(by_flag)
                     if not identifier_type:
                         return Response({"error": f"Unsupported by: {by_flag}"}, status=400)
 
-                    try:
-                        identifier_obj = ElementIdentifierType.objects.get(name=identifier_type)
-                    except ElementIdentifierType.DoesNotExist:
+                    identifier_obj = identifier_types.by_name.get(identifier_type)
+                    if identifier_obj is None:
                         return Response({"error": f"Unsupported identifier: {identifier_type}"}, status=400)
 
                     element_map[el] = {
@@ -253,8 +252,8 @@ class ParseStepsAPIView(APIView):
 
                         parsed_steps.append(step_data)
 
-        for i, step in enumerate(parsed_steps, 1):
-            TestStepTest.objects.create(
+        bulk_create_steps([
+            TestStepTest(
                 testcase=testcase,
                 step_order=i,
                 element_identifier_type=step["element_identifier_type"],
@@ -264,6 +263,8 @@ class ParseStepsAPIView(APIView):
                 parameter_name=step.get("parameter_name"),
                 input_field_type=step.get("input_field_type"),
             )
+            for i, step in enumerate(parsed_steps, 1)
+        ])
 
         return Response({"message": f"{(recorded_actions)} steps saved."}, status=200)
 
@@ -354,6 +355,7 @@ class RefreshAccessTokenViewBearer(APIView):
 class RerunDataHandler(APIView):
     
     permission_classes = [IsAuthenticated] 
+    query_budget = 4
 
     def get(self, request, testcase_id):
         # testcase_id = request.data.get("testcase_id")
@@ -361,32 +363,13 @@ class RerunDataHandler(APIView):
         if not testcase_id:
             return Response({"error": "testcase_id is required in the URL."}, status=400)
 
-        try:
-            testcase = TestCase.objects.get(id=testcase_id)
-        except TestCase.DoesNotExist:
+        # Served from the cached execution plan: no query once it is compiled.
+        plan = get_plan(testcase_id)
+        if plan is None:
             return Response({"error": "TestCase not found."}, status=404)
 
-        steps = TestStepTest.objects.filter(testcase=testcase).select_related("element_identifier_type").order_by("step_order")
-
-        data = []
-        for step in steps:
-            data.append({
-                "ID": step.id,
-                "Code": testcase.code,
-                "Name": testcase.name,
-                "Step_order": step.step_order,
-                "ElementId": step.element_id,
-                "Action": step.action,
-                "ElementIdentifier": step.element_identifier_type.name if step.element_identifier_type else None,
-                "InputType": step.input_type,
-                "LabelName": step.parameter_name,
-                "InputFieldType" : step.input_field_type,
-                "ActualInput" : step.actual_input,
-                "TestCase_id" : step.testcase_id
-            })
-        
         return Response({
-            "rerundata": data}, status=200)
+            "rerundata": plan['steps']}, status=200)
     
 class CookieTokenObtainView(APIView):
     # permission_classes = [IsAuthenticated] 
@@ -522,6 +505,9 @@ class CheckAuthView(APIView):
        
 class LogoutView(APIView):
         def post(self, request):
+            access_token = request.COOKIES.get("access_token")
+            if access_token:
+                token_cache.revoke(access_token)
             response = Response({"message": "Logged out successfully"})
             response.delete_cookie("access_token")
             response.delete_cookie("refresh_token")
@@ -634,6 +620,19 @@ class StartTestExecution(APIView):
             )
 
 
+class MetricsView(APIView):
+    """In-process counters and latency histograms (step find/action times, etc.)."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return Response({
+            **metrics.snapshot(),
+            'locator_cache': locator_cache.stats(),
+            'jwt_auth_cache': token_cache.stats(),
+            'db_pool': pool_stats(),
+        })
+
+
 class AuthUserView(APIView):
     permission_classes = [IsAuthenticated]
 
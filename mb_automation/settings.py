@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 from datetime import timedelta
 
@@ -24,9 +25,39 @@ INSTALLED_APPS = [
 ]
 
 ADB_PATH = 'C:\\Android\\platform-tools\\adb.exe'  # or your ADB path
+ADB_DEVICE_CACHE_TTL = 5  # seconds api/devices/ may serve the cached device list
+ADB_TRACK_DEVICES = False  # refresh the device cache from `adb track-devices` events instead of only the TTL
 APPIUM_HOST = 'localhost'
 APPIUM_PORT = 4723
 APPIUM_DEFAULT_COMMAND_TIMEOUT = 60000
+APPIUM_MAX_SESSIONS = 4  # concurrent device sessions in api.session_pool
+APPIUM_SESSION_IDLE_TIMEOUT = 900  # seconds before an unused session is ended
+APPIUM_ELEMENT_TIMEOUT = 25  # default element wait (seconds), TestStepTest.wait_timeout overrides it
+APPIUM_WAIT_STRATEGY = 'adaptive'  # 'fixed', 'exponential', 'adaptive' or a dotted path (api.element_waits)
+APPIUM_WAIT_STRATEGY_OPTIONS = {}
+APPIUM_CACHED_LOCATOR_TIMEOUT = 2  # seconds a cached fast-path locator gets before the recorded one is tried (with the full timeout)
+APPIUM_LOG_FLUSH_INTERVAL = 0.1  # seconds between websocket log frames per session (api.log_stream)
+APPIUM_LOG_BATCH_SIZE = 50  # log lines per frame; a full batch is sent right away
+APPIUM_LOG_BUFFER_SIZE = 1000  # lines buffered per session before the oldest are dropped
+APPIUM_LOG_GLOBAL_GROUP = True  # also send session logs to the old ws/appium/ feed
+APPIUM_LOG_HISTORY_SIZE = 500  # recent lines kept per session for replay after a websocket reconnect
+APPIUM_LOG_HISTORY_MAX_BYTES = 8 * 1024 * 1024  # cap on the replay history of all sessions together
+APPIUM_LOG_HISTORY_RETENTION = 300  # seconds an ended session's history stays available
+RESULT_STREAM_FLUSH_ROWS = 50  # streamed step results committed per transaction (stream-test-results/)
+RESULT_STREAM_FLUSH_BYTES = 8 * 1024 * 1024  # ...or sooner once buffered screenshots reach this size
+RESULT_STREAM_MAX_LINE_BYTES = 16 * 1024 * 1024  # longest single NDJSON line accepted
+BLOB_STORE_BACKEND = 'api.blob_store.FileSystemBlobStore'  # content-addressed screenshot storage
+BLOB_STORE_OPTIONS = {'root': BASE_DIR / 'blobs'}
+SCREENSHOT_THUMBNAIL_SIZE = (240, 480)  # needs Pillow; thumbnails are skipped without it
+DASHBOARD_PAGE_SIZE = 100  # default ?limit= of the assignment dashboards
+DASHBOARD_CACHE_TTL = 30  # seconds a user's dashboard page is cached (0 disables); uses the default cache
+JWT_AUTH_CACHE_SIZE = 2048  # validated access tokens kept in memory by api.authentication
+JWT_AUTH_SHARED_CACHE = False  # also share logouts/user changes through the default cache (multi-process deployments)
+EXECUTION_PLAN_CACHE_TTL = 3600  # seconds a compiled test case execution plan is cached (0 disables); uses the default cache
+BATCH_TEST_CASES_STREAM_THRESHOLD = 500  # batch test case pages larger than this are streamed instead of rendered at once
+QUERY_PROFILING = False  # api.middleware.QueryProfilingMiddleware: Server-Timing header + `api.profiling` log per request
+QUERY_BUDGET_DEFAULT = None  # max SQL queries per request for views without their own `query_budget` (None: no limit)
+QUERY_BUDGET_STRICT = False  # raise QueryBudgetExceeded instead of logging a warning (turn on in test settings)
 
 ASGI_APPLICATION = 'mb_automation.asgi.application'
 
@@ -113,6 +144,7 @@ CORS_ALLOW_HEADERS = [
 MIDDLEWARE = [
     # 'api.middleware.JWTAuthenticationFromCookieMiddleware',
     'corsheaders.middleware.CorsMiddleware',  # Keep this at the top
+    'api.middleware.QueryProfilingMiddleware',  # no-op unless QUERY_PROFILING
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -145,17 +177,40 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'mb_automation.wsgi.application'
 
+# MB_AUTOMATION_DB_POOL=1 pools connections per process (api.db_pool) with the
+# engines in api.db_backends; off by default, Django opens one per request.
+DB_POOL_ENABLED = os.environ.get('MB_AUTOMATION_DB_POOL') == '1'
+DB_POOL = {
+    'SIZE': 10,  # idle connections kept open per process
+    'MAX_CONNECTIONS': None,  # open connections per process at most, more requests wait for one (None: no limit)
+    'TIMEOUT': 10,  # seconds a request waits for a free connection before OperationalError
+    'HEALTH_CHECK_INTERVAL': 30,  # connections idle longer than this are pinged before reuse
+    'MAX_LIFETIME': 3600,  # seconds before a connection is replaced (below MySQL's wait_timeout)
+}
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
+        'ENGINE': 'api.db_backends.mysql' if DB_POOL_ENABLED else 'django.db.backends.mysql',
         'NAME': 'mb_automation',
         'USER': 'root',
         'PASSWORD': '',
         'HOST': 'localhost',
         'PORT': '3306',
+        'CONN_MAX_AGE': 0,  # keep at 0 with the pool: Django hands the connection back after each request
+        'POOL': DB_POOL,
     }
 }
 
+# MB_AUTOMATION_DB=sqlite: local runs and benchmarks (generate_synthetic_data /
+# benchmark_endpoints) without a MySQL server.
+if os.environ.get('MB_AUTOMATION_DB') == 'sqlite':
+    DATABASES['default'] = {
+        'ENGINE': 'api.db_backends.sqlite3' if DB_POOL_ENABLED else 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': 0,
+        'POOL': DB_POOL,
+    }
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',